@@ -0,0 +1,219 @@
+"""
+Agregados de facetas (categorias, marcas, estoque, histograma e percentis de preço)
+mantidos de forma incremental para o catálogo e para cada busca salva
+"""
+import bisect
+import logging
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Any, Iterable, Tuple, Callable
+
+logger = logging.getLogger(__name__)
+
+# Escopo com todos os produtos conhecidos
+CATALOG_SCOPE = 'catalog'
+
+def search_scope(search_id: int) -> str:
+    """Nome do escopo de facetas de uma busca salva"""
+    return f"search:{search_id}"
+
+def product_facet_key(product: Dict[str, Any]) -> str:
+    """
+    Identificador usado para substituir a contribuição de um produto no
+    upsert: a chave canônica (ver product_identity.ensure_product_key)
+    """
+    key = product.get('product_key')
+    if not key:
+        raise ValueError(f"Produto sem product_key: {product.get('nome') or product.get('url')}")
+    return key
+
+class FacetStats:
+    """Facetas de um conjunto de produtos, atualizadas a cada upsert"""
+
+    def __init__(self, bin_width_usd: float = 50.0):
+        self.bin_width_usd = bin_width_usd
+        self.categories = Counter()
+        self.brands = Counter()
+        self.stock = Counter()
+        self.histogram = Counter()  # índice da faixa -> quantidade
+        self._prices: List[float] = []  # mantida ordenada para os percentis
+        self._items: Dict[str, Tuple[float, str, str, str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._items
+
+    def upsert(self, product: Dict[str, Any]):
+        """Adiciona um produto ou substitui a versão anterior dele"""
+        key = product_facet_key(product)
+        self.remove(key)
+
+        try:
+            price = float(product.get('preco_usd') or 0)
+        except (ValueError, TypeError):
+            price = 0.0
+
+        item = (
+            price,
+            product.get('categoria') or 'N/A',
+            product.get('marca') or 'N/A',
+            product.get('estoque') or 'N/A'
+        )
+        self._items[key] = item
+
+        self.categories[item[1]] += 1
+        self.brands[item[2]] += 1
+        self.stock[item[3]] += 1
+        self.histogram[self._bin(price)] += 1
+        bisect.insort(self._prices, price)
+
+    def upsert_many(self, products: Iterable[Dict[str, Any]]):
+        for product in products:
+            self.upsert(product)
+
+    def remove(self, key: str):
+        """Remove a contribuição de um produto, se existir"""
+        item = self._items.pop(key, None)
+        if item is None:
+            return
+
+        price, category, brand, stock = item
+        for counter, value in ((self.categories, category), (self.brands, brand),
+                               (self.stock, stock), (self.histogram, self._bin(price))):
+            counter[value] -= 1
+            if counter[value] <= 0:
+                del counter[value]
+
+        index = bisect.bisect_left(self._prices, price)
+        if index < len(self._prices) and self._prices[index] == price:
+            del self._prices[index]
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Percentil de preço (0-100) com interpolação linear"""
+        if not self._prices:
+            return None
+
+        position = (len(self._prices) - 1) * q / 100
+        lower = int(position)
+        upper = min(lower + 1, len(self._prices) - 1)
+        fraction = position - lower
+        return self._prices[lower] + (self._prices[upper] - self._prices[lower]) * fraction
+
+    def to_dict(self, percentiles: Iterable[int] = (10, 25, 50, 75, 90)) -> Dict[str, Any]:
+        """Serializa as facetas para a API"""
+        return {
+            'total': len(self._items),
+            'price_range': {
+                'min': self._prices[0] if self._prices else 0,
+                'max': self._prices[-1] if self._prices else 0
+            },
+            'price_percentiles': {f"p{q}": self.percentile(q) for q in percentiles},
+            'price_histogram': [
+                {
+                    'min': index * self.bin_width_usd,
+                    'max': (index + 1) * self.bin_width_usd,
+                    'count': self.histogram[index]
+                }
+                for index in sorted(self.histogram)
+            ],
+            'categories': dict(self.categories.most_common()),
+            'brands': dict(self.brands.most_common()),
+            'stock': dict(self.stock.most_common())
+        }
+
+    def _bin(self, price: float) -> int:
+        return int(price // self.bin_width_usd)
+
+class FacetAggregator:
+    """Mantém as facetas por escopo (catálogo e buscas salvas)"""
+
+    def __init__(self, bin_width_usd: float = 50.0):
+        self.bin_width_usd = bin_width_usd
+        self._scopes: Dict[str, FacetStats] = {}
+        self._loaded: Dict[str, Tuple[Any, Any]] = {}  # escopo -> (versão, geração) carregadas
+        self._lock = threading.Lock()
+
+    def ensure_loaded(self, scope: str, loader: Callable[[], Iterable[Dict[str, Any]]], version: Any = None,
+                      changes: Optional[Callable[[Any], Iterable[Dict[str, Any]]]] = None, generation: Any = None):
+        """
+        Carrega um escopo a partir da fonte persistente na primeira consulta.
+        Com `version` (marca crescente da fonte, ex: gravações de outro
+        processo) e `changes(versão carregada)`, que devolve só os produtos
+        gravados depois dela, as mudanças entram por upsert; a carga completa
+        fica para a partida a frio ou quando `generation` muda (remoções, que
+        não cabem num upsert). Sem `changes`, qualquer versão nova recarrega
+        o escopo. Sem versão, upserts feitos antes da carga são preservados.
+        """
+        with self._lock:
+            loaded = self._loaded.get(scope)
+            if loaded is not None and loaded == (version, generation):
+                return
+            incremental = (
+                changes is not None and version is not None and loaded is not None
+                and loaded[1] == generation and loaded[0] is not None
+            )
+
+        if incremental:
+            since = loaded[0]
+            products = list(changes(since))
+        else:
+            products = list(loader())
+
+        with self._lock:
+            current = self._loaded.get(scope)
+            # Outra requisição já aplicou uma versão igual ou mais nova
+            newer = (
+                current is not None and current[1] == generation and current[0] is not None
+                and version is not None and current[0] >= version
+            )
+            if newer:
+                return
+            stats = self._scopes.get(scope)
+            if incremental:
+                if current != loaded:
+                    # Escopo recarregado entre a leitura e a aplicação: a
+                    # próxima consulta busca as mudanças a partir dele
+                    return
+                stats.upsert_many(products)
+            else:
+                if stats is None or version is not None:
+                    stats = self._scopes[scope] = FacetStats(self.bin_width_usd)
+                for product in products:
+                    if product_facet_key(product) not in stats:
+                        stats.upsert(product)
+            self._loaded[scope] = (version, generation)
+
+    def upsert(self, scope: str, products: Iterable[Dict[str, Any]]):
+        """Atualiza incrementalmente as facetas de um escopo"""
+        with self._lock:
+            stats = self._scopes.get(scope)
+            if stats is None:
+                stats = self._scopes[scope] = FacetStats(self.bin_width_usd)
+            stats.upsert_many(products)
+
+    def remove(self, scope: str, product: Dict[str, Any]):
+        with self._lock:
+            stats = self._scopes.get(scope)
+            if stats is not None:
+                stats.remove(product_facet_key(product))
+
+    def drop_scope(self, scope: str):
+        with self._lock:
+            self._scopes.pop(scope, None)
+            self._loaded.pop(scope, None)
+
+    def get(self, scope: str) -> Dict[str, Any]:
+        """Retorna as facetas serializadas de um escopo"""
+        with self._lock:
+            stats = self._scopes.get(scope)
+            if stats is None:
+                return FacetStats(self.bin_width_usd).to_dict()
+            return stats.to_dict()
+
+    def summarize(self, products: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """Facetas avulsas de uma lista de produtos (sem guardar escopo)"""
+        stats = FacetStats(self.bin_width_usd)
+        stats.upsert_many(products)
+        return stats.to_dict()
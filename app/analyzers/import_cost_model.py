@@ -0,0 +1,289 @@
+"""
+Modelo configurável de custos de importação (regimes de tributação, cotas,
+frete por peso e regras por categoria) avaliado de forma vetorizada
+"""
+import os
+import json
+import copy
+import logging
+from typing import Dict, List, Optional, Any, Callable, Sequence
+import numpy as np
+from ..extractors.spec_parser import parse_weight_g
+from ..utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Configuração padrão: reproduz a estimativa histórica (60% de impostos,
+# R$ 50 de frete e R$ 30 de manuseio). Pode ser sobrescrita por um JSON
+# apontado por IMPORT_COST_CONFIG com a mesma estrutura.
+DEFAULT_COST_CONFIG = {
+    'regime': 'simplificado',
+    'regimes': {
+        # Tributação simplificada: alíquota única sobre o valor convertido
+        'simplificado': {'type': 'flat', 'tax_rate': 0.60},
+        # Remessa Conforme: 20% até US$ 50; acima, 60% com dedução de US$ 20; ICMS "por dentro"
+        'remessa_conforme': {
+            'type': 'tiered',
+            'threshold_usd': 50,
+            'low_rate': 0.20,
+            'high_rate': 0.60,
+            'deduction_usd': 20,
+            'icms_rate': 0.17
+        },
+        # Bagagem acompanhada: isento até a cota, 50% sobre o excedente
+        'bagagem': {'type': 'quota', 'quota_usd': 500, 'tax_rate': 0.50}
+    },
+    'shipping': {'base': 50, 'per_kg': 0, 'default_weight_g': 0},
+    'handling': 30,
+    # Regras por categoria (chave em minúsculas), ex:
+    # "notebooks": {"regime": "remessa_conforme", "shipping": {"per_kg": 40}}
+    'categories': {}
+}
+
+# Alíquota principal de cada tipo de regime (substituída nos cenários de sensibilidade)
+TAX_RATE_FIELDS = {'flat': 'tax_rate', 'tiered': 'high_rate', 'quota': 'tax_rate'}
+
+COST_FIELDS = ('exchange_rate', 'price_brl', 'import_tax', 'shipping', 'handling', 'import_cost', 'total_cost')
+
+def _merge(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
+    merged = copy.deepcopy(base)
+    for key, value in (override or {}).items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+def load_cost_config(path: Optional[str] = None) -> Dict[str, Any]:
+    """Configuração padrão combinada com o arquivo JSON informado (se existir)"""
+    path = path or os.getenv('IMPORT_COST_CONFIG')
+    if not path:
+        return copy.deepcopy(DEFAULT_COST_CONFIG)
+
+    try:
+        with open(path, encoding='utf-8') as f:
+            return _merge(DEFAULT_COST_CONFIG, json.load(f))
+    except (OSError, json.JSONDecodeError) as e:
+        logger.error(f"Error loading import cost config {path}: {str(e)}")
+        return copy.deepcopy(DEFAULT_COST_CONFIG)
+
+def _compile_tax(regime: Dict[str, Any]) -> Callable[[np.ndarray, np.ndarray, np.ndarray], np.ndarray]:
+    """Função vetorizada (preço USD, preço BRL, cotação) -> impostos em BRL"""
+    kind = regime.get('type', 'flat')
+
+    if kind == 'flat':
+        rate = regime['tax_rate']
+        return lambda usd, brl, fx: brl * rate
+
+    if kind == 'tiered':
+        threshold, low, high = regime['threshold_usd'], regime['low_rate'], regime['high_rate']
+        deduction, icms = regime.get('deduction_usd', 0), regime.get('icms_rate', 0)
+
+        def tiered(usd, brl, fx):
+            duty = np.where(usd <= threshold, usd * low, np.maximum(usd * high - deduction, 0)) * fx
+            return duty + (brl + duty) * icms / (1 - icms)
+        return tiered
+
+    if kind == 'quota':
+        quota, rate = regime['quota_usd'], regime['tax_rate']
+        return lambda usd, brl, fx: np.maximum(usd - quota, 0) * fx * rate
+
+    raise ValueError(f"Tipo de regime desconhecido: {kind}")
+
+class ExchangeRateProvider:
+    """
+    Cotação USD/BRL atual obtida por `fetcher` (ex: a cotação publicada pela
+    loja) e mantida em cache. Sem cotação atual disponível, usa a registrada
+    na extração do produto e, por último, o valor de fallback.
+    """
+
+    def __init__(self, fetcher: Optional[Callable[[], Optional[float]]] = None,
+                 ttl: float = None, fallback: float = None):
+        self.fetcher = fetcher
+        self.fallback = fallback if fallback is not None else float(os.getenv('DEFAULT_EXCHANGE_RATE', 5.5))
+        self._cache = TTLCache(ttl=ttl if ttl is not None else float(os.getenv('EXCHANGE_RATE_TTL', 3600)), max_entries=1)
+        self.retry_interval = float(os.getenv('EXCHANGE_RATE_RETRY', 300))
+
+    def current(self) -> float:
+        return self._live_rate() or self.fallback
+
+    def for_product(self, product: Dict[str, Any]) -> float:
+        """Cotação atual; a registrada na extração do produto só se a atual falhar"""
+        rate = self._live_rate()
+        if rate:
+            return rate
+
+        try:
+            stored = float(product.get('cotacao_usd_brl') or 0)
+        except (ValueError, TypeError):
+            stored = 0
+        return stored if stored > 0 else self.fallback
+
+    def _live_rate(self) -> Optional[float]:
+        """Cotação do fetcher (em cache) ou None se indisponível"""
+        if self.fetcher is None:
+            return None
+
+        rate = self._cache.get('usd_brl')
+        if rate is not None:
+            return rate or None
+
+        try:
+            rate = self.fetcher()
+        except Exception as e:
+            logger.warning(f"Error fetching exchange rate: {str(e)}")
+            rate = None
+
+        if not rate:
+            # Falha também fica em cache (por menos tempo) para não repetir a extração a cada análise
+            self._cache.set('usd_brl', 0.0, ttl=self.retry_interval)
+            return None
+
+        self._cache.set('usd_brl', rate)
+        return rate
+
+class ImportCostModel:
+    """
+    Compila a configuração em funções vetorizadas por regra de categoria.
+    Combinações repetidas de (preço, categoria, peso, cotação) são calculadas
+    uma única vez e memorizadas entre chamadas.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, memo_size: int = None):
+        self.config = config if config is not None else load_cost_config()
+        self._default_rule = self._compile_rule(self.config)
+        self._category_rules = {
+            category.lower(): self._compile_rule(_merge(self.config, override))
+            for category, override in self.config.get('categories', {}).items()
+        }
+        self._memo = TTLCache(ttl=float('inf'), max_entries=memo_size or int(os.getenv('IMPORT_COST_MEMO_SIZE', 16384)))
+
+    def estimate(self, price_usd: float, exchange_rate: float,
+                 category: Optional[str] = None, weight_g: Optional[float] = None) -> Dict[str, float]:
+        """Custos de um único produto (mesmas chaves de _estimate_import_costs)"""
+        costs = self.evaluate([price_usd], exchange_rate, [category], [weight_g])
+        return {field: float(values[0]) for field, values in costs.items()}
+
+    def evaluate(self,
+                 price_usd: Sequence[float],
+                 exchange_rate: Any,
+                 categories: Optional[Sequence[Optional[str]]] = None,
+                 weights_g: Optional[Sequence[Optional[float]]] = None) -> Dict[str, np.ndarray]:
+        """
+        Custos de vários produtos. `exchange_rate` pode ser escalar ou um valor
+        por produto; peso ausente usa o padrão da regra.
+        """
+        price_usd = np.asarray(price_usd, dtype=float)
+        n = price_usd.size
+        rates = np.broadcast_to(np.asarray(exchange_rate, dtype=float), (n,))
+        categories = [(c or '').lower() for c in categories] if categories is not None else [''] * n
+        weights = np.array([np.nan if w is None else w for w in weights_g], dtype=float) if weights_g is not None else np.full(n, np.nan)
+
+        # Só a regra da categoria importa: categorias sem regra própria usam a padrão
+        rule_keys = np.array([c if c in self._category_rules else '' for c in categories], dtype=object)
+
+        results = {field: np.empty(n) for field in COST_FIELDS}
+        # Peso ausente vira None na chave (NaN nunca é igual a si mesmo)
+        weight_keys = [None if np.isnan(w) else w for w in weights.tolist()]
+        keys = list(zip(price_usd.tolist(), rule_keys.tolist(), weight_keys, rates.tolist()))
+
+        # Agrupa as linhas idênticas antes de consultar a memória
+        groups: Dict[tuple, List[int]] = {}
+        for index, key in enumerate(keys):
+            groups.setdefault(key, []).append(index)
+
+        rows: Dict[tuple, tuple] = {}
+        pending = []
+        for key in groups:
+            cached = self._memo.get(key)
+            if cached is None:
+                pending.append(key)
+            else:
+                rows[key] = cached
+
+        if pending:
+            computed = self._compute(pending)
+            for position, key in enumerate(pending):
+                rows[key] = tuple(float(computed[field][position]) for field in COST_FIELDS)
+                self._memo.set(key, rows[key])
+
+        for key, indices in groups.items():
+            for field, value in zip(COST_FIELDS, rows[key]):
+                results[field][indices] = value
+
+        return results
+
+    def evaluate_products(self, products: Sequence[Dict[str, Any]], exchange_rates: Any) -> Dict[str, np.ndarray]:
+        """Custos a partir dos dicionários de produto (preço, categoria e peso bruto)"""
+        return self.evaluate(
+            [float(p.get('preco_usd') or 0) for p in products],
+            exchange_rates,
+            [p.get('categoria') for p in products],
+            [parse_weight_g(p.get('peso_bruto')) for p in products]
+        )
+
+    def with_tax_rate(self, tax_rate: float) -> 'ImportCostModel':
+        """
+        Cópia do modelo com a alíquota principal de todos os regimes substituída
+        (tax_rate; high_rate no escalonado), mantendo regimes, frete, manuseio
+        e regras por categoria
+        """
+        config = copy.deepcopy(self.config)
+        base_regimes = config.get('regimes', {})
+        for name, regime in base_regimes.items():
+            regime[TAX_RATE_FIELDS.get(regime.get('type', 'flat'), 'tax_rate')] = tax_rate
+        for override in config.get('categories', {}).values():
+            for name, regime in override.get('regimes', {}).items():
+                kind = regime.get('type') or base_regimes.get(name, {}).get('type', 'flat')
+                regime[TAX_RATE_FIELDS.get(kind, 'tax_rate')] = tax_rate
+        return ImportCostModel(config, memo_size=self._memo.max_entries)
+
+    def stats(self) -> Dict[str, Any]:
+        return self._memo.stats()
+
+    def _compute(self, keys: List[tuple]) -> Dict[str, np.ndarray]:
+        """Avalia as combinações distintas, uma passada vetorizada por regra"""
+        price_usd = np.array([k[0] for k in keys], dtype=float)
+        rule_keys = np.array([k[1] for k in keys], dtype=object)
+        weights = np.array([np.nan if k[2] is None else k[2] for k in keys], dtype=float)
+        rates = np.array([k[3] for k in keys], dtype=float)
+        price_brl = price_usd * rates
+
+        import_tax = np.empty(len(keys))
+        shipping = np.empty(len(keys))
+        handling = np.empty(len(keys))
+
+        for rule_key in np.unique(rule_keys):
+            mask = rule_keys == rule_key
+            rule = self._category_rules.get(rule_key, self._default_rule)
+            import_tax[mask] = rule['tax'](price_usd[mask], price_brl[mask], rates[mask])
+            weight_kg = np.where(np.isnan(weights[mask]), rule['default_weight_g'], weights[mask]) / 1000
+            shipping[mask] = rule['shipping_base'] + rule['shipping_per_kg'] * weight_kg
+            handling[mask] = rule['handling']
+
+        import_cost = import_tax + shipping + handling
+        return {
+            'exchange_rate': rates,
+            'price_brl': price_brl,
+            'import_tax': import_tax,
+            'shipping': shipping,
+            'handling': handling,
+            'import_cost': import_cost,
+            'total_cost': price_brl + import_cost
+        }
+
+    @staticmethod
+    def _compile_rule(config: Dict[str, Any]) -> Dict[str, Any]:
+        regime_name = config.get('regime', 'simplificado')
+        regime = config.get('regimes', {}).get(regime_name)
+        if regime is None:
+            raise ValueError(f"Regime de importação desconhecido: {regime_name}")
+
+        shipping = config.get('shipping', {})
+        return {
+            'tax': _compile_tax(regime),
+            'shipping_base': float(shipping.get('base', 0)),
+            'shipping_per_kg': float(shipping.get('per_kg', 0)),
+            'default_weight_g': float(shipping.get('default_weight_g', 0)),
+            'handling': float(config.get('handling', 0))
+        }
@@ -3,27 +3,20 @@ Analisador de mercado para comparação de preços e análise de oportunidades
 """
 import re
 import logging
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Tuple, Callable, Iterator
 from dataclasses import dataclass
 from datetime import datetime
-import requests
-from bs4 import BeautifulSoup
-import time
+import numpy as np
+import pandas as pd
+from .market_sources import MarketPrice, MarketSourceExecutor, build_sources
+from .market_price_cache import MarketPriceCache
+from .product_matcher import ProductMatcher
+from .price_history_store import PriceSeriesStore, series_product_key
+from .import_cost_model import ImportCostModel, ExchangeRateProvider
+from ..extractors.spec_parser import parse_weight_g
 
 logger = logging.getLogger(__name__)
 
-@dataclass
-class MarketPrice:
-    """Preço encontrado no mercado"""
-    source: str
-    price_brl: float
-    url: str
-    seller: str
-    condition: str  # "new", "used", "refurbished"
-    availability: str  # "in_stock", "out_of_stock", "limited"
-    shipping_cost: Optional[float] = None
-    found_at: datetime = None
-
 @dataclass
 class MarketAnalysis:
     """Análise completa de mercado"""
@@ -56,15 +49,56 @@ class MarketAnalysis:
     market_position: str  # "premium", "competitive", "budget"
     recommendations: List[str]
 
+# Versões vetorizadas (NumPy, com broadcasting) das regras de preço sugerido,
+# score e posicionamento (custos: ImportCostModel). Estatísticas ausentes são NaN.
+
+def compute_suggested_prices(total_cost: np.ndarray,
+                             official_avg: np.ndarray,
+                             gray_avg: np.ndarray,
+                             margins: Dict[str, float] = None) -> Dict[str, np.ndarray]:
+    """Preços sugeridos por estratégia (NaN quando falta a referência de mercado)"""
+    margins = margins or {'competitive': 0.30, 'premium': 0.50, 'aggressive': 0.20}
+    suggestions = {name: total_cost * (1 + margin) for name, margin in margins.items()}
+    suggestions['market_based'] = official_avg * 0.85 * np.ones_like(total_cost)
+    suggestions['gray_competitive'] = gray_avg * 1.10 * np.ones_like(total_cost)
+    return suggestions
+
+def compute_opportunity_scores(source_price_usd: np.ndarray,
+                               total_cost: np.ndarray,
+                               official_avg: np.ndarray,
+                               gray_avg: np.ndarray,
+                               official_count: np.ndarray) -> np.ndarray:
+    """Score de oportunidade (0-10), mesmas faixas de _calculate_opportunity_score"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        margin = (official_avg - total_cost) / total_cost
+        margin_score = np.select(
+            [margin > 1.0, margin > 0.5, margin > 0.3, margin > 0.1],
+            [4, 3, 2, 1],
+            default=0
+        )
+        gray_score = np.select(
+            [total_cost < gray_avg * 0.8, total_cost < gray_avg],
+            [3, 2],
+            default=0
+        )
+    price_score = np.select([source_price_usd < 100, source_price_usd < 300], [2, 1], default=0)
+    data_score = np.where(official_count > 0, 1, 0)
+
+    return np.minimum(margin_score + gray_score + price_score + data_score, 10).astype(float)
+
+def compute_market_positions(total_cost: np.ndarray, official_avg: np.ndarray) -> np.ndarray:
+    """Posicionamento de mercado ("budget", "competitive", "premium" ou "unknown")"""
+    with np.errstate(invalid='ignore'):
+        return np.select(
+            [np.isnan(official_avg), total_cost * 1.3 < official_avg * 0.7, total_cost * 1.3 < official_avg],
+            ['unknown', 'budget', 'competitive'],
+            default='premium'
+        )
+
 class MarketAnalyzer:
     """Analisador de mercado brasileiro"""
     
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
-        
+    def __init__(self, exchange_rate_fetcher: Optional[Callable[[], Optional[float]]] = None):
         # Sites para busca de preços oficiais
         self.official_sites = [
             'mercadolivre.com.br',
@@ -81,6 +115,21 @@ class MarketAnalyzer:
             'shopee.com.br',
             'wish.com'
         ]
+        
+        # Adaptadores dos marketplaces oficiais consultados em paralelo
+        self.official_sources = build_sources(self.official_sites)
+        self.price_cache = MarketPriceCache()
+        self.source_executor = MarketSourceExecutor(self.official_sources, cache=self.price_cache)
+        
+        # Só anúncios que correspondem ao produto entram nas estatísticas
+        self.matcher = ProductMatcher()
+        
+        # Série temporal dos preços observados por (produto, fonte)
+        self.price_history = PriceSeriesStore()
+        
+        # Modelo de custos de importação e cotação atual do dólar
+        self.cost_model = ImportCostModel()
+        self.exchange_rates = ExchangeRateProvider(exchange_rate_fetcher)
     
     def analyze_product_market(self, product_data: Dict[str, Any]) -> MarketAnalysis:
         """
@@ -90,93 +139,371 @@ class MarketAnalyzer:
             logger.info(f"Analyzing market for: {product_data.get('nome', 'Unknown')}")
             
             product_name = product_data.get('nome', '')
-            source_price_usd = product_data.get('preco_usd', 0)
-            source_price_brl = product_data.get('preco_brl', 0)
             
-            # Busca preços no mercado oficial
-            official_prices = self._search_official_market(product_name)
+            # Busca preços no mercado oficial (apenas anúncios do mesmo produto)
+            official_prices = self.matcher.filter_prices(
+                product_data,
+                self._search_official_market(product_name)
+            )
+            
+            self._record_price_history(product_data, official_prices)
             
             # Busca preços no mercado cinza
             gray_prices = self._search_gray_market(product_name)
             
-            # Calcula estatísticas de preços
-            official_stats = self._calculate_price_stats(official_prices)
-            gray_stats = self._calculate_price_stats(gray_prices)
-            
-            # Estima custos de importação
-            import_costs = self._estimate_import_costs(source_price_usd)
-            
-            # Sugere preços de venda
-            suggested_prices = self._suggest_selling_prices(
-                source_price_usd, 
-                import_costs,
-                official_stats,
-                gray_stats
-            )
-            
-            # Calcula score de oportunidade
-            opportunity_score = self._calculate_opportunity_score(
-                source_price_usd,
-                import_costs,
-                official_stats,
-                gray_stats
-            )
-            
-            # Determina posicionamento de mercado
-            market_position = self._determine_market_position(
-                import_costs['total_cost'],
-                official_stats,
-                gray_stats
+            return self._build_analysis(
+                product_data,
+                official_prices,
+                gray_prices,
+                self._product_import_costs(product_data)
             )
             
-            # Gera recomendações
-            recommendations = self._generate_recommendations(
-                opportunity_score,
-                market_position,
+        except Exception as e:
+            logger.error(f"Error analyzing market: {str(e)}")
+            return None
+    
+    def analyze_product_market_stream(self, product_data: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """
+        Análise incremental: a cada fonte oficial que responde (dentro do prazo
+        do executor) as estatísticas, o score e as recomendações são
+        recalculados com os preços acumulados. Retorna dicionários com a fonte,
+        o progresso e o MarketAnalysis parcial; o último tem done=True.
+        """
+        product_name = product_data.get('nome', '')
+        logger.info(f"Streaming market analysis for: {product_name or 'Unknown'}")
+        
+        # Custos e mercado cinza não dependem das fontes: calculados uma vez
+        import_costs = self._product_import_costs(product_data)
+        gray_prices = self._search_gray_market(product_name)
+        total_sources = len(self.official_sources)
+        
+        official_prices: List[MarketPrice] = []
+        completed = []
+        for source_name, prices in self.source_executor.iter_collect(self._clean_product_name(product_name)):
+            official_prices.extend(self.matcher.filter_prices(product_data, prices))
+            completed.append(source_name)
+            yield {
+                'source': source_name,
+                'sources_done': len(completed),
+                'sources_total': total_sources,
+                'done': False,
+                'exchange_rate': import_costs['exchange_rate'],
+                'analysis': self._build_analysis(product_data, official_prices, gray_prices, import_costs)
+            }
+        
+        self._record_price_history(product_data, official_prices)
+        
+        yield {
+            'source': None,
+            'sources_done': len(completed),
+            'sources_total': total_sources,
+            # Fontes que estouraram o prazo ficam de fora
+            'missing_sources': [s.name for s in self.official_sources if s.name not in completed],
+            'done': True,
+            'exchange_rate': import_costs['exchange_rate'],
+            'analysis': self._build_analysis(product_data, official_prices, gray_prices, import_costs)
+        }
+    
+    def _product_import_costs(self, product_data: Dict[str, Any]) -> Dict[str, float]:
+        """Custos de importação com a cotação, categoria e peso do produto"""
+        return self._estimate_import_costs(
+            product_data.get('preco_usd', 0),
+            self.exchange_rates.for_product(product_data),
+            category=product_data.get('categoria'),
+            weight_g=parse_weight_g(product_data.get('peso_bruto'))
+        )
+    
+    def _build_analysis(self,
+                        product_data: Dict[str, Any],
+                        official_prices: List[MarketPrice],
+                        gray_prices: List[MarketPrice],
+                        import_costs: Dict[str, float]) -> MarketAnalysis:
+        """Monta o MarketAnalysis a partir dos preços coletados e dos custos"""
+        product_name = product_data.get('nome', '')
+        source_price_usd = product_data.get('preco_usd', 0)
+        source_price_brl = product_data.get('preco_brl', 0)
+        
+        # Calcula estatísticas de preços
+        official_stats = self._calculate_price_stats(official_prices)
+        gray_stats = self._calculate_price_stats(gray_prices)
+        
+        # Sugere preços de venda
+        suggested_prices = self._suggest_selling_prices(
+            source_price_usd, 
+            import_costs,
+            official_stats,
+            gray_stats
+        )
+        
+        # Calcula score de oportunidade
+        opportunity_score = self._calculate_opportunity_score(
+            source_price_usd,
+            import_costs,
+            official_stats,
+            gray_stats
+        )
+        
+        # Determina posicionamento de mercado
+        market_position = self._determine_market_position(
+            import_costs['total_cost'],
+            official_stats,
+            gray_stats
+        )
+        
+        # Gera recomendações
+        recommendations = self._generate_recommendations(
+            opportunity_score,
+            market_position,
+            official_stats,
+            gray_stats,
+            import_costs
+        )
+        
+        return MarketAnalysis(
+            product_name=product_name,
+            source_price_usd=source_price_usd,
+            source_price_brl=source_price_brl,
+            official_market=official_prices,
+            gray_market=gray_prices,
+            official_min_price=official_stats.get('min'),
+            official_max_price=official_stats.get('max'),
+            official_avg_price=official_stats.get('avg'),
+            gray_min_price=gray_stats.get('min'),
+            gray_max_price=gray_stats.get('max'),
+            gray_avg_price=gray_stats.get('avg'),
+            import_cost_estimate=import_costs['import_cost'],
+            total_cost_estimate=import_costs['total_cost'],
+            suggested_prices=suggested_prices,
+            opportunity_score=opportunity_score,
+            market_position=market_position,
+            recommendations=recommendations
+        )
+    
+    def analyze_many(self, products: List[Dict[str, Any]]) -> Tuple[pd.DataFrame, List[MarketAnalysis]]:
+        """
+        Analisa o mercado de vários produtos de uma vez.
+        
+        Os preços de mercado são coletados em paralelo (uma consulta por nome
+        limpo distinto, todas sob um único prazo global) e custos, preços sugeridos, score e posicionamento são
+        calculados como operações de coluna. Retorna um DataFrame (uma linha por
+        produto) e os objetos MarketAnalysis equivalentes.
+        """
+        if not products:
+            return pd.DataFrame(), []
+        
+        logger.info(f"Analyzing market for {len(products)} products")
+        
+        names = [p.get('nome', '') for p in products]
+        queries = sorted({self._clean_product_name(name) for name in names})
+        
+        # Todas as (fonte, consulta) de uma vez, sob o prazo único do executor
+        official_by_query = self.source_executor.collect_many(queries)
+        gray_by_name = {name: self._search_gray_market(name) for name in set(names)}
+        
+        official_prices = [
+            self.matcher.filter_prices(product, official_by_query.get(self._clean_product_name(name), []))
+            for product, name in zip(products, names)
+        ]
+        gray_prices = [gray_by_name[name] for name in names]
+        
+        for product, prices in zip(products, official_prices):
+            self._record_price_history(product, prices)
+        
+        df = self._market_stats_frame(products, official_prices, gray_prices)
+        
+        # Custos, preços sugeridos, score e posicionamento vetorizados
+        costs = self.cost_model.evaluate_products(
+            products,
+            [self.exchange_rates.for_product(p) for p in products]
+        )
+        for name, values in costs.items():
+            df[name if name != 'price_brl' else 'converted_price_brl'] = values
+        
+        suggestions = compute_suggested_prices(
+            df['total_cost'].to_numpy(),
+            df['official_avg'].to_numpy(),
+            df['gray_avg'].to_numpy()
+        )
+        for name, values in suggestions.items():
+            df[f"suggested_{name}"] = values
+        
+        df['opportunity_score'] = compute_opportunity_scores(
+            df['source_price_usd'].to_numpy(),
+            df['total_cost'].to_numpy(),
+            df['official_avg'].to_numpy(),
+            df['gray_avg'].to_numpy(),
+            df['official_count'].to_numpy()
+        )
+        df['market_position'] = compute_market_positions(
+            df['total_cost'].to_numpy(),
+            df['official_avg'].to_numpy()
+        )
+        
+        analyses = [
+            self._analysis_from_row(row, official_prices[index], gray_prices[index])
+            for index, row in enumerate(df.to_dict('records'))
+        ]
+        
+        return df, analyses
+    
+    def cached_market_frame(self, products: List[Dict[str, Any]]) -> pd.DataFrame:
+        """
+        Estatísticas de mercado dos produtos usando apenas os preços já em cache
+        (inclusive vencidos), sem nenhuma requisição de rede
+        """
+        if not products:
+            return pd.DataFrame()
+        
+        official_prices = []
+        for product in products:
+            query = self._clean_product_name(product.get('nome', ''))
+            prices = []
+            for source in self.official_sources:
+                entry = self.price_cache.get(source.name, query)
+                if entry is not None:
+                    prices.extend(entry[0])
+            official_prices.append(self.matcher.filter_prices(product, prices))
+        
+        gray_prices = [self._search_gray_market(p.get('nome', '')) for p in products]
+        return self._market_stats_frame(products, official_prices, gray_prices)
+    
+    def sensitivity_analysis(self,
+                             products: List[Dict[str, Any]],
+                             exchange_rates: Optional[List[float]] = None,
+                             tax_rates: Optional[List[float]] = None,
+                             margins: Optional[List[float]] = None) -> Dict[str, Any]:
+        """
+        Cenários de cotação x alíquota x margem para todos os produtos, a partir
+        dos preços de mercado em cache. Os custos de cada cenário vêm do
+        ImportCostModel com a cotação e a alíquota do cenário (sem
+        `tax_rates`, as alíquotas configuradas); ver sensitivity.run_sensitivity.
+        """
+        # Importado aqui: sensitivity usa as funções vetorizadas deste módulo
+        from .sensitivity import run_sensitivity, scenario_costs, exchange_rate_scenarios, DEFAULT_MARGIN_SCENARIOS
+        
+        df = self.cached_market_frame(products)
+        if df.empty:
+            return {}
+        
+        if exchange_rates is None:
+            exchange_rates = exchange_rate_scenarios(self.exchange_rates.current())
+        if tax_rates is None:
+            tax_rates = [None]
+        if margins is None:
+            margins = DEFAULT_MARGIN_SCENARIOS
+        
+        return run_sensitivity(
+            df['source_price_usd'].to_numpy(),
+            df['official_avg'].to_numpy(),
+            df['gray_avg'].to_numpy(),
+            df['official_count'].to_numpy(),
+            scenario_costs(self.cost_model, products, exchange_rates, tax_rates),
+            exchange_rates,
+            tax_rates,
+            margins
+        )
+    
+    def _market_stats_frame(self,
+                            products: List[Dict[str, Any]],
+                            official_prices: List[List[MarketPrice]],
+                            gray_prices: List[List[MarketPrice]]) -> pd.DataFrame:
+        """DataFrame com preços de origem e estatísticas de mercado por produto"""
+        names = [p.get('nome', '') for p in products]
+        df = pd.DataFrame({
+            'product_name': names,
+            'source_price_usd': [float(p.get('preco_usd') or 0) for p in products],
+            'source_price_brl': [float(p.get('preco_brl') or 0) for p in products],
+        })
+        
+        # Estatísticas de mercado agregadas em formato longo (linha, mercado, preço)
+        long_prices = pd.DataFrame(
+            [(row, 'official', price.price_brl) for row, prices in enumerate(official_prices) for price in prices] +
+            [(row, 'gray', price.price_brl) for row, prices in enumerate(gray_prices) for price in prices],
+            columns=['row', 'market', 'price_brl']
+        )
+        stats = long_prices.groupby(['row', 'market'])['price_brl'].agg(['min', 'max', 'mean', 'count'])
+        stats = stats.rename(columns={'mean': 'avg'}).unstack('market')
+        for market in ('official', 'gray'):
+            for stat in ('min', 'max', 'avg', 'count'):
+                column = stats[(stat, market)] if (stat, market) in stats.columns else pd.Series(dtype=float)
+                df[f"{market}_{stat}"] = column.reindex(df.index).to_numpy(dtype=float)
+        df[['official_count', 'gray_count']] = df[['official_count', 'gray_count']].fillna(0)
+        
+        return df
+    
+    def get_price_history(self,
+                          product_data: Dict[str, Any],
+                          start: Any,
+                          end: Any = None,
+                          resolution: str = 'daily') -> Dict[str, Dict[str, List[Any]]]:
+        """
+        Histórico de preços do produto por fonte no intervalo pedido
+        """
+        product_key = series_product_key(product_data)
+        return {
+            source: self.price_history.query(product_key, source, start, end, resolution)
+            for source in self.price_history.sources(product_key)
+        }
+    
+    def _record_price_history(self, product_data: Dict[str, Any], official_prices: List[MarketPrice]):
+        """Registra os preços observados sem interromper a análise em caso de falha"""
+        try:
+            self.price_history.record_market_prices(product_data, official_prices)
+        except Exception as e:
+            logger.warning(f"Error recording price history: {str(e)}")
+    
+    def _analysis_from_row(self,
+                           row: Dict[str, Any],
+                           official_prices: List[MarketPrice],
+                           gray_prices: List[MarketPrice]) -> MarketAnalysis:
+        """Monta o MarketAnalysis de uma linha do DataFrame do modo em lote"""
+        value = lambda v: None if v is None or (isinstance(v, float) and np.isnan(v)) else v
+        
+        official_stats = {'min': value(row['official_min']), 'max': value(row['official_max']),
+                          'avg': value(row['official_avg']), 'count': int(row['official_count'])}
+        gray_stats = {'min': value(row['gray_min']), 'max': value(row['gray_max']),
+                      'avg': value(row['gray_avg']), 'count': int(row['gray_count'])}
+        import_costs = {'import_cost': row['import_cost'], 'total_cost': row['total_cost']}
+        
+        suggested_prices = {
+            key[len('suggested_'):]: row[key]
+            for key in row if key.startswith('suggested_') and value(row[key]) is not None
+        }
+        
+        return MarketAnalysis(
+            product_name=row['product_name'],
+            source_price_usd=row['source_price_usd'],
+            source_price_brl=row['source_price_brl'],
+            official_market=official_prices,
+            gray_market=gray_prices,
+            official_min_price=official_stats['min'],
+            official_max_price=official_stats['max'],
+            official_avg_price=official_stats['avg'],
+            gray_min_price=gray_stats['min'],
+            gray_max_price=gray_stats['max'],
+            gray_avg_price=gray_stats['avg'],
+            import_cost_estimate=row['import_cost'],
+            total_cost_estimate=row['total_cost'],
+            suggested_prices=suggested_prices,
+            opportunity_score=row['opportunity_score'],
+            market_position=row['market_position'],
+            recommendations=self._generate_recommendations(
+                row['opportunity_score'],
+                row['market_position'],
                 official_stats,
                 gray_stats,
                 import_costs
             )
-            
-            return MarketAnalysis(
-                product_name=product_name,
-                source_price_usd=source_price_usd,
-                source_price_brl=source_price_brl,
-                official_market=official_prices,
-                gray_market=gray_prices,
-                official_min_price=official_stats.get('min'),
-                official_max_price=official_stats.get('max'),
-                official_avg_price=official_stats.get('avg'),
-                gray_min_price=gray_stats.get('min'),
-                gray_max_price=gray_stats.get('max'),
-                gray_avg_price=gray_stats.get('avg'),
-                import_cost_estimate=import_costs['import_cost'],
-                total_cost_estimate=import_costs['total_cost'],
-                suggested_prices=suggested_prices,
-                opportunity_score=opportunity_score,
-                market_position=market_position,
-                recommendations=recommendations
-            )
-            
-        except Exception as e:
-            logger.error(f"Error analyzing market: {str(e)}")
-            return None
+        )
     
     def _search_official_market(self, product_name: str) -> List[MarketPrice]:
         """
-        Busca preços no mercado oficial brasileiro
+        Busca preços no mercado oficial brasileiro (todas as fontes em paralelo,
+        limitado pelo prazo do executor)
         """
-        prices = []
-        
         try:
-            # Busca no Mercado Livre (principal)
-            ml_prices = self._search_mercadolivre(product_name)
-            prices.extend(ml_prices)
-            
-            # Busca em outros sites (simulado por enquanto)
-            # Em implementação real, você faria scraping de cada site
-            
-            return prices[:10]  # Limita a 10 resultados
+            search_query = self._clean_product_name(product_name)
+            return self.source_executor.collect(search_query)
             
         except Exception as e:
             logger.error(f"Error searching official market: {str(e)}")
@@ -202,64 +529,6 @@ class MarketAnalyzer:
             logger.error(f"Error searching gray market: {str(e)}")
             return []
     
-    def _search_mercadolivre(self, product_name: str) -> List[MarketPrice]:
-        """
-        Busca específica no Mercado Livre
-        """
-        prices = []
-        
-        try:
-            # Limpa o nome do produto para busca
-            search_query = self._clean_product_name(product_name)
-            
-            # URL de busca do Mercado Livre
-            url = f"https://lista.mercadolivre.com.br/{search_query.replace(' ', '-')}"
-            
-            response = self.session.get(url, timeout=10)
-            
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                # Extrai produtos (estrutura simplificada)
-                products = soup.find_all('div', class_='ui-search-result__wrapper')
-                
-                for product in products[:5]:  # Primeiros 5 resultados
-                    try:
-                        # Extrai preço
-                        price_elem = product.find('span', class_='price-tag-fraction')
-                        if price_elem:
-                            price_text = price_elem.get_text().strip()
-                            price = float(re.sub(r'[^\d,]', '', price_text).replace(',', '.'))
-                            
-                            # Extrai título
-                            title_elem = product.find('h2', class_='ui-search-item__title')
-                            title = title_elem.get_text().strip() if title_elem else "Produto"
-                            
-                            # Extrai URL
-                            link_elem = product.find('a', class_='ui-search-link')
-                            product_url = link_elem.get('href') if link_elem else ""
-                            
-                            prices.append(MarketPrice(
-                                source="Mercado Livre",
-                                price_brl=price,
-                                url=product_url,
-                                seller="Mercado Livre",
-                                condition="new",
-                                availability="in_stock",
-                                found_at=datetime.now()
-                            ))
-                            
-                    except Exception as e:
-                        logger.warning(f"Error parsing ML product: {str(e)}")
-                        continue
-            
-            time.sleep(1)  # Rate limiting
-            
-        except Exception as e:
-            logger.error(f"Error searching Mercado Livre: {str(e)}")
-        
-        return prices
-    
     def _estimate_gray_market_prices(self, product_name: str) -> List[MarketPrice]:
         """
         Estima preços do mercado cinza baseado em padrões conhecidos
@@ -307,34 +576,20 @@ class MarketAnalyzer:
             'count': len(price_values)
         }
     
-    def _estimate_import_costs(self, price_usd: float, exchange_rate: float = None) -> Dict[str, float]:
+    def _estimate_import_costs(self,
+                               price_usd: float,
+                               exchange_rate: float = None,
+                               category: Optional[str] = None,
+                               weight_g: Optional[float] = None) -> Dict[str, float]:
         """
         Estima custos de importação usando cotação real ou estimada
         """
-        # Usa cotação fornecida ou estimativa
+        # Usa cotação fornecida ou a atual (com fallback)
         if exchange_rate is None:
-            exchange_rate = 5.5  # Fallback
+            exchange_rate = self.exchange_rates.current()
         
-        # Preço em BRL
-        price_brl = price_usd * exchange_rate
-        
-        # Impostos e taxas (estimativa)
-        import_tax = price_brl * 0.60  # 60% de impostos
-        shipping = 50  # Frete estimado
-        handling = 30  # Taxa de manuseio
-        
-        import_cost = import_tax + shipping + handling
-        total_cost = price_brl + import_cost
-        
-        return {
-            'exchange_rate': exchange_rate,
-            'price_brl': price_brl,
-            'import_tax': import_tax,
-            'shipping': shipping,
-            'handling': handling,
-            'import_cost': import_cost,
-            'total_cost': total_cost
-        }
+        # Regime, frete por peso e regras da categoria vêm do modelo de custos
+        return self.cost_model.estimate(price_usd or 0, exchange_rate, category, weight_g)
     
     def _suggest_selling_prices(self, 
                               source_price_usd: float,
@@ -0,0 +1,261 @@
+"""
+Cache de preços de mercado por (fonte, consulta normalizada) com TTL por fonte,
+stale-while-revalidate e limites de memória/disco
+"""
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from dataclasses import asdict
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Tuple
+from .market_sources import MarketPrice
+
+logger = logging.getLogger(__name__)
+
+def normalize_query(query: str) -> str:
+    """Remove acentos, caixa e espaços repetidos da consulta"""
+    text = unicodedata.normalize('NFKD', query or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r'\s+', ' ', text).strip().lower()
+
+class MarketPriceCache:
+    """
+    Entradas dentro do TTL da fonte são frescas. Depois disso continuam sendo
+    servidas por até `stale_ttl` segundos enquanto são atualizadas em segundo
+    plano (stale-while-revalidate). A memória é limitada por `max_entries`
+    (LRU) e o disco, quando habilitado, por `max_disk_bytes`. Resultados
+    vazios ficam em cache por `negative_ttl`, para que consultas sem
+    resultado não repitam o scraping a cada requisição.
+    """
+
+    def __init__(self,
+                 default_ttl: float = None,
+                 stale_ttl: float = None,
+                 max_entries: int = None,
+                 cache_dir: Optional[str] = None,
+                 max_disk_bytes: int = None,
+                 negative_ttl: float = None):
+        self.default_ttl = default_ttl if default_ttl is not None else float(os.getenv('MARKET_CACHE_TTL', 3600))
+        self.stale_ttl = stale_ttl if stale_ttl is not None else float(os.getenv('MARKET_CACHE_STALE_TTL', 86400))
+        self.max_entries = max_entries or int(os.getenv('MARKET_CACHE_MAX_ENTRIES', 4096))
+        self.cache_dir = cache_dir if cache_dir is not None else os.getenv('MARKET_CACHE_DIR')
+        self.max_disk_bytes = max_disk_bytes or int(os.getenv('MARKET_CACHE_MAX_DISK_MB', 50)) * 1024 * 1024
+        self.negative_ttl = negative_ttl if negative_ttl is not None else float(os.getenv('MARKET_CACHE_NEGATIVE_TTL', 120))
+
+        # chave -> (gravado_em (epoch), ttl, preços)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, float, List[MarketPrice]]]" = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+        self._disk_bytes = 0
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._disk_bytes = sum(size for _, size, _ in self._disk_files())
+
+    def get(self, source: str, query: str) -> Optional[Tuple[List[MarketPrice], bool]]:
+        """
+        Retorna (preços, fresco) ou None se não houver entrada utilizável
+        """
+        key = (source, normalize_query(query))
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is None:
+            entry = self._load_from_disk(key)
+            if entry is not None:
+                with self._lock:
+                    self._store(key, entry)
+
+        result = None
+        if entry is not None:
+            stored_at, ttl, prices = entry
+            age = time.time() - stored_at
+            if age <= ttl + self.stale_ttl:
+                result = (prices, age <= ttl)
+
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            elif result[1]:
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+
+        return result
+
+    def set(self, source: str, query: str, prices: List[MarketPrice], ttl: float = None):
+        key = (source, normalize_query(query))
+        entry = (time.time(), ttl if ttl is not None else self.default_ttl, prices)
+
+        with self._lock:
+            self._store(key, entry)
+
+        self._save_to_disk(key, entry)
+
+    def set_empty(self, source: str, query: str):
+        """
+        Guarda um resultado vazio por negative_ttl. Não substitui uma entrada
+        com preços: resultado vazio costuma ser falha de scraping.
+        """
+        key = (source, normalize_query(query))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2]:
+                return
+        self.set(source, query, [], ttl=self.negative_ttl)
+
+    def preload(self) -> int:
+        """
+        Carrega em memória as entradas ainda utilizáveis do disco (as
+        max_entries mais recentes). Chamado antes do fork dos workers
+        para que todos compartilhem o cache aquecido. Retorna quantas carregou.
+        """
+        if not self.cache_dir:
+            return 0
+
+        now = time.time()
+        loaded = 0
+        # Da mais antiga para a mais recente: as recentes terminam no fim da ordem LRU
+        for _, _, path in sorted(self._disk_files())[-self.max_entries:]:
+            item = self._read_disk_entry(path)
+            if item is None:
+                continue
+            key, entry = item
+            stored_at, ttl, _ = entry
+            if now - stored_at > ttl + self.stale_ttl:
+                continue
+            with self._lock:
+                if key not in self._entries:
+                    self._store(key, entry)
+                    loaded += 1
+
+        logger.info(f"Market cache preloaded {loaded} entries from disk")
+        return loaded
+
+    def begin_refresh(self, source: str, query: str) -> bool:
+        """Marca a entrada como em atualização; False se já houver uma em andamento"""
+        key = (source, normalize_query(query))
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def end_refresh(self, source: str, query: str):
+        with self._lock:
+            self._refreshing.discard((source, normalize_query(query)))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'refreshing': len(self._refreshing)
+            }
+
+    def _store(self, key: Tuple[str, str], entry: Tuple[float, float, List[MarketPrice]]):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _disk_path(self, key: Tuple[str, str]) -> str:
+        digest = hashlib.sha1('\x00'.join(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def _save_to_disk(self, key: Tuple[str, str], entry: Tuple[float, float, List[MarketPrice]]):
+        if not self.cache_dir:
+            return
+
+        stored_at, ttl, prices = entry
+        payload = {
+            'source': key[0],
+            'query': key[1],
+            'stored_at': stored_at,
+            'ttl': ttl,
+            'prices': [
+                {**asdict(p), 'found_at': p.found_at.isoformat() if p.found_at else None}
+                for p in prices
+            ]
+        }
+
+        try:
+            with self._disk_lock:
+                path = self._disk_path(key)
+                previous_size = os.path.getsize(path) if os.path.exists(path) else 0
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(payload, f, ensure_ascii=False)
+                os.replace(tmp_path, path)
+
+                self._disk_bytes += os.path.getsize(path) - previous_size
+                if self._disk_bytes > self.max_disk_bytes:
+                    self._enforce_disk_limit()
+        except OSError as e:
+            logger.warning(f"Error writing market cache entry: {str(e)}")
+
+    def _load_from_disk(self, key: Tuple[str, str]) -> Optional[Tuple[float, float, List[MarketPrice]]]:
+        if not self.cache_dir:
+            return None
+
+        loaded = self._read_disk_entry(self._disk_path(key))
+        return loaded[1] if loaded else None
+
+    def _read_disk_entry(self, path: str) -> Optional[Tuple[Tuple[str, str], Tuple[float, float, List[MarketPrice]]]]:
+        try:
+            with open(path, encoding='utf-8') as f:
+                payload = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+        prices = []
+        for item in payload.get('prices', []):
+            if item.get('found_at'):
+                item['found_at'] = datetime.fromisoformat(item['found_at'])
+            prices.append(MarketPrice(**item))
+        return (payload['source'], payload['query']), (payload['stored_at'], payload['ttl'], prices)
+
+    def _disk_files(self) -> List[Tuple[float, int, str]]:
+        """(mtime, tamanho, caminho) dos arquivos do cache em disco"""
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def _enforce_disk_limit(self):
+        """Remove os arquivos mais antigos até caber no limite de disco"""
+        files = self._disk_files()
+        total = sum(size for _, size, _ in files)
+
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                continue
+
+        self._disk_bytes = total
@@ -0,0 +1,340 @@
+"""
+Fontes de preço do mercado brasileiro (adaptadores por marketplace) e executor
+que consulta todas as fontes em paralelo sob um prazo único
+"""
+import os
+import re
+import time
+import logging
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Iterable, Iterator, Tuple
+import requests
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+@dataclass
+class MarketPrice:
+    """Preço encontrado no mercado"""
+    source: str
+    price_brl: float
+    url: str
+    seller: str
+    condition: str  # "new", "used", "refurbished"
+    availability: str  # "in_stock", "out_of_stock", "limited"
+    shipping_cost: Optional[float] = None
+    found_at: datetime = None
+    title: Optional[str] = None
+
+class MarketSource(ABC):
+    """Adaptador de um marketplace: busca um termo e retorna os preços encontrados"""
+
+    name: str = ''
+    domain: str = ''
+    max_results: int = 5
+    cache_ttl: float = 3600  # segundos em que um resultado é considerado fresco
+
+    def __init__(self, timeout: float = None, min_interval: float = None):
+        self.session = requests.Session()
+        self.session.headers.update({'User-Agent': USER_AGENT})
+        self.timeout = timeout if timeout is not None else float(os.getenv('MARKET_SOURCE_TIMEOUT', 10))
+        # Intervalo mínimo entre requisições à mesma fonte (rate limiting)
+        self.min_interval = min_interval if min_interval is not None else float(os.getenv('SCRAPING_DELAY', 1))
+        self._last_request = 0.0
+        self._throttle_lock = threading.Lock()
+
+    @abstractmethod
+    def search(self, query: str) -> List[MarketPrice]:
+        """Busca preços para o termo informado"""
+        pass
+
+    def _get(self, url: str) -> Optional[requests.Response]:
+        """GET respeitando o intervalo mínimo da fonte"""
+        # Reserva o próximo horário livre sob o lock e espera fora dele:
+        # requisições concorrentes saem espaçadas sem bloquear umas às outras
+        with self._throttle_lock:
+            slot = max(time.monotonic(), self._last_request + self.min_interval)
+            self._last_request = slot
+        wait = slot - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+
+        response = self.session.get(url, timeout=self.timeout)
+        if response.status_code != 200:
+            logger.warning(f"{self.name} returned status {response.status_code} for {url}")
+            return None
+        return response
+
+    @staticmethod
+    def _parse_price(text: Any) -> Optional[float]:
+        """Converte "1.299,90" / "1299.90" / 1299.9 em float"""
+        if isinstance(text, (int, float)):
+            return float(text)
+
+        text = re.sub(r'[^\d,.]', '', str(text or ''))
+        if not text:
+            return None
+        if ',' in text:
+            text = text.replace('.', '').replace(',', '.')
+        elif re.fullmatch(r'\d{1,3}(\.\d{3})+', text):
+            text = text.replace('.', '')
+
+        try:
+            return float(text)
+        except ValueError:
+            return None
+
+class MercadoLivreSource(MarketSource):
+    """
+    Busca no Mercado Livre (listagem HTML). Aceita os cartões "poly-card" da
+    listagem atual e o layout clássico ui-search-result; o preço é o atual do
+    cartão, não o riscado ("de R$ ...") das promoções.
+    """
+
+    name = 'Mercado Livre'
+    domain = 'mercadolivre.com.br'
+    cache_ttl = 1800
+
+    CARD_SELECTORS = ('li.ui-search-layout__item', 'div.ui-search-result__wrapper')
+    TITLE_SELECTOR = '.poly-component__title, .ui-search-item__title'
+    LINK_SELECTOR = 'a.poly-component__title, a.ui-search-link, a.ui-search-item__group__element'
+
+    def search(self, query: str) -> List[MarketPrice]:
+        prices = []
+
+        try:
+            url = f"https://lista.mercadolivre.com.br/{query.replace(' ', '-')}"
+            response = self._get(url)
+            if response is None:
+                return prices
+            prices = self.parse_listing(response.content, url)
+
+        except Exception as e:
+            logger.error(f"Error searching Mercado Livre: {str(e)}")
+
+        return prices
+
+    def parse_listing(self, html: Any, url: str = '') -> List[MarketPrice]:
+        """Preços dos primeiros cartões da página de resultados"""
+        soup = BeautifulSoup(html, 'html.parser')
+
+        cards = []
+        for selector in self.CARD_SELECTORS:
+            cards = soup.select(selector)
+            if cards:
+                break
+        if not cards:
+            # Sem cartões o resultado vira cache negativo: registra para que
+            # uma mudança de layout não passe despercebida
+            logger.warning(f"{self.name}: no result cards in {url} (no results or markup changed)")
+            return []
+
+        prices = []
+        for card in cards[:self.max_results]:
+            try:
+                price = self._card_price(card)
+                if price is None:
+                    continue
+
+                title_elem = card.select_one(self.TITLE_SELECTOR)
+                link_elem = card.select_one(self.LINK_SELECTOR)
+
+                prices.append(MarketPrice(
+                    source=self.name,
+                    price_brl=price,
+                    url=link_elem.get('href', '') if link_elem else '',
+                    seller=self.name,
+                    condition="new",
+                    availability="in_stock",
+                    found_at=datetime.now(),
+                    title=title_elem.get_text(' ', strip=True) if title_elem else "Produto"
+                ))
+
+            except Exception as e:
+                logger.warning(f"Error parsing ML product: {str(e)}")
+                continue
+
+        return prices
+
+    def _card_price(self, card) -> Optional[float]:
+        """Preço atual do cartão (reais + centavos)"""
+        amount = card.select_one('.poly-price__current .andes-money-amount, .ui-search-price__second-line .andes-money-amount')
+        if amount is None:
+            # Primeiro valor que não seja o preço anterior riscado (<s>)
+            amount = next(
+                (a for a in card.select('.andes-money-amount') if a.name != 's' and a.find_parent('s') is None),
+                None
+            )
+        if amount is None:
+            legacy = card.select_one('.price-tag-fraction')
+            return self._parse_price(legacy.get_text(strip=True)) if legacy else None
+
+        fraction = amount.select_one('.andes-money-amount__fraction')
+        if fraction is None:
+            return None
+        value = self._parse_price(fraction.get_text(strip=True))
+        cents = amount.select_one('.andes-money-amount__cents')
+        if value is not None and cents is not None and cents.get_text(strip=True).isdigit():
+            value += int(cents.get_text(strip=True)) / 100
+        return value
+
+# Domínio -> adaptador. Só fontes com o parser coberto por teste entram aqui;
+# os demais domínios configurados ficam sem consulta (aviso em build_sources)
+SOURCE_REGISTRY = {
+    source.domain: source
+    for source in (MercadoLivreSource,)
+}
+
+def build_sources(domains: List[str]) -> List[MarketSource]:
+    """Instancia os adaptadores dos domínios configurados"""
+    sources = []
+    missing = []
+    for domain in domains:
+        source_class = SOURCE_REGISTRY.get(domain)
+        if source_class is None:
+            missing.append(domain)
+            continue
+        sources.append(source_class())
+    if missing:
+        logger.warning(f"No market source adapter for {', '.join(missing)}")
+    return sources
+
+class MarketSourceExecutor:
+    """
+    Consulta todas as fontes em paralelo sob um prazo global. Os resultados são
+    entregues à medida que cada fonte responde; fontes que estouram o prazo
+    são descartadas. Com um cache, resultados em cache são entregues na hora e
+    os vencidos são atualizados em segundo plano. Consultas simultâneas à mesma
+    (fonte, consulta) sem cache compartilham uma única busca.
+    """
+
+    def __init__(self, sources: List[MarketSource], deadline: float = None, max_workers: int = None, cache=None):
+        self.sources = sources
+        self.cache = cache
+        self.deadline = deadline if deadline is not None else float(os.getenv('MARKET_DEADLINE', 8))
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers or max(len(sources), 1) * 8,
+            thread_name_prefix='market-source'
+        )
+        # (fonte, consulta) -> busca em andamento
+        self._inflight: Dict[Tuple[str, str], Future] = {}
+        self._inflight_lock = threading.Lock()
+
+    def iter_collect(self, query: str) -> Iterator[Tuple[str, List[MarketPrice]]]:
+        """Retorna (fonte, preços) conforme as fontes terminam dentro do prazo"""
+        cached = []
+        futures = {}
+
+        for source in self.sources:
+            prices, future = self._start(source, query)
+            if future is not None:
+                futures[future] = source
+            else:
+                cached.append((source.name, prices))
+
+        yield from cached
+
+        try:
+            for future in as_completed(futures, timeout=self.deadline):
+                source = futures[future]
+                try:
+                    yield source.name, future.result()
+                except Exception as e:
+                    logger.warning(f"Market source {source.name} failed: {str(e)}")
+                    yield source.name, []
+
+        except FuturesTimeoutError:
+            # As buscas atrasadas continuam e gravam no cache (podem ser
+            # compartilhadas com outras requisições, por isso não são canceladas)
+            late = [futures[f].name for f in futures if not f.done()]
+            logger.warning(f"Market sources dropped after {self.deadline}s deadline: {', '.join(late)}")
+
+    def collect(self, query: str) -> List[MarketPrice]:
+        """Todos os preços obtidos dentro do prazo"""
+        prices = []
+        for _, source_prices in self.iter_collect(query):
+            prices.extend(source_prices)
+        return prices
+
+    def collect_many(self, queries: Iterable[str]) -> Dict[str, List[MarketPrice]]:
+        """
+        Preços de várias consultas: todos os pares (fonte, consulta) são
+        submetidos de uma vez e aguardados sob um único prazo global. O que não
+        terminou até lá fica de fora desta resposta e segue gravando no cache.
+        """
+        results = {query: [] for query in queries}
+        futures = {}
+
+        for query in results:
+            for source in self.sources:
+                prices, future = self._start(source, query)
+                if future is not None:
+                    futures[future] = (source, query)
+                else:
+                    results[query].extend(prices)
+
+        try:
+            for future in as_completed(futures, timeout=self.deadline):
+                source, query = futures[future]
+                try:
+                    results[query].extend(future.result())
+                except Exception as e:
+                    logger.warning(f"Market source {source.name} failed for '{query}': {str(e)}")
+
+        except FuturesTimeoutError:
+            late = sum(1 for f in futures if not f.done())
+            logger.warning(f"{late}/{len(futures)} market searches dropped after {self.deadline}s deadline")
+
+        return results
+
+    def _start(self, source: MarketSource, query: str) -> Tuple[List[MarketPrice], Optional[Future]]:
+        """
+        Preços em cache (os vencidos são atualizados em segundo plano) ou a
+        busca submetida, quando não há cache
+        """
+        entry = self.cache.get(source.name, query) if self.cache else None
+        if entry is None:
+            return [], self._submit_search(source, query)
+
+        prices, fresh = entry
+        if not fresh and self.cache.begin_refresh(source.name, query):
+            logger.info(f"Refreshing stale market prices: {source.name} '{query}'")
+            self._pool.submit(self._search, source, query, True)
+        return prices, None
+
+    def _submit_search(self, source: MarketSource, query: str) -> Future:
+        """Busca sem cache, reaproveitando a que já estiver em andamento para a mesma (fonte, consulta)"""
+        key = (source.name, query)
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future
+            future = self._inflight[key] = self._pool.submit(self._search, source, query)
+
+        def done(_):
+            with self._inflight_lock:
+                if self._inflight.get(key) is future:
+                    del self._inflight[key]
+        future.add_done_callback(done)
+        return future
+
+    def _search(self, source: MarketSource, query: str, refresh: bool = False) -> List[MarketPrice]:
+        """Consulta a fonte e grava o resultado no cache (mesmo após o prazo)"""
+        try:
+            prices = source.search(query)
+            if self.cache:
+                if prices:
+                    self.cache.set(source.name, query, prices, ttl=source.cache_ttl)
+                else:
+                    # Cache negativo curto, sem substituir preços já em cache
+                    self.cache.set_empty(source.name, query)
+            return prices
+        finally:
+            if refresh and self.cache:
+                self.cache.end_refresh(source.name, query)
@@ -0,0 +1,413 @@
+"""
+Armazenamento de séries temporais de preços por (produto, fonte)
+
+Cada série fica em um diretório próprio com arquivos colunares comprimidos
+(NumPy .npz): pontos brutos em um arquivo por dia, agregados por hora em um
+arquivo por mês e agregados diários em um arquivo por ano. Consultas só abrem
+os arquivos do intervalo pedido e a retenção remove arquivos inteiros.
+
+O diretório padrão fica na raiz do projeto (não depende do diretório de
+trabalho) e só é criado no primeiro flush com dados. O buffer é gravado ao
+atingir flush_size, a cada PRICE_HISTORY_FLUSH_SECONDS e no encerramento do
+processo (um único hook atexit para todas as instâncias abertas); a retenção
+roda junto de um flush a cada
+PRICE_HISTORY_RETENTION_HOURS. Workers do gunicorn e o processo de
+monitoramento gravam no mesmo diretório, por isso as gravações são
+serializadas por um lock de arquivo (flock).
+"""
+import os
+import re
+import time
+import atexit
+import hashlib
+import logging
+import threading
+import weakref
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone, timedelta
+from typing import Dict, List, Optional, Any, Tuple, Iterable
+import numpy as np
+from ..extractors.product_identity import canonical_product_key
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+HOUR = 3600
+DAY = 86400
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Instâncias com buffer a gravar no encerramento do processo
+_open_stores = weakref.WeakSet()
+
+@atexit.register
+def _close_open_stores():
+    for store in list(_open_stores):
+        store.close()
+
+def default_base_dir() -> str:
+    """PRICE_HISTORY_DIR (relativo à raiz do projeto) ou data/price_history"""
+    return os.path.join(PROJECT_ROOT, os.getenv('PRICE_HISTORY_DIR', os.path.join('data', 'price_history')))
+
+def series_product_key(product: Dict[str, Any]) -> str:
+    """Chave estável do produto para as séries"""
+    if product.get('product_key'):
+        return product['product_key']
+    if not (product.get('nome') or product.get('codigo') or product.get('url')):
+        return ''
+    return canonical_product_key(product)
+
+def _to_epoch(value: Any) -> int:
+    if value is None:
+        return int(time.time())
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.astimezone()
+        return int(value.timestamp())
+    return int(value)
+
+def _day_of(ts: int) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime('%Y%m%d')
+
+def _month_of(ts: int) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime('%Y%m')
+
+def _year_of(ts: int) -> int:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).year
+
+def _rollup(timestamps: np.ndarray, prices: np.ndarray, bucket: int) -> Dict[str, np.ndarray]:
+    """Agrega pontos ordenados em baldes (min/max/soma/contagem)"""
+    buckets = timestamps - timestamps % bucket
+    starts, first = np.unique(buckets, return_index=True)
+    return {
+        'ts': starts,
+        'min': np.minimum.reduceat(prices, first),
+        'max': np.maximum.reduceat(prices, first),
+        'sum': np.add.reduceat(prices, first),
+        'count': np.diff(np.append(first, len(prices))).astype(np.int64)
+    }
+
+class PriceSeriesStore:
+    """Séries de preços append-only com rollups horários/diários e retenção"""
+
+    def __init__(self,
+                 base_dir: str = None,
+                 raw_retention_days: int = None,
+                 hourly_retention_days: int = None,
+                 daily_retention_days: int = None,
+                 flush_size: int = 256,
+                 flush_interval: float = None,
+                 retention_interval: float = None):
+        self.base_dir = base_dir or default_base_dir()
+        self.raw_retention_days = raw_retention_days or int(os.getenv('PRICE_HISTORY_RAW_DAYS', 90))
+        self.hourly_retention_days = hourly_retention_days or int(os.getenv('PRICE_HISTORY_HOURLY_DAYS', 365))
+        # 0 mantém os agregados diários indefinidamente
+        self.daily_retention_days = daily_retention_days if daily_retention_days is not None else int(os.getenv('PRICE_HISTORY_DAILY_DAYS', 0))
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval if flush_interval is not None else float(os.getenv('PRICE_HISTORY_FLUSH_SECONDS', 30))
+        self.retention_interval = (retention_interval if retention_interval is not None
+                                   else float(os.getenv('PRICE_HISTORY_RETENTION_HOURS', 24)) * HOUR)
+
+        # (produto, fonte) -> lista de (timestamp, preço) ainda não gravados
+        self._buffer: Dict[Tuple[str, str], List[Tuple[int, float]]] = defaultdict(list)
+        self._buffered = 0
+        self._lock = threading.RLock()
+        self._last_retention = 0.0
+        self._stop = threading.Event()
+        self._flusher = None
+        _open_stores.add(self)
+
+    def append(self, product_key: str, source: str, price: float, timestamp: Any = None):
+        """Registra uma observação de preço"""
+        if not product_key or price is None:
+            return
+
+        with self._lock:
+            self._buffer[(product_key, source)].append((_to_epoch(timestamp), float(price)))
+            self._buffered += 1
+            if self._buffered >= self.flush_size:
+                self.flush()
+            else:
+                self._ensure_flusher()
+
+    def append_many(self, observations: Iterable[Tuple[str, str, float, Any]]):
+        """Registra várias observações (produto, fonte, preço, timestamp)"""
+        for product_key, source, price, timestamp in observations:
+            self.append(product_key, source, price, timestamp)
+
+    def record_market_prices(self, product: Dict[str, Any], market_prices: Iterable[Any]):
+        """Registra o preço de origem do produto e os preços de mercado encontrados"""
+        product_key = series_product_key(product)
+        if not product_key:
+            return
+
+        if product.get('preco_usd'):
+            self.append(product_key, f"{product.get('site') or 'origem'} (USD)", product['preco_usd'])
+        for price in market_prices:
+            self.append(product_key, price.source, price.price_brl, price.found_at)
+
+    def flush(self):
+        """
+        Grava os pontos em buffer e atualiza os rollups dos dias afetados;
+        aplica a retenção se a última aplicação tiver mais de retention_interval
+        """
+        with self._lock:
+            buffer, self._buffer = self._buffer, defaultdict(list)
+            self._buffered = 0
+            retention_due = self.retention_interval > 0 and time.time() - self._last_retention >= self.retention_interval
+            if not buffer and (not retention_due or not os.path.isdir(self.base_dir)):
+                return
+
+            with self._file_lock():
+                for (product_key, source), points in buffer.items():
+                    try:
+                        self._write_points(product_key, source, points)
+                    except Exception as e:
+                        logger.error(f"Error writing price series {product_key}/{source}: {str(e)}")
+
+                if retention_due:
+                    try:
+                        self._remove_expired(time.time())
+                    except Exception as e:
+                        logger.error(f"Error applying price history retention: {str(e)}")
+
+    def close(self):
+        """Para o flush periódico e grava o que restou no buffer (também chamado no atexit)"""
+        self._stop.set()
+        _open_stores.discard(self)
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Error flushing price history on shutdown: {str(e)}")
+
+    def _ensure_flusher(self):
+        """Inicia (também depois de um fork) a thread que grava o buffer periodicamente"""
+        if self.flush_interval <= 0 or self._stop.is_set():
+            return
+        if self._flusher is None or not self._flusher.is_alive():
+            self._flusher = threading.Thread(target=self._flush_periodically, name='price-history-flush', daemon=True)
+            self._flusher.start()
+
+    def _flush_periodically(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error in periodic price history flush: {str(e)}")
+
+    def query(self,
+              product_key: str,
+              source: str,
+              start: Any,
+              end: Any = None,
+              resolution: str = 'raw') -> Dict[str, List[Any]]:
+        """
+        Pontos de [start, end] na resolução pedida ("raw", "hourly" ou "daily").
+        Rollups retornam min/avg/max/count por balde.
+        """
+        self.flush()
+        start_ts, end_ts = _to_epoch(start), _to_epoch(end)
+        directory = self._series_dir(product_key, source)
+
+        if resolution == 'raw':
+            names = [f"raw-{day}.npz" for day in self._days(start_ts, end_ts)]
+        elif resolution == 'hourly':
+            # Inclui o balde que contém o início do intervalo
+            start_ts -= start_ts % HOUR
+            names = [f"hourly-{month}.npz" for month in self._months(start_ts, end_ts)]
+        elif resolution == 'daily':
+            start_ts -= start_ts % DAY
+            if os.path.exists(os.path.join(directory, 'daily.npz')):
+                # Série ainda no formato antigo (sem gravações desde então)
+                names = ['daily.npz']
+            else:
+                names = [f"daily-{year}.npz" for year in range(_year_of(start_ts), _year_of(end_ts) + 1)]
+        else:
+            raise ValueError(f"Resolução inválida: {resolution}")
+
+        chunks = defaultdict(list)
+        with self._lock:
+            for name in names:
+                data = self._load(os.path.join(directory, name))
+                if data is None:
+                    continue
+                lo = np.searchsorted(data['ts'], start_ts, side='left')
+                hi = np.searchsorted(data['ts'], end_ts, side='right')
+                for column, values in data.items():
+                    chunks[column].append(values[lo:hi])
+
+        if not chunks:
+            return {'ts': [], 'price': []} if resolution == 'raw' else {'ts': [], 'min': [], 'avg': [], 'max': [], 'count': []}
+
+        columns = {column: np.concatenate(parts) for column, parts in chunks.items()}
+        if resolution == 'raw':
+            return {'ts': columns['ts'].tolist(), 'price': columns['price'].tolist()}
+
+        return {
+            'ts': columns['ts'].tolist(),
+            'min': columns['min'].tolist(),
+            'avg': (columns['sum'] / columns['count']).tolist(),
+            'max': columns['max'].tolist(),
+            'count': columns['count'].tolist()
+        }
+
+    def sources(self, product_key: str) -> List[str]:
+        """Fontes com série registrada para o produto"""
+        self.flush()
+        directory = os.path.join(self.base_dir, self._digest(product_key))
+        sources = []
+        if os.path.isdir(directory):
+            for name in sorted(os.listdir(directory)):
+                label_path = os.path.join(directory, name, 'source.txt')
+                if os.path.exists(label_path):
+                    with open(label_path, encoding='utf-8') as f:
+                        sources.append(f.read().strip())
+        return sources
+
+    def apply_retention(self, now: Any = None):
+        """Remove dados brutos/horários/diários mais antigos que a retenção configurada"""
+        with self._lock:
+            self.flush()
+            if not os.path.isdir(self.base_dir):
+                return
+            with self._file_lock():
+                self._remove_expired(_to_epoch(now))
+
+    def _remove_expired(self, now_ts: int):
+        now_ts = int(now_ts)
+        raw_cutoff = _day_of(now_ts - self.raw_retention_days * DAY)
+        hourly_cutoff = _month_of(now_ts - self.hourly_retention_days * DAY)
+        daily_cutoff = now_ts - self.daily_retention_days * DAY
+        removed = 0
+
+        for root, _, files in os.walk(self.base_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                match = re.match(r'(raw|hourly)-(\d+)\.npz$', name)
+                if match:
+                    kind, period = match.groups()
+                    if (kind == 'raw' and period < raw_cutoff) or (kind == 'hourly' and period < hourly_cutoff):
+                        os.remove(path)
+                        removed += 1
+                elif self.daily_retention_days and re.match(r'daily(-\d{4})?\.npz$', name):
+                    year = re.match(r'daily-(\d{4})\.npz$', name)
+                    if year and int(year.group(1)) < _year_of(daily_cutoff):
+                        os.remove(path)
+                        removed += 1
+                        continue
+                    data = self._load(path)
+                    keep = data['ts'] >= daily_cutoff
+                    if not keep.all():
+                        self._save(path, {k: v[keep] for k, v in data.items()})
+
+        self._last_retention = time.time()
+        logger.info(f"Price history retention removed {removed} files")
+
+    @contextmanager
+    def _file_lock(self):
+        """Lock exclusivo entre processos sobre o diretório das séries"""
+        os.makedirs(self.base_dir, exist_ok=True)
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.base_dir, '.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write_points(self, product_key: str, source: str, points: List[Tuple[int, float]]):
+        directory = self._series_dir(product_key, source)
+        if not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, 'source.txt'), 'w', encoding='utf-8') as f:
+                f.write(source)
+        self._split_legacy_daily(directory)
+
+        timestamps = np.array([p[0] for p in points], dtype=np.int64)
+        prices = np.array([p[1] for p in points], dtype=np.float64)
+
+        # Agrupa por dia: cada arquivo bruto recebe apenas os seus pontos
+        days = np.array([_day_of(ts) for ts in timestamps.tolist()])
+        for day in np.unique(days):
+            selected = days == day
+            raw_path = os.path.join(directory, f"raw-{day}.npz")
+            existing = self._load(raw_path) or {'ts': np.empty(0, np.int64), 'price': np.empty(0, np.float64)}
+
+            day_ts = np.concatenate([existing['ts'], timestamps[selected]])
+            day_prices = np.concatenate([existing['price'], prices[selected]])
+            order = np.argsort(day_ts, kind='stable')
+            day_ts, day_prices = day_ts[order], day_prices[order]
+            self._save(raw_path, {'ts': day_ts, 'price': day_prices})
+
+            # Rollups do dia recalculados a partir dos pontos brutos do dia
+            day_start = int(day_ts[0] - day_ts[0] % DAY)
+            self._replace_rollup(os.path.join(directory, f"hourly-{day[:6]}.npz"),
+                                 _rollup(day_ts, day_prices, HOUR), day_start, day_start + DAY)
+            self._replace_rollup(os.path.join(directory, f"daily-{day[:4]}.npz"),
+                                 _rollup(day_ts, day_prices, DAY), day_start, day_start + DAY)
+
+    def _split_legacy_daily(self, directory: str):
+        """Divide o daily.npz único do formato antigo em arquivos por ano"""
+        legacy_path = os.path.join(directory, 'daily.npz')
+        data = self._load(legacy_path)
+        if data is None:
+            return
+        years = np.array([_year_of(ts) for ts in data['ts'].tolist()], dtype=np.int64)
+        for year in np.unique(years):
+            selected = years == year
+            rows = {k: v[selected] for k, v in data.items()}
+            self._replace_rollup(os.path.join(directory, f"daily-{year}.npz"), rows, int(rows['ts'][0]), int(rows['ts'][-1]) + 1)
+        os.remove(legacy_path)
+
+    def _replace_rollup(self, path: str, rows: Dict[str, np.ndarray], start_ts: int, end_ts: int):
+        """Substitui as linhas de [start_ts, end_ts) de um arquivo de rollup"""
+        existing = self._load(path)
+        if existing is not None:
+            keep = (existing['ts'] < start_ts) | (existing['ts'] >= end_ts)
+            rows = {k: np.concatenate([existing[k][keep], rows[k]]) for k in rows}
+            order = np.argsort(rows['ts'], kind='stable')
+            rows = {k: v[order] for k, v in rows.items()}
+        self._save(path, rows)
+
+    def _series_dir(self, product_key: str, source: str) -> str:
+        return os.path.join(self.base_dir, self._digest(product_key), self._digest(source))
+
+    @staticmethod
+    def _digest(value: str) -> str:
+        return hashlib.sha1(value.encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def _days(start_ts: int, end_ts: int) -> List[str]:
+        first = datetime.fromtimestamp(start_ts, tz=timezone.utc).date()
+        last = datetime.fromtimestamp(end_ts, tz=timezone.utc).date()
+        return [(first + timedelta(days=i)).strftime('%Y%m%d') for i in range((last - first).days + 1)]
+
+    @staticmethod
+    def _months(start_ts: int, end_ts: int) -> List[str]:
+        months = []
+        year, month = int(_month_of(start_ts)[:4]), int(_month_of(start_ts)[4:])
+        last = _month_of(end_ts)
+        while f"{year:04d}{month:02d}" <= last:
+            months.append(f"{year:04d}{month:02d}")
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return months
+
+    @staticmethod
+    def _load(path: str) -> Optional[Dict[str, np.ndarray]]:
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            return {key: data[key] for key in data.files}
+
+    @staticmethod
+    def _save(path: str, columns: Dict[str, np.ndarray]):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(tmp_path, **columns)
+        os.replace(tmp_path, path)
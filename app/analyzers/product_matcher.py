@@ -0,0 +1,221 @@
+"""
+Casamento aproximado entre os produtos paraguaios e os anúncios encontrados
+nos marketplaces brasileiros (tokens de modelo, armazenamento e RAM, similaridade
+por conjunto de tokens / n-gramas de caracteres e índice MinHash/LSH)
+"""
+import os
+import re
+import zlib
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional, Any, Tuple, Iterable, Set, Hashable
+import numpy as np
+from .market_sources import MarketPrice
+from ..extractors.spec_parser import parse_numeric_specs
+from ..extractors.product_identity import STOP_WORDS, normalize_tokens, model_tokens
+
+logger = logging.getLogger(__name__)
+
+# Termos de acessórios: um anúncio com eles não é o aparelho. Palavras que
+# também aparecem nas especificações do aparelho ("Bateria 5160mAh", "Câmera
+# traseira") só contam dentro de uma expressão de acessório
+ACCESSORY_WORDS = {
+    'capa', 'capinha', 'capinhas', 'pelicula', 'peliculas', 'protetor', 'carregador', 'cabo',
+    'suporte', 'adaptador', 'skin'
+}
+ACCESSORY_PHRASES = (
+    ('case', 'para'), ('bateria', 'para'), ('bateria', 'compativel'), ('tampa', 'traseira'),
+    ('tampa', 'bateria'), ('lente', 'camera'), ('lente', 'da', 'camera'), ('vidro', 'temperado'),
+    ('vidro', 'camera'), ('vidro', 'da', 'camera'), ('kit', 'capa'), ('kit', 'pelicula')
+)
+
+# Variantes de linha: "iPhone 15" e "iPhone 15 Pro Max" são aparelhos diferentes
+VARIANT_WORDS = {'pro', 'max', 'plus', 'ultra', 'note', 'lite', 'mini', 'fe'}
+
+def is_accessory(text: str) -> bool:
+    """Título de acessório (palavra ou expressão de acessório)"""
+    words = normalize_tokens(text)
+    if set(words) & ACCESSORY_WORDS:
+        return True
+    for phrase in ACCESSORY_PHRASES:
+        size = len(phrase)
+        if any(tuple(words[i:i + size]) == phrase for i in range(len(words) - size + 1)):
+            return True
+    return False
+
+# Números que não são do modelo: o que vem depois de sistema, chipset ou
+# geração ("Android 14", "Helio G81", "Snapdragon 8 Gen 2"), antes de prazo
+# ("2 Anos de Garantia") e medidas com unidade ("2.0GHz", "5160mAh", "4G")
+NON_MODEL_BEFORE = {
+    'android', 'ios', 'miui', 'hyperos', 'oneui', 'processador', 'chipset', 'chip', 'helio',
+    'snapdragon', 'dimensity', 'exynos', 'unisoc', 'kirin', 'tensor', 'gen', 'wifi', 'bluetooth', 'usb'
+}
+NON_MODEL_AFTER = {'ano', 'anos', 'mes', 'meses', 'dias', 'garantia', 'geracao', 'nucleos'}
+_NON_MODEL_NUMBER_RE = re.compile(r'^\d+(?:[.,]\d+)?(ghz|mhz|hz|mah|mp|w|gb|tb|mb|nm|mm|g|x)$')
+
+def model_numbers(text: str) -> Set[str]:
+    """
+    Tokens do número do modelo ("a15", "15", "14c"), juntando prefixos e
+    sufixos de uma letra separados por espaço ("c 75" -> "c75", "14 c" -> "14c").
+    Versões de sistema, chipsets, rede, garantia e medidas ficam de fora.
+    """
+    tokens = normalize_tokens(text)
+    words = []
+    for i, word in enumerate(tokens):
+        if word in STOP_WORDS or _NON_MODEL_NUMBER_RE.match(word):
+            continue
+        if any(c.isdigit() for c in word) and (
+            (i > 0 and tokens[i - 1] in NON_MODEL_BEFORE)
+            or (i + 1 < len(tokens) and tokens[i + 1] in NON_MODEL_AFTER)
+        ):
+            continue
+        words.append(word)
+    merged = []
+    for word in words:
+        previous = merged[-1] if merged else ''
+        if word[0].isdigit() and len(previous) == 1 and previous.isalpha():
+            merged[-1] = previous + word
+        elif len(word) == 1 and word.isalpha() and previous.isdigit():
+            merged[-1] = previous + word
+        else:
+            merged.append(word)
+    return {w for w in merged if any(c.isdigit() for c in w) and w in model_tokens(w)}
+
+def char_ngrams(tokens: Iterable[str], n: int = 3) -> Set[str]:
+    text = ' '.join(sorted(tokens))
+    if len(text) < n:
+        return {text} if text else set()
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+def _hash_shingle(shingle: str) -> int:
+    return zlib.crc32(shingle.encode('utf-8'))
+
+class MinHashLSHIndex:
+    """
+    Índice MinHash com LSH por bandas: a consulta devolve apenas os itens que
+    colidem em pelo menos uma banda, sem comparar contra todo o conjunto.
+    """
+
+    _PRIME = (1 << 61) - 1
+
+    def __init__(self, num_perm: int = 96, bands: int = 32, seed: int = 42):
+        if num_perm % bands:
+            raise ValueError("num_perm deve ser múltiplo de bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, self._PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, self._PRIME, size=num_perm, dtype=np.uint64)
+        self._buckets: List[Dict[Tuple[int, ...], List[Hashable]]] = [defaultdict(list) for _ in range(bands)]
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def signature(self, shingles: Iterable[str]) -> np.ndarray:
+        """Assinatura MinHash vetorizada (permutações x shingles)"""
+        hashes = np.fromiter((_hash_shingle(s) for s in shingles), dtype=np.uint64)
+        if hashes.size == 0:
+            return np.full(self.num_perm, np.iinfo(np.uint64).max, dtype=np.uint64)
+        # (a * h + b) mod p em uint64; o overflow apenas embaralha mais os bits
+        permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % np.uint64(self._PRIME)
+        return permuted.min(axis=1)
+
+    def add(self, item_id: Hashable, shingles: Iterable[str]):
+        signature = self.signature(shingles)
+        for band, bucket in enumerate(self._bands(signature)):
+            self._buckets[band][bucket].append(item_id)
+        self._size += 1
+
+    def query(self, shingles: Iterable[str]) -> Set[Hashable]:
+        signature = self.signature(shingles)
+        candidates = set()
+        for band, bucket in enumerate(self._bands(signature)):
+            candidates.update(self._buckets[band].get(bucket, ()))
+        return candidates
+
+    def _bands(self, signature: np.ndarray) -> Iterable[Tuple[int, ...]]:
+        for band in range(self.bands):
+            yield tuple(signature[band * self.rows:(band + 1) * self.rows].tolist())
+
+class ProductMatcher:
+    """
+    Decide quais anúncios correspondem ao produto de origem. Anúncios de
+    acessórios, de outro número de modelo ou variante (Pro, Max, Note...) e
+    com armazenamento/RAM diferentes são descartados; os demais
+    recebem um score (0-1) e só passam os que atingem o limiar.
+    """
+
+    def __init__(self, threshold: float = None, lsh_min_candidates: int = 50):
+        self.threshold = threshold if threshold is not None else float(os.getenv('MATCH_THRESHOLD', 0.6))
+        # Abaixo deste tamanho comparar todos é mais barato que montar o índice
+        self.lsh_min_candidates = lsh_min_candidates
+
+    def reference_text(self, product_data: Dict[str, Any]) -> str:
+        parts = [product_data.get('marca'), product_data.get('modelo'), product_data.get('nome')]
+        return ' '.join(p for p in parts if p)
+
+    def score(self, reference: str, candidate: str,
+              reference_specs: Optional[Dict[str, float]] = None) -> float:
+        """Similaridade entre o produto de origem e o título do anúncio (0-1)"""
+        reference_tokens = model_tokens(reference)
+        candidate_tokens = model_tokens(candidate)
+        if not reference_tokens or not candidate_tokens:
+            return 0.0
+
+        # Acessório anunciado para o aparelho (ex: "Capa Xiaomi Poco C75")
+        if is_accessory(candidate) and not is_accessory(reference):
+            return 0.0
+
+        # Outro modelo da mesma linha (A15 x A25, 14C x 14) ou outra variante
+        # (iPhone 15 x iPhone 15 Pro Max, Redmi 14C x Redmi Note 14). Números a
+        # mais no anúncio não excluem: títulos reais trazem outros números
+        if not model_numbers(reference) <= model_numbers(candidate):
+            return 0.0
+        if (reference_tokens & VARIANT_WORDS) != (candidate_tokens & VARIANT_WORDS):
+            return 0.0
+
+        # Variantes diferentes (128GB x 256GB, 6GB x 8GB)
+        reference_specs = reference_specs if reference_specs is not None else parse_numeric_specs({'nome': reference})
+        candidate_specs = parse_numeric_specs({'nome': candidate})
+        for field in ('storage_gb', 'ram_gb'):
+            if field in reference_specs and field in candidate_specs and reference_specs[field] != candidate_specs[field]:
+                return 0.0
+
+        # Cobertura dos tokens do modelo + similaridade de n-gramas (tolera "c75" x "c 75")
+        coverage = len(reference_tokens & candidate_tokens) / len(reference_tokens)
+        reference_grams = char_ngrams(reference_tokens)
+        candidate_grams = char_ngrams(candidate_tokens)
+        ngram_similarity = len(reference_grams & candidate_grams) / len(reference_grams | candidate_grams)
+
+        return 0.7 * coverage + 0.3 * ngram_similarity
+
+    def match(self, product_data: Dict[str, Any], prices: List[MarketPrice]) -> List[Tuple[MarketPrice, float]]:
+        """Anúncios acima do limiar, com o respectivo score"""
+        reference = self.reference_text(product_data)
+        reference_specs = product_data.get('especificacoes_numericas') or parse_numeric_specs(product_data)
+        candidates = [(i, p) for i, p in enumerate(prices) if p.title]
+
+        # Pré-filtro sublinear para conjuntos grandes de candidatos
+        if len(candidates) >= self.lsh_min_candidates:
+            index = MinHashLSHIndex()
+            for i, price in candidates:
+                index.add(i, char_ngrams(model_tokens(price.title)))
+            selected = index.query(char_ngrams(model_tokens(reference)))
+            candidates = [(i, p) for i, p in candidates if i in selected]
+
+        matches = []
+        for _, price in candidates:
+            confidence = self.score(reference, price.title, reference_specs)
+            if confidence >= self.threshold:
+                matches.append((price, confidence))
+
+        return matches
+
+    def filter_prices(self, product_data: Dict[str, Any], prices: List[MarketPrice]) -> List[MarketPrice]:
+        """Somente os preços cujo anúncio corresponde ao produto"""
+        matches = [price for price, _ in self.match(product_data, prices)]
+        logger.info(f"Matched {len(matches)}/{len(prices)} market listings for {product_data.get('nome', 'Unknown')}")
+        return matches
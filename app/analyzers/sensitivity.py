@@ -0,0 +1,98 @@
+"""
+Análise de sensibilidade (what-if) de custos, scores e margens para cenários
+de cotação do dólar, alíquota de importação e margem de venda
+"""
+import logging
+from typing import Dict, List, Any, Optional, Sequence
+import numpy as np
+from .market_analyzer import compute_opportunity_scores
+from .import_cost_model import ImportCostModel
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MARGIN_SCENARIOS = [0.20, 0.30, 0.50]
+
+def exchange_rate_scenarios(base_rate: float, spread: float = 0.10, steps: int = 5) -> List[float]:
+    """Cotações de base*(1-spread) a base*(1+spread) (ex: dólar ±10%)"""
+    return np.round(np.linspace(base_rate * (1 - spread), base_rate * (1 + spread), steps), 4).tolist()
+
+def scenario_costs(cost_model: ImportCostModel,
+                   products: Sequence[Dict[str, Any]],
+                   exchange_rates: Sequence[float],
+                   tax_rates: Optional[Sequence[Optional[float]]] = None) -> np.ndarray:
+    """
+    Custo total (produto, cotação, alíquota) avaliado pelo ImportCostModel:
+    regimes, frete por peso e regras por categoria valem em todos os
+    cenários. Alíquota None (ou tax_rates ausente) usa a configurada.
+    """
+    tax_rates = list(tax_rates) if tax_rates is not None else [None]
+    total_cost = np.empty((len(products), len(exchange_rates), len(tax_rates)))
+
+    for t, tax_rate in enumerate(tax_rates):
+        model = cost_model if tax_rate is None else cost_model.with_tax_rate(float(tax_rate))
+        for r, rate in enumerate(exchange_rates):
+            total_cost[:, r, t] = model.evaluate_products(products, float(rate))['total_cost']
+
+    return total_cost
+
+def run_sensitivity(source_price_usd: np.ndarray,
+                    official_avg: np.ndarray,
+                    gray_avg: np.ndarray,
+                    official_count: np.ndarray,
+                    total_cost: np.ndarray,
+                    exchange_rates: Sequence[float],
+                    tax_rates: Sequence[Optional[float]],
+                    margins: Sequence[float]) -> Dict[str, Any]:
+    """
+    Avalia todos os cenários de uma vez por broadcasting sobre os custos de
+    `scenario_costs`. Os eixos são (produto, cotação, alíquota) para
+    custos/scores e (produto, cotação, alíquota, margem) para preços sugeridos.
+    """
+    margin_values = np.asarray(margins, dtype=float)
+
+    # (P, 1, 1) contra os custos (P, R, T)
+    price = np.asarray(source_price_usd, dtype=float)[:, None, None]
+    official = np.asarray(official_avg, dtype=float)[:, None, None]
+    gray = np.asarray(gray_avg, dtype=float)[:, None, None]
+    count = np.asarray(official_count, dtype=float)[:, None, None]
+    total_cost = np.asarray(total_cost, dtype=float)
+
+    scores = compute_opportunity_scores(price, total_cost, official, gray, count)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # Margem se vender pela média do mercado oficial
+        market_margin = (official - total_cost) / total_cost
+
+        # (P, R, T, M): preço sugerido e quanto fica abaixo/acima da média oficial
+        suggested = total_cost[..., None] * (1 + margin_values)
+        vs_market = suggested / official[..., None] - 1
+
+    # Fração dos produtos cujo preço sugerido fica abaixo da média oficial
+    below_market = np.where(np.isnan(vs_market), np.nan, (vs_market < 0).astype(float))
+
+    return {
+        'axes': {
+            'exchange_rate': [float(rate) for rate in exchange_rates],
+            # None: alíquotas configuradas no modelo de custos
+            'tax_rate': [None if tax is None else float(tax) for tax in tax_rates],
+            'margin': margin_values.tolist()
+        },
+        'total_cost': total_cost,
+        'opportunity_score': scores,
+        'market_margin': market_margin,
+        'suggested_price': suggested,
+        'price_vs_market': vs_market,
+        # Superfícies agregadas por cenário (média entre os produtos)
+        'summary': {
+            'avg_opportunity_score': scores.mean(axis=0),
+            'avg_market_margin': _nanmean(market_margin, axis=0),
+            'below_market_share': _nanmean(below_market, axis=0)
+        }
+    }
+
+def _nanmean(values: np.ndarray, axis: int) -> np.ndarray:
+    """Média ignorando NaN, sem aviso quando a fatia inteira é NaN"""
+    valid = ~np.isnan(values)
+    counts = valid.sum(axis=axis)
+    sums = np.where(valid, values, 0).sum(axis=axis)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
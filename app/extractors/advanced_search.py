@@ -1,10 +1,20 @@
 """
 Módulo de busca avançada com filtros de preço e análise de oportunidades
 """
+import os
+import re
+import heapq
 import logging
-from typing import Dict, List, Optional, Any, Tuple
+from collections import deque
+from itertools import count, islice
+from typing import Dict, List, Optional, Any, Tuple, Iterable, Iterator, Union
 from dataclasses import dataclass
+import numpy as np
+from .base_extractor import ProgressCallback
 from .mega_eletronicos_extractor import MegaEletronicosExtractor
+from .product_catalog import ProductCatalog
+from .product_identity import ProductDeduplicator, dedupe_products
+from ..utils.cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +29,36 @@ class SearchFilters:
     brands: Optional[List[str]] = None
     in_stock_only: bool = True
     sort_by: str = "price_asc"  # price_asc, price_desc, name, relevance
+    
+    # Faixas sobre as especificações numéricas (produtos sem o dado são excluídos)
+    min_ram_gb: Optional[float] = None
+    max_ram_gb: Optional[float] = None
+    min_storage_gb: Optional[float] = None
+    max_storage_gb: Optional[float] = None
+    min_screen_inches: Optional[float] = None
+    max_screen_inches: Optional[float] = None
+    min_battery_mah: Optional[float] = None
+    max_battery_mah: Optional[float] = None
+    min_camera_mp: Optional[float] = None
+    max_camera_mp: Optional[float] = None
+
+# Coluna do catálogo -> (filtro mínimo, filtro máximo)
+RANGE_FILTERS = {
+    'preco_usd': ('min_price_usd', 'max_price_usd'),
+    'preco_brl': ('min_price_brl', 'max_price_brl'),
+    'ram_gb': ('min_ram_gb', 'max_ram_gb'),
+    'storage_gb': ('min_storage_gb', 'max_storage_gb'),
+    'screen_inches': ('min_screen_inches', 'max_screen_inches'),
+    'battery_mah': ('min_battery_mah', 'max_battery_mah'),
+    'camera_mp': ('min_camera_mp', 'max_camera_mp'),
+}
+
+# Campos de SearchFilters referentes às especificações numéricas
+SPEC_FILTER_FIELDS = tuple(
+    field
+    for column, fields in RANGE_FILTERS.items() if column not in ('preco_usd', 'preco_brl')
+    for field in fields
+)
 
 @dataclass
 class OpportunityAnalysis:
@@ -29,41 +69,86 @@ class OpportunityAnalysis:
     value_rating: str   # "excellent", "good", "fair", "poor"
     recommendations: List[str]
 
+# Marcas com melhor aceitação na revenda (usadas no score de oportunidade)
+TOP_BRANDS = ['xiaomi', 'samsung', 'apple', 'lg']
+
 class AdvancedProductSearch:
     """Sistema de busca avançada de produtos"""
     
     def __init__(self):
         self.extractor = MegaEletronicosExtractor()
         
+        # Cache dos resultados brutos da busca: variações de filtros sobre a
+        # mesma consulta reaproveitam o crawl + extração IA já realizados
+        self.result_cache = TTLCache(
+            ttl=int(os.getenv('SEARCH_CACHE_TTL', 900)),
+            max_entries=int(os.getenv('SEARCH_CACHE_MAX_ENTRIES', 256))
+        )
+        
     def search_with_filters(self, 
                           query: str, 
-                          filters: SearchFilters) -> List[Dict[str, Any]]:
+                          filters: SearchFilters,
+                          progress: Optional[ProgressCallback] = None) -> List[Dict[str, Any]]:
         """
-        Busca produtos com filtros avançados
+        Busca produtos com filtros avançados. Com `progress`, reporta as etapas
+        do extrator e, ao final, filters_applied com a lista filtrada.
         """
         try:
             logger.info(f"Advanced search: '{query}' with filters")
             
-            # Busca inicial
-            all_products = self.extractor.search_products(query)
+            # Busca inicial (usa o cache de resultados brutos)
+            catalog = self._search_catalog(query, progress=progress)
             
-            if not all_products:
+            if not len(catalog):
                 logger.warning("No products found in initial search")
                 return []
             
             # Aplica filtros
-            filtered_products = self._apply_filters(all_products, filters)
+            filtered_products = self._apply_filters(catalog, filters)
             
             # Ordena resultados
             sorted_products = self._sort_products(filtered_products, filters.sort_by)
             
             logger.info(f"Found {len(sorted_products)} products after filtering")
+            if progress:
+                progress('filters_applied', total=len(catalog), count=len(sorted_products), products=sorted_products)
             return sorted_products
             
         except Exception as e:
             logger.error(f"Error in advanced search: {str(e)}")
             return []
     
+    def search_products(self, query: str, category: str = None) -> List[Dict[str, Any]]:
+        """
+        Busca produtos sem filtros, usando o cache de resultados por consulta
+        normalizada e categoria
+        """
+        # Cópia rasa: filtros e ordenação não alteram a lista em cache
+        return list(self._search_catalog(query, category).products)
+    
+    def _search_catalog(self, query: str, category: str = None,
+                        progress: Optional[ProgressCallback] = None) -> ProductCatalog:
+        """Resultados brutos da busca em formato colunar (em cache)"""
+        key = self._cache_key(query, category)
+        catalog = self.result_cache.get(key)
+        
+        if catalog is None:
+            catalog = ProductCatalog(self.extractor.search_products(query, category, progress=progress))
+            if len(catalog):
+                self.result_cache.set(key, catalog)
+        else:
+            logger.info(f"Search cache hit: '{query}'")
+            if progress:
+                progress('cache_hit', query=query, count=len(catalog))
+        
+        return catalog
+    
+    @staticmethod
+    def _cache_key(query: str, category: Optional[str]) -> Tuple[str, str]:
+        """Normaliza consulta e categoria (caixa e espaços) para a chave do cache"""
+        normalize = lambda value: re.sub(r'\s+', ' ', (value or '').strip().lower())
+        return normalize(query), normalize(category)
+    
     def find_best_opportunities(self, 
                               query: str = "", 
                               max_price_usd: float = 500,
@@ -86,25 +171,68 @@ class AdvancedProductSearch:
                 products = self.search_with_filters(query, filters)
             else:
                 # Busca em categorias populares se não há query específica
-                products = self._search_popular_categories(filters)
+                products = self._iter_popular_categories(filters)
             
-            # Analisa oportunidades
-            opportunities = []
-            for product in products:
-                analysis = self._analyze_opportunity(product)
-                if analysis.opportunity_score >= min_opportunity_score:
-                    opportunities.append(analysis)
-            
-            # Ordena por score de oportunidade
-            opportunities.sort(key=lambda x: x.opportunity_score, reverse=True)
+            # Ranking em streaming: mantém apenas o top 20 em memória e usa
+            # o último ranking parcial emitido (o ranking final)
+            rankings = deque(self.stream_best_opportunities(
+                products,
+                top_k=20,
+                min_opportunity_score=min_opportunity_score
+            ), maxlen=1)
+            opportunities = rankings[-1] if rankings else []
             
             logger.info(f"Found {len(opportunities)} good opportunities")
-            return opportunities[:20]  # Retorna top 20
+            return opportunities
             
         except Exception as e:
             logger.error(f"Error finding opportunities: {str(e)}")
             return []
     
+    def stream_best_opportunities(self,
+                                  products: Iterable[Dict[str, Any]],
+                                  top_k: int = 20,
+                                  min_opportunity_score: float = 7.0,
+                                  chunk_size: int = 256) -> Iterator[List[OpportunityAnalysis]]:
+        """
+        Ranqueia oportunidades em streaming.
+        
+        Consome os produtos em blocos, calcula os scores de cada bloco de forma
+        vetorizada e mantém um heap limitado com os top_k melhores. Após cada
+        bloco retorna o ranking parcial, então os primeiros resultados ficam
+        disponíveis enquanto o catálogo ainda está sendo lido.
+        """
+        # Min-heap de (score, -sequência, produto): o pior item fica no topo.
+        # Em caso de empate o produto visto por último sai primeiro, preservando
+        # a ordem estável do ranking original.
+        heap: List[Tuple[float, int, Dict[str, Any]]] = []
+        analyses: Dict[int, OpportunityAnalysis] = {}
+        sequence = count()
+        
+        for chunk in self._chunked(products, chunk_size):
+            scores = self._score_opportunities(chunk)
+            
+            for product, score in zip(chunk, scores.tolist()):
+                seq = next(sequence)
+                if score < min_opportunity_score:
+                    continue
+                
+                entry = (score, -seq, product)
+                if len(heap) < top_k:
+                    heapq.heappush(heap, entry)
+                elif entry[:2] > heap[0][:2]:
+                    evicted = heapq.heapreplace(heap, entry)
+                    analyses.pop(-evicted[1], None)
+            
+            # Materializa a análise completa apenas para os itens do top_k
+            ranking = []
+            for score, neg_seq, product in sorted(heap, key=lambda e: (-e[0], -e[1])):
+                if -neg_seq not in analyses:
+                    analyses[-neg_seq] = self._analyze_opportunity(product)
+                ranking.append(analyses[-neg_seq])
+            
+            yield ranking
+    
     def search_by_price_range(self, 
                             min_usd: float, 
                             max_usd: float,
@@ -165,39 +293,39 @@ class AdvancedProductSearch:
             logger.error(f"Error getting price suggestions: {str(e)}")
             return {}
     
-    def _apply_filters(self, products: List[Dict[str, Any]], filters: SearchFilters) -> List[Dict[str, Any]]:
-        """Aplica filtros aos produtos"""
-        filtered = products
-        
-        # Filtro de preço USD
-        if filters.min_price_usd is not None:
-            filtered = [p for p in filtered if p.get('preco_usd', 0) >= filters.min_price_usd]
+    def _apply_filters(self,
+                       products: Union[List[Dict[str, Any]], ProductCatalog],
+                       filters: SearchFilters) -> List[Dict[str, Any]]:
+        """Aplica filtros aos produtos (avaliados como máscaras sobre as colunas)"""
+        catalog = products if isinstance(products, ProductCatalog) else ProductCatalog(products)
+        mask = np.ones(len(catalog), dtype=bool)
         
-        if filters.max_price_usd is not None:
-            filtered = [p for p in filtered if p.get('preco_usd', 0) <= filters.max_price_usd]
-        
-        # Filtro de preço BRL
-        if filters.min_price_brl is not None:
-            filtered = [p for p in filtered if p.get('preco_brl', 0) >= filters.min_price_brl]
-        
-        if filters.max_price_brl is not None:
-            filtered = [p for p in filtered if p.get('preco_brl', 0) <= filters.max_price_brl]
+        # Filtros de faixa: preços e especificações numéricas
+        for column, (min_field, max_field) in RANGE_FILTERS.items():
+            min_value = getattr(filters, min_field)
+            max_value = getattr(filters, max_field)
+            if min_value is None and max_value is None:
+                continue
+            
+            values = catalog.column(column)
+            if min_value is not None:
+                mask &= values >= min_value
+            if max_value is not None:
+                mask &= values <= max_value
         
         # Filtro de categoria
         if filters.categories:
-            filtered = [p for p in filtered if p.get('categoria', '').lower() in 
-                       [c.lower() for c in filters.categories]]
+            mask &= np.isin(catalog.categoria, [c.lower() for c in filters.categories])
         
         # Filtro de marca
         if filters.brands:
-            filtered = [p for p in filtered if p.get('marca', '').lower() in 
-                       [b.lower() for b in filters.brands]]
+            mask &= np.isin(catalog.marca, [b.lower() for b in filters.brands])
         
         # Filtro de estoque
         if filters.in_stock_only:
-            filtered = [p for p in filtered if 'estoque' in p.get('estoque', '').lower()]
+            mask &= catalog.in_stock
         
-        return filtered
+        return catalog.take(mask)
     
     def _sort_products(self, products: List[Dict[str, Any]], sort_by: str) -> List[Dict[str, Any]]:
         """Ordena produtos conforme critério"""
@@ -212,17 +340,20 @@ class AdvancedProductSearch:
     
     def _search_popular_categories(self, filters: SearchFilters) -> List[Dict[str, Any]]:
         """Busca em categorias populares"""
+        return list(self._iter_popular_categories(filters))
+    
+    def _iter_popular_categories(self, filters: SearchFilters) -> Iterator[Dict[str, Any]]:
+        """Gera os produtos das categorias populares conforme cada busca termina"""
         popular_categories = ["smartphone", "tablet", "notebook", "smartwatch", "fone"]
-        all_products = []
+        # Um produto que aparece em mais de uma categoria é entregue uma vez só
+        deduplicator = ProductDeduplicator()
         
         for category in popular_categories:
             try:
                 products = self.search_with_filters(category, filters)
-                all_products.extend(products[:10])  # Top 10 de cada categoria
+                yield from deduplicator.iter_unique(products[:10])  # Top 10 de cada categoria
             except Exception as e:
                 logger.warning(f"Error searching category {category}: {str(e)}")
-        
-        return all_products
     
     def _search_all_categories(self, filters: SearchFilters) -> List[Dict[str, Any]]:
         """Busca em todas as categorias disponíveis"""
@@ -238,12 +369,40 @@ class AdvancedProductSearch:
                 except Exception as e:
                     logger.warning(f"Error searching category {category}: {str(e)}")
             
-            return all_products
+            return dedupe_products(all_products)
             
         except Exception as e:
             logger.error(f"Error searching all categories: {str(e)}")
             return []
     
+    @staticmethod
+    def _chunked(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+        """Divide um iterável em blocos de até `size` itens"""
+        iterator = iter(items)
+        while True:
+            chunk = list(islice(iterator, size))
+            if not chunk:
+                return
+            yield chunk
+    
+    def _score_opportunities(self, products: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Calcula o score de oportunidade de um bloco de produtos de forma vetorizada
+        (mesmas regras de _analyze_opportunity)
+        """
+        catalog = ProductCatalog(products)
+        prices = catalog.preco_usd
+        
+        price_score = np.select([prices <= 50, prices <= 200, prices <= 500], [10, 8, 6], default=4)
+        stock_score = np.where(catalog.in_stock, 2, 0)
+        brand_score = np.where(np.isin(catalog.marca, TOP_BRANDS), 2, 1)
+        
+        return (price_score + stock_score + brand_score).astype(float)
+    
+    def analyze_opportunities(self, products: Iterable[Dict[str, Any]]) -> List[OpportunityAnalysis]:
+        """Análise de oportunidade de cada produto (sem filtro de score)"""
+        return [self._analyze_opportunity(product) for product in products]
+    
     def _analyze_opportunity(self, product: Dict[str, Any]) -> OpportunityAnalysis:
         """Analisa oportunidade de um produto"""
         try:
@@ -266,7 +425,7 @@ class AdvancedProductSearch:
             
             # Fatores adicionais
             stock_score = 2 if 'estoque' in product.get('estoque', '').lower() else 0
-            brand_score = 2 if product.get('marca', '').lower() in ['xiaomi', 'samsung', 'apple', 'lg'] else 1
+            brand_score = 2 if product.get('marca', '').lower() in TOP_BRANDS else 1
             
             # Score final
             opportunity_score = price_score + stock_score + brand_score
@@ -5,13 +5,17 @@ import os
 import time
 import logging
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Callable
 from datetime import datetime
 from firecrawl.firecrawl import FirecrawlApp
 from openai import OpenAI
 
 logger = logging.getLogger(__name__)
 
+# Callback de progresso: progress(etapa, **detalhes). Pode levantar exceção
+# para interromper a extração (ex: tarefa cancelada)
+ProgressCallback = Callable[..., None]
+
 class BaseExtractor(ABC):
     """Classe base para todos os extratores de sites paraguaios"""
     
@@ -1,17 +1,80 @@
 """
 Extrator específico para o site Mega Eletrônicos (megaeletronicos.com)
 """
+import os
 import re
+import hashlib
 import logging
-from typing import Dict, List, Optional, Any
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Any, Iterable, Iterator, Tuple
 from urllib.parse import urljoin, urlparse, parse_qs
-from .base_extractor import BaseExtractor
+from bs4 import BeautifulSoup
+from .base_extractor import BaseExtractor, ProgressCallback
+from .spec_parser import parse_numeric_specs
+from .product_identity import ProductDeduplicator, canonical_product_key, dedupe_products, ensure_product_key
+from ..utils.cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+class SearchPageError(Exception):
+    """Falha ao baixar ou interpretar uma página de resultados (diferente de fim da busca)"""
+    
+    def __init__(self, page: int, message: str):
+        super().__init__(f"Página {page}: {message}")
+        self.page = page
+
+@dataclass
+class SearchCursor:
+    """
+    Posição retomável em uma busca paginada: página, produtos já consumidos
+    nela e um hash curto das chaves desses produtos. O tamanho não cresce com
+    as páginas lidas; na retomada a página é baixada de novo, o hash confirma
+    que ela não mudou e as chaves dela formam a janela de deduplicação.
+    """
+    page: int = 1
+    offset: int = 0
+    digest: str = ''
+    
+    DIGEST_SIZE = 8
+    
+    @classmethod
+    def keys_digest(cls, keys: Iterable[str]) -> str:
+        hasher = hashlib.sha1()
+        for key in keys:
+            hasher.update(f"{key}\n".encode('utf-8'))
+        return hasher.hexdigest()[:cls.DIGEST_SIZE]
+    
+    def encode(self) -> str:
+        return f"{self.page}:{self.offset}:{self.digest}" if self.digest else f"{self.page}:{self.offset}"
+    
+    @classmethod
+    def decode(cls, value: Optional[str]) -> 'SearchCursor':
+        if not value:
+            return cls()
+        try:
+            page, offset, *rest = value.split(':', 2)
+            return cls(page=max(int(page), 1), offset=max(int(offset), 0), digest=rest[0] if rest else '')
+        except ValueError:
+            logger.warning(f"Invalid search cursor: {value}")
+            return cls()
+
 class MegaEletronicosExtractor(BaseExtractor):
     """Extrator específico para Mega Eletrônicos"""
     
+    # Paginação da listagem de busca: o link "próxima página" da própria
+    # resposta tem prioridade; o parâmetro só é usado sem ele (ex: retomada
+    # direto em uma página adiante)
+    SEARCH_PAGE_PARAM = os.getenv('SEARCH_PAGE_PARAM', 'page')
+    NEXT_PAGE_TEXTS = {'siguiente', 'próxima', 'proxima', 'next', '›', '»', '>'}
+    
+    def __init__(self):
+        super().__init__()
+        self.max_search_pages = int(os.getenv('SEARCH_MAX_PAGES', 50))
+        self.max_search_results = int(os.getenv('SEARCH_MAX_RESULTS', 200))
+        # (consulta, categoria, página) -> URL lida do link de próxima página
+        self._next_page_urls = TTLCache(ttl=3600, max_entries=1024)
+    
     def get_site_name(self) -> str:
         return "Mega Eletrônicos"
     
@@ -176,29 +239,183 @@ IMPORTANTE:
             logger.error(f"Error extracting product data: {str(e)}")
             return None
     
-    def search_products(self, query: str, category: str = None) -> List[Dict[str, Any]]:
+    def search_products(self, query: str, category: str = None,
+                        progress: Optional[ProgressCallback] = None,
+                        max_results: Optional[int] = None) -> List[Dict[str, Any]]:
         """
-        Busca produtos no Mega Eletrônicos
+        Busca produtos no Mega Eletrônicos percorrendo as páginas de resultados
+        (até `max_results`, padrão SEARCH_MAX_RESULTS). Se uma página falhar,
+        devolve o que já foi coletado.
         """
+        products = []
+        try:
+            for product, _ in self.iter_search_products(
+                query, category,
+                max_results=max_results if max_results is not None else self.max_search_results,
+                progress=progress
+            ):
+                products.append(product)
+        except SearchPageError as e:
+            logger.error(f"Search '{query}' stopped after {len(products)} products: {str(e)}")
+        return products
+    
+    def iter_search_products(self,
+                             query: str,
+                             category: str = None,
+                             cursor: Optional[str] = None,
+                             max_results: Optional[int] = None,
+                             prefetch: bool = True,
+                             progress: Optional[ProgressCallback] = None) -> Iterator[Tuple[Dict[str, Any], str]]:
+        """
+        Percorre todas as páginas de resultados de forma preguiçosa.
+        
+        Retorna pares (produto, cursor) onde o cursor aponta para o próximo
+        produto e pode ser passado de volta para retomar a busca. Para assim que
+        `max_results` produtos forem entregues ou quando uma página não trouxer
+        produtos novos. Com `prefetch`, a página seguinte é baixada em segundo
+        plano enquanto a atual é consumida (só se ainda faltarem produtos).
+        Uma página que falha levanta SearchPageError; o último cursor entregue
+        continua válido para retomar.
+        
+        A deduplicação é feita aqui: entre todas as páginas lidas nesta
+        chamada e, na retomada, contra os produtos já consumidos da página do
+        cursor. Se essa página mudou (hash diferente), ela é relida desde o
+        início: produtos podem se repetir, mas nenhum é perdido.
+        """
+        position = SearchCursor.decode(cursor)
+        delivered = 0
+        seen = ProductDeduplicator()
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        
+        def fetch(page: int):
+            if executor:
+                return executor.submit(self._search_page, query, category, page, progress)
+            return page
+        
+        def result(pending) -> List[Dict[str, Any]]:
+            if executor:
+                return pending.result()
+            return self._search_page(query, category, pending, progress)
+        
         try:
-            logger.info(f"Searching products: query='{query}', category='{category}'")
+            page = position.page
+            pending = fetch(page)
+            
+            while page <= self.max_search_pages:
+                products = result(pending)
+                keys = [ensure_product_key(p) for p in products]
+                
+                start = 0
+                if page == position.page and position.offset:
+                    window = keys[:position.offset]
+                    if position.digest and SearchCursor.keys_digest(window) != position.digest:
+                        logger.warning(f"Search '{query}' page {page} changed since the cursor, re-reading it")
+                    else:
+                        start = min(position.offset, len(products))
+                        for product in products[:start]:
+                            seen.add(product)
+                
+                fresh = sum(1 for key in keys[start:] if key not in seen)
+                # Cursor no fim da página: segue para a próxima
+                at_page_end = bool(products) and start >= len(products)
+                if not fresh and not at_page_end:
+                    logger.info(f"Search '{query}' exhausted at page {page}")
+                    return
+                
+                # Busca a próxima página enquanto esta é processada, a menos
+                # que esta já complete max_results
+                remaining = None if max_results is None else max_results - delivered
+                if page < self.max_search_pages and (remaining is None or fresh < remaining):
+                    pending = fetch(page + 1)
+                else:
+                    pending = None
+                
+                consumed = hashlib.sha1()
+                for key in keys[:start]:
+                    consumed.update(f"{key}\n".encode('utf-8'))
+                for index, product in enumerate(products[start:], start=start + 1):
+                    consumed.update(f"{keys[index - 1]}\n".encode('utf-8'))
+                    # Mesmo produto em outra página/variante de cor
+                    if not seen.add(product):
+                        continue
+                    
+                    digest = consumed.hexdigest()[:SearchCursor.DIGEST_SIZE]
+                    yield product, SearchCursor(page, index, digest).encode()
+                    
+                    delivered += 1
+                    if max_results is not None and delivered >= max_results:
+                        return
+                
+                if pending is None:
+                    return
+                page += 1
+                
+        finally:
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _page_url(self, query: str, category: str = None, page: int = 1) -> str:
+        """URL da página de resultados: link lido da página anterior ou parâmetro de paginação"""
+        if page > 1:
+            next_url = self._next_page_urls.get((query, category, page))
+            if next_url:
+                return next_url
+        
+        search_url = f"{self.get_base_url()}/"
+        params = []
+        if query:
+            params.append(f"search={query.replace(' ', '+')}")
+        if page > 1:
+            params.append(f"{self.SEARCH_PAGE_PARAM}={page}")
+        if params:
+            search_url += '?' + '&'.join(params)
+        return search_url
+    
+    def _remember_next_page(self, query: str, category: Optional[str], page: int, html: Optional[str]):
+        """Guarda o link de próxima página da resposta (rel="next" ou texto do link)"""
+        if not html:
+            return
+        soup = BeautifulSoup(html, 'html.parser')
+        link = soup.select_one('a[rel~="next"], link[rel~="next"]')
+        if link is None:
+            link = next(
+                (a for a in soup.find_all('a', href=True)
+                 if a.get_text(strip=True).lower() in self.NEXT_PAGE_TEXTS
+                 or any('next' in c.lower() for c in a.get('class', []))),
+                None
+            )
+        if link is not None and link.get('href') and not link['href'].startswith(('#', 'javascript:')):
+            self._next_page_urls.set((query, category, page + 1), urljoin(self.get_base_url() + '/', link['href']))
+    
+    def _search_page(self, query: str, category: str = None, page: int = 1,
+                     progress: Optional[ProgressCallback] = None) -> List[Dict[str, Any]]:
+        """
+        Busca uma página de resultados no Mega Eletrônicos. Lista vazia
+        significa fim dos resultados; falhas de crawl ou da extração levantam
+        SearchPageError. Com `progress`, reporta as etapas crawl_started,
+        crawl_finished, llm_extraction e products_parsed (com os produtos da página).
+        """
+        try:
+            logger.info(f"Searching products: query='{query}', category='{category}', page={page}")
             
             # Constrói URL de busca
-            search_url = f"{self.get_base_url()}/"
-            if query:
-                # Adiciona parâmetros de busca se necessário
-                search_url += f"?search={query.replace(' ', '+')}"
+            search_url = self._page_url(query, category, page)
             
             # Usa Firecrawl para obter resultados da busca
+            if progress:
+                progress('crawl_started', url=search_url, page=page)
             search_data = self.crawl_page(search_url, {
                 'includeTags': ['a', 'img', 'h1', 'h2', 'h3', 'p', 'span', 'div'],
                 'excludeTags': ['script', 'style', 'nav', 'footer', 'header'],
                 'waitFor': 3000
             })
+            if progress:
+                progress('crawl_finished', url=search_url, page=page, success=bool(search_data))
             
             if not search_data:
                 logger.error("Failed to crawl search page")
-                return []
+                raise SearchPageError(page, 'falha ao baixar a página de busca')
+            self._remember_next_page(query, category, page, search_data.get('html'))
             
             # Prompt para extrair links de produtos
             search_prompt = f"""
@@ -228,18 +445,23 @@ RETORNE uma lista JSON:
 IMPORTANTE:
 - URLs devem começar com https://www.megaeletronicos.com/producto/
 - Extraia apenas produtos reais, não navegação ou outros links
-- Limite a 20 produtos mais relevantes
+- Extraia todos os produtos listados nesta página
 - Use null para informações não disponíveis
 """
             
             # Usa IA para extrair lista de produtos
+            if progress:
+                progress('llm_extraction', page=page)
             products_data = self.extract_with_ai(
                 search_data.get('markdown', '') + '\n\n' + search_data.get('html', ''),
                 search_prompt
             )
             
-            if not products_data or not isinstance(products_data, list):
-                logger.warning("No products found in search results")
+            if products_data is None or not isinstance(products_data, list):
+                logger.error("Failed to extract search results with AI")
+                raise SearchPageError(page, 'falha na extração dos resultados')
+            if not products_data:
+                logger.info("No products found in search results")
                 return []
             
             # Limpa e valida cada produto
@@ -250,12 +472,17 @@ IMPORTANTE:
                     if cleaned_product.get('url') and '/producto/' in cleaned_product['url']:
                         cleaned_products.append(self.add_metadata(cleaned_product))
             
+            cleaned_products = dedupe_products(cleaned_products)
             logger.info(f"Found {len(cleaned_products)} products")
+            if progress:
+                progress('products_parsed', page=page, count=len(cleaned_products), products=cleaned_products)
             return cleaned_products
             
+        except SearchPageError:
+            raise
         except Exception as e:
             logger.error(f"Error searching products: {str(e)}")
-            return []
+            raise SearchPageError(page, str(e)) from e
     
     def get_categories(self) -> List[str]:
         """
@@ -350,8 +577,15 @@ IMPORTANTE:
         cleaned['garantia'] = str(data.get('garantia', '')).strip()
         cleaned['observacoes'] = str(data.get('observacoes', '')).strip()
         
-        # Remove campos vazios
-        return {k: v for k, v in cleaned.items() if v}
+        # Especificações numéricas tipadas (RAM, armazenamento, tela, bateria, câmera)
+        cleaned['especificacoes_numericas'] = parse_numeric_specs(cleaned)
+        
+        # Chave canônica (mesma para variantes de cor e anúncios repetidos)
+        cleaned['product_key'] = canonical_product_key(cleaned)
+        
+        # Remove campos vazios (especificacoes_numericas fica mesmo vazio:
+        # indica que o texto já foi analisado)
+        return {k: v for k, v in cleaned.items() if v or k == 'especificacoes_numericas'}
     
     def extract_product_from_url(self, product_url: str) -> Optional[Dict[str, Any]]:
         """
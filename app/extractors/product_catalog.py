@@ -0,0 +1,62 @@
+"""
+Catálogo colunar de produtos para filtros e scores vetorizados
+"""
+import logging
+from typing import Dict, List, Any, Iterable, Sequence, Union
+import numpy as np
+from .spec_parser import SPEC_UNITS, parse_numeric_specs
+
+logger = logging.getLogger(__name__)
+
+class ProductCatalog:
+    """
+    Mantém os produtos junto com colunas NumPy (preços, marca, categoria,
+    estoque e especificações numéricas) calculadas uma única vez na ingestão.
+    Especificações ausentes ficam como NaN.
+    """
+
+    def __init__(self, products: Iterable[Dict[str, Any]]):
+        self.products: List[Dict[str, Any]] = list(products)
+        n = len(self.products)
+
+        self.preco_usd = np.fromiter((self._number(p.get('preco_usd')) for p in self.products), dtype=float, count=n)
+        self.preco_brl = np.fromiter((self._number(p.get('preco_brl')) for p in self.products), dtype=float, count=n)
+        self.categoria = np.array([(p.get('categoria') or '').lower() for p in self.products], dtype=object)
+        self.marca = np.array([(p.get('marca') or '').lower() for p in self.products], dtype=object)
+        self.in_stock = np.fromiter(('estoque' in (p.get('estoque') or '').lower() for p in self.products), dtype=bool, count=n)
+
+        specs = [self._numeric_specs(p) for p in self.products]
+        self.specs: Dict[str, np.ndarray] = {
+            field: np.fromiter((s.get(field, np.nan) for s in specs), dtype=float, count=n)
+            for field in SPEC_UNITS
+        }
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def column(self, name: str) -> np.ndarray:
+        """Retorna uma coluna pelo nome (campos de preço ou de especificação)"""
+        if name in self.specs:
+            return self.specs[name]
+        return getattr(self, name)
+
+    def take(self, selector: Union[np.ndarray, Sequence[int]]) -> List[Dict[str, Any]]:
+        """Retorna os produtos selecionados por máscara booleana ou índices"""
+        selector = np.asarray(selector)
+        indices = np.flatnonzero(selector) if selector.dtype == bool else selector
+        return [self.products[i] for i in indices]
+
+    @staticmethod
+    def _number(value: Any) -> float:
+        try:
+            return float(value or 0)
+        except (ValueError, TypeError):
+            return 0.0
+
+    @staticmethod
+    def _numeric_specs(product: Dict[str, Any]) -> Dict[str, float]:
+        numeric = product.get('especificacoes_numericas')
+        if isinstance(numeric, dict):
+            return numeric
+        # Produtos salvos antes da normalização na ingestão
+        return parse_numeric_specs(product)
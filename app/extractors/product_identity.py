@@ -0,0 +1,126 @@
+"""
+Identidade canônica de produtos: uma chave estável derivada de marca, modelo
+e especificações normalizadas (ignorando cor, sufixos de URL e termos de
+anúncio), usada para eliminar duplicatas na ingestão
+"""
+import re
+import hashlib
+import logging
+import unicodedata
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Set
+from .spec_parser import parse_numeric_specs
+
+logger = logging.getLogger(__name__)
+
+# Palavras que não identificam o modelo
+STOP_WORDS = {
+    'cel', 'celular', 'smartphone', 'telefone', 'dual', 'sim', 'chip', 'lte', '4g', '5g', 'nfc',
+    'cx', 'slim', 'de', 'da', 'do', 'com', 'e', 'para', 'the', 'with', 'novo', 'original',
+    'lacrado', 'garantia', 'tela', 'memoria', 'ram', 'rom', 'versao', 'global', 'envio', 'imediato',
+    'preto', 'branco', 'azul', 'verde', 'roxo', 'rosa', 'cinza', 'prata', 'dourado', 'vermelho',
+    'amarelo', 'laranja', 'black', 'white', 'blue', 'green', 'gray', 'grey', 'silver', 'gold'
+}
+
+# Tokens de especificação (tratados como atributos, não como parte do modelo)
+_SPEC_TOKEN_RE = re.compile(r'^\d+(?:[.,]\d+)?(gb|tb|mb|mp|mah|hz|w|pol|")$|^\d+[.,]\d+$')
+_URL_CODE_RE = re.compile(r'/producto/(\d+)')
+
+def strip_accents(text: str) -> str:
+    text = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in text if not unicodedata.combining(c))
+
+def normalize_tokens(text: str) -> List[str]:
+    """Tokens em minúsculas, sem acentos, com unidades coladas ao número ("128 GB" -> "128gb")"""
+    text = strip_accents(text).lower()
+    text = re.sub(r'(\d)\s+(gb|tb|mb|mp|mah)\b', r'\1\2', text)
+    return re.findall(r'[a-z0-9]+(?:[.,][0-9]+)?[a-z"]*', text.replace('/', ' '))
+
+def model_tokens(text: str) -> Set[str]:
+    """Tokens que identificam marca/modelo (sem stop words nem especificações)"""
+    return {
+        token for token in normalize_tokens(text)
+        if token not in STOP_WORDS and not _SPEC_TOKEN_RE.match(token)
+    }
+
+def product_code(product: Dict[str, Any]) -> Optional[str]:
+    """Código do anúncio na loja (campo "codigo" ou o id em /producto/{id}/)"""
+    code = str(product.get('codigo') or '').strip()
+    if code:
+        return code
+    match = _URL_CODE_RE.search(product.get('url') or '')
+    return match.group(1) if match else None
+
+def canonical_product_key(product: Dict[str, Any]) -> str:
+    """
+    Chave estável do produto. Variantes de cor e anúncios repetidos do mesmo
+    modelo/configuração geram a mesma chave; sem marca/modelo identificáveis,
+    cai para o código do anúncio e, por último, para o nome normalizado.
+    """
+    brand = strip_accents(product.get('marca') or '').lower().strip()
+    text = ' '.join(p for p in (product.get('marca'), product.get('modelo') or product.get('nome')) if p)
+    tokens = sorted(model_tokens(text))
+
+    if tokens:
+        specs = product.get('especificacoes_numericas')
+        if not isinstance(specs, dict):
+            specs = parse_numeric_specs(product)
+        identity = '|'.join([
+            brand,
+            ' '.join(tokens),
+            f"{specs['ram_gb']:g}" if 'ram_gb' in specs else '',
+            f"{specs['storage_gb']:g}" if 'storage_gb' in specs else ''
+        ])
+    else:
+        code = product_code(product)
+        identity = f"codigo:{code}" if code else f"nome:{' '.join(normalize_tokens(product.get('nome') or ''))}"
+
+    return hashlib.sha1(identity.encode('utf-8')).hexdigest()[:16]
+
+def ensure_product_key(product: Dict[str, Any]) -> str:
+    """Chave do produto, calculando-a para registros salvos antes da canonicalização"""
+    if not product.get('product_key'):
+        product['product_key'] = canonical_product_key(product)
+    return product['product_key']
+
+class ProductDeduplicator:
+    """
+    Índice hash por chave canônica: cada produto passa uma única vez. As URLs
+    das duplicatas ficam registradas no produto mantido ("urls_alternativas").
+    """
+
+    def __init__(self, seen: Optional[Iterable[str]] = None):
+        self._index: Dict[str, Dict[str, Any]] = {}
+        self._seen_keys: Set[str] = set(seen or ())
+        self.duplicates = 0
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index or key in self._seen_keys
+
+    def add(self, product: Dict[str, Any]) -> bool:
+        """True se o produto é novo; False se é duplicata de um já visto"""
+        key = ensure_product_key(product)
+
+        kept = self._index.get(key)
+        if kept is None and key not in self._seen_keys:
+            self._index[key] = product
+            return True
+
+        self.duplicates += 1
+        if kept is not None and product.get('url') and product['url'] != kept.get('url'):
+            alternatives = kept.setdefault('urls_alternativas', [])
+            if product['url'] not in alternatives:
+                alternatives.append(product['url'])
+        return False
+
+    def iter_unique(self, products: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        for product in products:
+            if self.add(product):
+                yield product
+
+def dedupe_products(products: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Lista sem duplicatas, preservando a ordem da primeira ocorrência"""
+    deduplicator = ProductDeduplicator()
+    unique = list(deduplicator.iter_unique(products))
+    if deduplicator.duplicates:
+        logger.info(f"Removed {deduplicator.duplicates} duplicate products")
+    return unique
@@ -0,0 +1,130 @@
+"""
+Normalização das especificações em texto livre para campos numéricos tipados
+(ex: "6GB" -> ram_gb=6.0, "5.160 mAh" -> battery_mah=5160.0)
+"""
+import re
+import logging
+from typing import Dict, Any, Optional, List
+
+logger = logging.getLogger(__name__)
+
+# Campo numérico -> unidade
+SPEC_UNITS = {
+    'ram_gb': 'GB',
+    'storage_gb': 'GB',
+    'screen_inches': 'in',
+    'battery_mah': 'mAh',
+    'camera_mp': 'MP'
+}
+
+_SIZE_RE = re.compile(r'(\d+(?:[.,]\d+)?)\s*(TB|GB|MB)\b', re.IGNORECASE)
+# "in" só vale com decimal: "2 in 1"/"3 in 1" são acessórios, não telas
+_INCHES_RE = re.compile(r'(\d{1,2}(?:[.,]\d{1,2})?)\s*(?:"|”|\'\'|pol(?:egadas)?\b|inch(?:es)?\b)'
+                        r'|(\d{1,2}[.,]\d{1,2})\s*in\b', re.IGNORECASE)
+_BATTERY_RE = re.compile(r'(\d{1,3}(?:[.,]\d{3})+|\d+)\s*mAh', re.IGNORECASE)
+_CAMERA_RE = re.compile(r'(\d+(?:[.,]\d+)?)\s*MP\b', re.IGNORECASE)
+_WEIGHT_RE = re.compile(r'(\d+(?:[.,]\d+)?)\s*(kg|g|gr|gramas?)?\b', re.IGNORECASE)
+# Nos nomes/URLs da loja a tela aparece como "6.88" ou "6-88" antes da memória
+_NAME_SCREEN_RE = re.compile(r'\b([4-9]|1[0-7])[.,-](\d{1,2})(?=[\s-]+\d+\s*GB)', re.IGNORECASE)
+
+def _to_float(value: str) -> Optional[float]:
+    try:
+        return float(value.replace(',', '.'))
+    except (ValueError, AttributeError):
+        return None
+
+def _sizes_gb(text: str) -> List[float]:
+    """Todas as capacidades encontradas no texto, convertidas para GB"""
+    sizes = []
+    for number, unit in _SIZE_RE.findall(text or ''):
+        value = _to_float(number)
+        if value is None:
+            continue
+        unit = unit.upper()
+        if unit == 'TB':
+            value *= 1024
+        elif unit == 'MB':
+            value /= 1024
+        sizes.append(value)
+    return sizes
+
+def parse_size_gb(text: Optional[str]) -> Optional[float]:
+    sizes = _sizes_gb(text)
+    return sizes[0] if sizes else None
+
+def parse_screen_inches(text: Optional[str]) -> Optional[float]:
+    match = _INCHES_RE.search(text or '')
+    return _to_float(match.group(1) or match.group(2)) if match else None
+
+def parse_battery_mah(text: Optional[str]) -> Optional[float]:
+    match = _BATTERY_RE.search(text or '')
+    if not match:
+        return None
+    # "5.160" e "5,160" são separadores de milhar na capacidade da bateria
+    return _to_float(re.sub(r'[.,]', '', match.group(1)))
+
+def parse_camera_mp(text: Optional[str]) -> Optional[float]:
+    """Maior resolução encontrada (câmera principal)"""
+    values = [_to_float(v) for v in _CAMERA_RE.findall(text or '')]
+    values = [v for v in values if v is not None]
+    return max(values) if values else None
+
+def parse_weight_g(text: Optional[str]) -> Optional[float]:
+    """Peso em gramas ("450 g", "0,45 kg"; sem unidade assume gramas)"""
+    match = _WEIGHT_RE.search(str(text or ''))
+    if not match:
+        return None
+    value = _to_float(match.group(1))
+    if value is not None and (match.group(2) or '').lower() == 'kg':
+        value *= 1000
+    return value
+
+def parse_numeric_specs(product: Dict[str, Any]) -> Dict[str, float]:
+    """
+    Extrai os campos numéricos das especificações do produto. Campos ausentes
+    nas especificações são buscados no nome/URL (ex: "... 6.88 6GB 128GB 50MP").
+    """
+    specs = product.get('especificacoes') or {}
+    numeric = {}
+
+    try:
+        ram = parse_size_gb(specs.get('memoria_ram'))
+        storage = parse_size_gb(specs.get('memoria_interna'))
+        screen = parse_screen_inches(specs.get('tela'))
+        battery = parse_battery_mah(specs.get('bateria'))
+        camera = parse_camera_mp(specs.get('camera'))
+
+        # Fallback: nome e slug da URL (resultados de busca não têm especificações)
+        slug = (product.get('url') or '').rstrip('/').rsplit('/', 1)[-1]
+        name_text = ' '.join([product.get('nome') or '', slug.replace('-', ' ')])
+
+        if ram is None or storage is None:
+            sizes = sorted(set(_sizes_gb(name_text)))
+            if len(sizes) >= 2:
+                ram = ram if ram is not None else sizes[0]
+                storage = storage if storage is not None else sizes[-1]
+            elif len(sizes) == 1 and storage is None and ram is None:
+                storage = sizes[0]
+
+        if screen is None:
+            screen = parse_screen_inches(product.get('nome'))
+            if screen is None:
+                match = _NAME_SCREEN_RE.search(f"{product.get('nome') or ''} {slug}")
+                if match:
+                    screen = float(f"{match.group(1)}.{match.group(2)}")
+
+        if battery is None:
+            battery = parse_battery_mah(name_text)
+
+        if camera is None:
+            camera = parse_camera_mp(name_text)
+
+        for field, value in (('ram_gb', ram), ('storage_gb', storage), ('screen_inches', screen),
+                             ('battery_mah', battery), ('camera_mp', camera)):
+            if value is not None:
+                numeric[field] = value
+
+    except Exception as e:
+        logger.warning(f"Error parsing numeric specs: {str(e)}")
+
+    return numeric
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Teste de carga do painel: simula usuários simultâneos (login + navegação
+pelas rotas do dashboard) em patamares crescentes e informa quantos usuários
+o servidor sustenta dentro do SLO de latência.
+
+    python benchmarks/load_test.py --base-url http://localhost:5000 --users 1,10,25,50,100
+
+Cada usuário virtual repete o ciclo de páginas do dashboard com um intervalo
+de "pensamento" entre as requisições. Um patamar é sustentado quando o p95 fica
+abaixo de --slo-ms e a taxa de erros abaixo de --max-error-rate.
+"""
+import sys
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import requests
+
+# Requisições feitas pelo painel ao abrir e navegar entre as abas
+DASHBOARD_PATHS = [
+    '/api/auth/check',
+    '/api/search-wizard/searches',
+    '/api/search-wizard/opportunities?page=1&per_page=20',
+    '/api/search-wizard/facets',
+    '/api/jobs',
+    '/'
+]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Teste de carga do painel')
+    parser.add_argument('--base-url', default='http://localhost:5000')
+    parser.add_argument('--users', default='1,5,10,25,50,100', help='Patamares de usuários simultâneos')
+    parser.add_argument('--duration', type=float, default=30, help='Segundos por patamar')
+    parser.add_argument('--think-time', type=float, default=1.0, help='Pausa entre requisições de um usuário (s)')
+    parser.add_argument('--slo-ms', type=float, default=500, help='p95 máximo aceitável (ms)')
+    parser.add_argument('--max-error-rate', type=float, default=0.01)
+    parser.add_argument('--username', default='admin')
+    parser.add_argument('--password', default='admin123')
+    parser.add_argument('--timeout', type=float, default=30)
+    return parser.parse_args()
+
+def login(args) -> requests.Session:
+    session = requests.Session()
+    response = session.post(
+        f"{args.base_url}/api/auth/login",
+        json={'username': args.username, 'password': args.password},
+        timeout=args.timeout
+    )
+    if response.status_code != 200:
+        raise RuntimeError(f"Login falhou: {response.status_code} {response.text[:200]}")
+    return session
+
+def virtual_user(args, stop: threading.Event, latencies: list, errors: list, lock: threading.Lock):
+    try:
+        session = login(args)
+    except Exception as e:
+        with lock:
+            errors.append(str(e))
+        return
+
+    index = 0
+    while not stop.is_set():
+        path = DASHBOARD_PATHS[index % len(DASHBOARD_PATHS)]
+        index += 1
+        started = time.perf_counter()
+        try:
+            response = session.get(f"{args.base_url}{path}", timeout=args.timeout)
+            elapsed = time.perf_counter() - started
+            with lock:
+                if response.status_code >= 500:
+                    errors.append(f"{path}: HTTP {response.status_code}")
+                else:
+                    latencies.append(elapsed)
+        except requests.RequestException as e:
+            with lock:
+                errors.append(f"{path}: {e.__class__.__name__}")
+        stop.wait(args.think_time)
+
+def run_stage(args, users: int) -> dict:
+    stop = threading.Event()
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        for _ in range(users):
+            pool.submit(virtual_user, args, stop, latencies, errors, lock)
+        time.sleep(args.duration)
+        stop.set()
+    elapsed = time.perf_counter() - started
+
+    total = len(latencies) + len(errors)
+    values = np.array(latencies) * 1000 if latencies else np.array([np.nan])
+    return {
+        'users': users,
+        'requests': total,
+        'rps': total / elapsed if elapsed else 0.0,
+        'p50': float(np.percentile(values, 50)),
+        'p95': float(np.percentile(values, 95)),
+        'p99': float(np.percentile(values, 99)),
+        'error_rate': len(errors) / total if total else 1.0,
+        'sample_error': errors[0] if errors else ''
+    }
+
+def main():
+    args = parse_args()
+    stages = [int(value) for value in args.users.split(',') if value.strip()]
+
+    print(f"Alvo: {args.base_url} | {args.duration:.0f}s por patamar | SLO p95 < {args.slo_ms:.0f} ms")
+    print(f"{'usuários':>8} {'req':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'erros':>7}")
+
+    sustained = 0
+    for users in stages:
+        result = run_stage(args, users)
+        print(
+            f"{result['users']:>8} {result['requests']:>7} {result['rps']:>8.1f} "
+            f"{result['p50']:>8.1f} {result['p95']:>8.1f} {result['p99']:>8.1f} {result['error_rate']:>7.1%}"
+        )
+        if result['sample_error']:
+            print(f"         ex. de erro: {result['sample_error']}")
+
+        if result['p95'] <= args.slo_ms and result['error_rate'] <= args.max_error_rate:
+            sustained = users
+        else:
+            break
+
+    print(f"\nUsuários simultâneos sustentados dentro do SLO: {sustained}")
+    return 0 if sustained else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
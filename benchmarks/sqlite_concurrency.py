@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Benchmark de leitura/escrita concorrente no SQLite: perfil padrão (journal
+DELETE, sem índices) contra o perfil da aplicação (WAL + PRAGMAs de
+src/database.py + índices de src/migrations.py).
+
+    python benchmarks/sqlite_concurrency.py --readers 8 --writers 2 --duration 10
+
+Leitores repetem as consultas do painel (produtos de uma busca, contagem
+agrupada, sessão por token, últimos logs de monitoramento); escritores
+simulam o monitoramento gravando produtos e logs.
+"""
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import threading
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'web_interface'))
+
+from src.database import SQLITE_PRAGMAS, apply_sqlite_pragmas
+from src.migrations import MIGRATIONS
+
+SCHEMA = [
+    'CREATE TABLE search_configs (id INTEGER PRIMARY KEY, name TEXT, query TEXT, is_active BOOLEAN, created_at DATETIME)',
+    'CREATE TABLE saved_products (id INTEGER PRIMARY KEY, search_config_id INTEGER NOT NULL, product_data TEXT, created_at DATETIME)',
+    'CREATE TABLE monitoring_logs (id INTEGER PRIMARY KEY, search_config_id INTEGER NOT NULL, execution_time DATETIME, products_found INTEGER, status TEXT)',
+    'CREATE TABLE image_downloads (id INTEGER PRIMARY KEY, saved_product_id INTEGER NOT NULL, local_path TEXT)',
+    'CREATE TABLE social_posts (id INTEGER PRIMARY KEY, saved_product_id INTEGER NOT NULL, post_text TEXT)',
+    'CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT)',
+    'CREATE TABLE sessions (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, session_token TEXT, is_active BOOLEAN, expires_at DATETIME)'
+]
+
+READ_QUERIES = [
+    ('SELECT id, product_data FROM saved_products WHERE search_config_id = ?', 'search'),
+    ('SELECT search_config_id, COUNT(id) FROM saved_products GROUP BY search_config_id', None),
+    ('SELECT id FROM sessions WHERE user_id = ? AND is_active = 1', 'user'),
+    ('SELECT * FROM monitoring_logs WHERE search_config_id = ? ORDER BY execution_time DESC LIMIT 20', 'search')
+]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark de concorrência do SQLite')
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--searches', type=int, default=500)
+    parser.add_argument('--products', type=int, default=50000)
+    parser.add_argument('--sessions', type=int, default=5000)
+    return parser.parse_args()
+
+def build_database(path, args, tuned):
+    connection = sqlite3.connect(path)
+    if tuned:
+        apply_sqlite_pragmas(connection)
+    for statement in SCHEMA:
+        connection.execute(statement)
+
+    rng = random.Random(42)
+    connection.executemany(
+        'INSERT INTO search_configs (id, name, query, is_active, created_at) VALUES (?, ?, ?, 1, datetime("now"))',
+        [(i, f'busca {i}', 'smartphone') for i in range(1, args.searches + 1)]
+    )
+    connection.executemany(
+        'INSERT INTO saved_products (search_config_id, product_data, created_at) VALUES (?, ?, datetime("now"))',
+        [(rng.randint(1, args.searches), '{"nome": "produto", "preco_usd": 199.9}') for _ in range(args.products)]
+    )
+    connection.executemany(
+        'INSERT INTO monitoring_logs (search_config_id, execution_time, products_found, status) VALUES (?, datetime("now"), 10, "success")',
+        [(rng.randint(1, args.searches),) for _ in range(args.products // 5)]
+    )
+    connection.executemany(
+        'INSERT INTO sessions (user_id, session_token, is_active, expires_at) VALUES (?, ?, 1, datetime("now", "+1 day"))',
+        [(rng.randint(1, 50), f'token-{i}') for i in range(args.sessions)]
+    )
+    connection.commit()
+
+    if tuned:
+        # Só os comandos SQL; passos em Python dependem do esquema completo
+        for _, _, statements in MIGRATIONS:
+            for statement in statements:
+                if isinstance(statement, str):
+                    connection.execute(statement)
+        connection.commit()
+    connection.close()
+
+def connect(path, tuned):
+    # Perfil padrão: o timeout de 5 s do módulo sqlite3 e nenhum PRAGMA
+    connection = sqlite3.connect(path, check_same_thread=False)
+    if tuned:
+        apply_sqlite_pragmas(connection)
+    return connection
+
+def reader(path, tuned, args, stop, results, lock):
+    connection = connect(path, tuned)
+    rng = random.Random()
+    latencies, errors = [], 0
+    while not stop.is_set():
+        sql, param = rng.choice(READ_QUERIES)
+        values = ()
+        if param == 'search':
+            values = (rng.randint(1, args.searches),)
+        elif param == 'user':
+            values = (rng.randint(1, 50),)
+        started = time.perf_counter()
+        try:
+            connection.execute(sql, values).fetchall()
+            latencies.append(time.perf_counter() - started)
+        except sqlite3.OperationalError:
+            errors += 1
+    connection.close()
+    with lock:
+        results['reads'].extend(latencies)
+        results['read_errors'] += errors
+
+def writer(path, tuned, args, stop, results, lock):
+    connection = connect(path, tuned)
+    rng = random.Random()
+    latencies, errors = [], 0
+    while not stop.is_set():
+        search_id = rng.randint(1, args.searches)
+        started = time.perf_counter()
+        try:
+            # Uma execução de monitoramento: alguns produtos novos + o log
+            connection.executemany(
+                'INSERT INTO saved_products (search_config_id, product_data, created_at) VALUES (?, ?, datetime("now"))',
+                [(search_id, '{"nome": "novo"}')] * 5
+            )
+            connection.execute(
+                'INSERT INTO monitoring_logs (search_config_id, execution_time, products_found, status) VALUES (?, datetime("now"), 5, "success")',
+                (search_id,)
+            )
+            connection.commit()
+            latencies.append(time.perf_counter() - started)
+        except sqlite3.OperationalError:
+            connection.rollback()
+            errors += 1
+    connection.close()
+    with lock:
+        results['writes'].extend(latencies)
+        results['write_errors'] += errors
+
+def run_profile(name, tuned, args):
+    directory = tempfile.mkdtemp(prefix='sqlite-bench-')
+    path = os.path.join(directory, 'bench.db')
+    build_database(path, args, tuned)
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    results = {'reads': [], 'writes': [], 'read_errors': 0, 'write_errors': 0}
+    threads = [
+        threading.Thread(target=reader, args=(path, tuned, args, stop, results, lock)) for _ in range(args.readers)
+    ] + [
+        threading.Thread(target=writer, args=(path, tuned, args, stop, results, lock)) for _ in range(args.writers)
+    ]
+
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    def percentile(values, q):
+        return float(np.percentile(np.array(values) * 1000, q)) if values else float('nan')
+
+    return {
+        'profile': name,
+        'reads_per_s': len(results['reads']) / args.duration,
+        'writes_per_s': len(results['writes']) / args.duration,
+        'read_p95_ms': percentile(results['reads'], 95),
+        'write_p95_ms': percentile(results['writes'], 95),
+        'errors': results['read_errors'] + results['write_errors']
+    }
+
+def main():
+    args = parse_args()
+    print(f"{args.readers} leitores, {args.writers} escritores, {args.duration:.0f}s por perfil, "
+          f"{args.products} produtos em {args.searches} buscas")
+    print(f"PRAGMAs do perfil ajustado: {SQLITE_PRAGMAS}\n")
+    print(f"{'perfil':<10} {'leituras/s':>11} {'escritas/s':>11} {'p95 leitura':>12} {'p95 escrita':>12} {'erros':>6}")
+
+    for name, tuned in (('padrão', False), ('ajustado', True)):
+        result = run_profile(name, tuned, args)
+        print(
+            f"{result['profile']:<10} {result['reads_per_s']:>11.1f} {result['writes_per_s']:>11.1f} "
+            f"{result['read_p95_ms']:>10.2f}ms {result['write_p95_ms']:>10.2f}ms {result['errors']:>6}"
+        )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+"""
+Configuração comum dos testes: raiz do projeto (pacote app) e web_interface
+(pacote src) no path, como no container (PYTHONPATH=/app)
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'web_interface'))
+
+import pytest
+
+@pytest.fixture
+def db_app():
+    """
+    Aplicação mínima com SQLite em memória para os modelos (sem src.main:
+    rotas, extratores e migrações ficam de fora)
+    """
+    from flask import Flask
+    from src.database import db
+    from src.models import product, search_config  # registra as tabelas
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
@@ -0,0 +1,53 @@
+"""
+Contadores de gravação usados como versão dos caches de listagem e facetas
+"""
+from src.database import db
+from src.models.search_config import SearchConfig, SavedProduct, saved_products_version, search_configs_version
+
+def test_writes_bump_counters_in_the_same_transaction(db_app):
+    assert search_configs_version() == (0, 0)
+
+    search = SearchConfig(name='Redmi', query='redmi')
+    db.session.add(search)
+    db.session.flush()
+    db.session.add(SavedProduct(search_config_id=search.id, product_data='{}'))
+    db.session.commit()
+    assert search_configs_version() == (1, 1)
+
+    saved = SavedProduct.query.one()
+    saved.product_data = '{"preco_usd": 100}'
+    db.session.commit()
+    assert saved_products_version() == (2, 0)
+
+    # Sem alteração efetiva não há nova versão
+    search.is_active = search.is_active
+    db.session.commit()
+    assert search_configs_version() == (1, 2)
+
+def test_rolled_back_write_keeps_version(db_app):
+    db.session.add(SearchConfig(name='Redmi', query='redmi'))
+    db.session.flush()
+    db.session.rollback()
+    assert search_configs_version() == (0, 0)
+
+def test_saved_products_are_stamped_with_their_write(db_app):
+    search = SearchConfig(name='Redmi', query='redmi')
+    db.session.add(search)
+    db.session.flush()
+    first = SavedProduct(search_config_id=search.id, product_data='{}')
+    db.session.add(first)
+    db.session.commit()
+    second = SavedProduct(search_config_id=search.id, product_data='{}')
+    db.session.add(second)
+    db.session.commit()
+    assert (first.change_seq, second.change_seq) == (1, 2)
+
+    # Produtos gravados depois da versão 2: só o que foi alterado
+    first.product_data = '{"preco_usd": 10}'
+    db.session.commit()
+    changed = SavedProduct.query.filter(SavedProduct.change_seq > 2).all()
+    assert changed == [first]
+
+    db.session.delete(second)
+    db.session.commit()
+    assert saved_products_version() == (4, 1)
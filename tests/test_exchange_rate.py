@@ -0,0 +1,27 @@
+"""
+Cotação usada nas análises: atual primeiro, a registrada no produto como reserva
+"""
+from app.analyzers.import_cost_model import ExchangeRateProvider
+
+def test_current_rate_wins_over_stored_rate():
+    provider = ExchangeRateProvider(lambda: 5.8, fallback=5.5)
+    assert provider.for_product({'cotacao_usd_brl': 4.9}) == 5.8
+
+def test_stored_rate_is_fallback_when_provider_fails():
+    calls = []
+
+    def failing():
+        calls.append(1)
+        raise RuntimeError('offline')
+
+    provider = ExchangeRateProvider(failing, fallback=5.5)
+    assert provider.for_product({'cotacao_usd_brl': 4.9}) == 4.9
+    assert provider.for_product({}) == 5.5
+    assert provider.current() == 5.5
+    # Falha em cache: o fetcher não é repetido a cada produto
+    assert len(calls) == 1
+
+def test_without_fetcher_uses_stored_then_default():
+    provider = ExchangeRateProvider(None, fallback=5.5)
+    assert provider.for_product({'cotacao_usd_brl': '5.1'}) == 5.1
+    assert provider.for_product({'cotacao_usd_brl': 'n/a'}) == 5.5
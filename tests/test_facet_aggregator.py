@@ -0,0 +1,70 @@
+"""
+Facetas incrementais: chave dos produtos e recarga por versão da fonte
+"""
+import pytest
+from app.analyzers.facet_aggregator import FacetAggregator, FacetStats, CATALOG_SCOPE
+
+def product(key, price, brand='xiaomi'):
+    return {'product_key': key, 'nome': f'Produto {key}', 'preco_usd': price, 'marca': brand}
+
+def test_upsert_replaces_same_product():
+    stats = FacetStats()
+    stats.upsert(product('a', 100))
+    stats.upsert(product('a', 150))
+    assert len(stats) == 1
+    assert stats.to_dict()['price_range'] == {'min': 150.0, 'max': 150.0}
+
+def test_product_key_is_required():
+    with pytest.raises(ValueError):
+        FacetStats().upsert({'nome': 'Sem chave', 'preco_usd': 10})
+
+def test_ensure_loaded_reloads_when_version_changes():
+    aggregator = FacetAggregator()
+    source = [product('a', 100)]
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return list(source)
+
+    aggregator.ensure_loaded(CATALOG_SCOPE, loader, version=1)
+    aggregator.ensure_loaded(CATALOG_SCOPE, loader, version=1)
+    assert len(loads) == 1
+
+    # Outro processo gravou: nova versão recarrega o escopo inteiro
+    source[:] = [product('b', 200, 'samsung')]
+    aggregator.ensure_loaded(CATALOG_SCOPE, loader, version=2)
+    facets = aggregator.get(CATALOG_SCOPE)
+    assert len(loads) == 2
+    assert facets['total'] == 1
+    assert dict(facets['brands']) == {'samsung': 1}
+
+def test_changes_are_applied_incrementally():
+    aggregator = FacetAggregator()
+    stored = {'a': product('a', 100), 'b': product('b', 200)}
+    loads, fetched = [], []
+
+    def loader():
+        loads.append(1)
+        return list(stored.values())
+
+    def changes(since):
+        fetched.append(since)
+        return [stored['b']]
+
+    aggregator.ensure_loaded(CATALOG_SCOPE, loader, version=1, changes=changes, generation=0)
+    stored['b'] = product('b', 300, 'samsung')
+    aggregator.ensure_loaded(CATALOG_SCOPE, loader, version=2, changes=changes, generation=0)
+
+    # Só a partida a frio lê tudo; a nova versão traz apenas o produto alterado
+    assert loads == [1]
+    assert fetched == [1]
+    facets = aggregator.get(CATALOG_SCOPE)
+    assert facets['total'] == 2
+    assert facets['price_range'] == {'min': 100.0, 'max': 300.0}
+
+    # Remoção (nova geração) recarrega o escopo
+    del stored['a']
+    aggregator.ensure_loaded(CATALOG_SCOPE, loader, version=3, changes=changes, generation=1)
+    assert loads == [1, 1]
+    assert aggregator.get(CATALOG_SCOPE)['total'] == 1
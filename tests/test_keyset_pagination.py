@@ -0,0 +1,63 @@
+"""
+Paginação por cursor (keyset) das buscas salvas e do catálogo
+"""
+from datetime import datetime
+import pytest
+from src.database import db
+from src.models.product import record_products, query_products
+from src.models.search_config import SearchConfig, SavedProduct, encode_cursor, decode_cursor, list_search_configs
+
+def product(code, price):
+    return {
+        'codigo': code,
+        'nome': f'Produto {code}',
+        'url': f'https://www.megaeletronicos.com/producto/{code}/',
+        'preco_usd': price,
+        'estoque': 'Em estoque'
+    }
+
+@pytest.mark.parametrize('cursor', ['WzFd', 'bm90IGpzb24=', encode_cursor(['x', 'y']), encode_cursor({'a': 1, 'b': 2})])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError, match='Cursor inválido'):
+        decode_cursor(cursor)
+
+def test_cursor_roundtrip_with_datetime():
+    moment = datetime(2026, 1, 1, 12, 30)
+    assert decode_cursor(encode_cursor([moment, 7]), as_datetime=True) == (moment, 7)
+
+def test_query_products_pages_through_ties_without_gaps(db_app):
+    # Preços repetidos: o id desempata e nenhuma linha se repete ou se perde
+    observations = [(product(str(code), price), datetime(2026, 1, 1))
+                    for code, price in enumerate([30, 10, 20, 10, 30, 20, 10])]
+    record_products(db.session.connection(), observations, 'test')
+    db.session.commit()
+
+    for sort in ('price_asc', 'price_desc', 'updated_desc'):
+        seen, cursor = [], None
+        while True:
+            rows, cursor = query_products(limit=3, sort=sort, cursor=cursor)
+            seen.extend(rows)
+            if cursor is None:
+                break
+        assert len({row.id for row in seen}) == len(seen) == 7
+        if sort != 'updated_desc':
+            prices = [row.price_usd for row in seen]
+            assert prices == sorted(prices, reverse=sort == 'price_desc')
+
+def test_list_search_configs_pages_by_product_count(db_app):
+    for index, count in enumerate([2, 0, 2, 1]):
+        search = SearchConfig(name=f'Busca {index}', query='redmi')
+        db.session.add(search)
+        db.session.flush()
+        for _ in range(count):
+            db.session.add(SavedProduct(search_config_id=search.id, product_data='{}'))
+    db.session.commit()
+
+    first, cursor = list_search_configs(limit=2, sort='products_desc')
+    second, last = list_search_configs(limit=2, sort='products_desc', cursor=cursor)
+    assert [row.product_count for row in first + second] == [2, 2, 1, 0]
+    assert len({row.id for row in first + second}) == 4
+    assert last is None
+
+    with pytest.raises(ValueError):
+        list_search_configs(cursor='WzFd')
@@ -0,0 +1,119 @@
+"""
+Executor das fontes de mercado: cache negativo, buscas compartilhadas e throttling
+"""
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from app.analyzers.market_sources import MarketSource, MarketSourceExecutor, MarketPrice, MercadoLivreSource, build_sources
+from app.analyzers.market_price_cache import MarketPriceCache
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name), 'rb') as f:
+        return f.read()
+
+class FakeSource(MarketSource):
+    name = 'Fake'
+    domain = 'fake.com.br'
+
+    def __init__(self, prices=None, delay=0.0):
+        super().__init__(timeout=1, min_interval=0)
+        self.prices = prices or []
+        self.delay = delay
+        self.calls = 0
+
+    def search(self, query):
+        self.calls += 1
+        time.sleep(self.delay)
+        return list(self.prices)
+
+def price(value):
+    return MarketPrice(source='Fake', price_brl=value, url='https://fake.com.br/p', seller='Fake',
+                       condition='new', availability='in_stock')
+
+def test_empty_result_is_cached_for_negative_ttl():
+    source = FakeSource()
+    cache = MarketPriceCache(cache_dir='', negative_ttl=60)
+    executor = MarketSourceExecutor([source], deadline=2, cache=cache)
+
+    assert executor.collect('redmi 14c') == []
+    assert executor.collect('Redmi  14C') == []
+    assert source.calls == 1
+
+def test_empty_result_does_not_replace_cached_prices():
+    cache = MarketPriceCache(cache_dir='', negative_ttl=60)
+    cache.set('Fake', 'redmi', [price(999.0)], ttl=0)
+    cache.set_empty('Fake', 'redmi')
+
+    prices, fresh = cache.get('Fake', 'redmi')
+    assert [p.price_brl for p in prices] == [999.0]
+
+def test_concurrent_misses_share_one_search():
+    source = FakeSource(prices=[price(999.0)], delay=0.2)
+    executor = MarketSourceExecutor([source], deadline=2, cache=MarketPriceCache(cache_dir=''))
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(executor.collect, ['redmi'] * 4))
+
+    assert source.calls == 1
+    assert all([p.price_brl for p in prices] == [999.0] for prices in results)
+
+def test_throttle_reserves_slots_and_sleeps_outside_lock():
+    source = FakeSource()
+    source.min_interval = 0.2
+    source.session.get = lambda url, timeout: type('Response', (), {'status_code': 200})()
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=source._get, args=('https://fake.com.br',)) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    # As requisições que aguardam a sua vez não seguram o lock
+    assert source._throttle_lock.acquire(timeout=0.01)
+    source._throttle_lock.release()
+    for thread in threads:
+        thread.join()
+
+    # Três requisições espaçadas pelo intervalo mínimo: a última sai em ~2 intervalos
+    assert 0.35 <= time.monotonic() - started < 0.6
+
+def test_collect_many_waits_once_for_every_query():
+    fast = FakeSource(prices=[price(999.0)])
+    slow = FakeSource(prices=[price(1099.0)], delay=1.0)
+    slow.name = 'Slow'
+    executor = MarketSourceExecutor([fast, slow], deadline=0.3, max_workers=32, cache=MarketPriceCache(cache_dir=''))
+
+    started = time.monotonic()
+    results = executor.collect_many([f'redmi {i}' for i in range(20)])
+
+    # Um único prazo para as 40 buscas; as atrasadas ficam de fora
+    assert time.monotonic() - started < 0.8
+    assert len(results) == 20
+    assert all([p.price_brl for p in prices] == [999.0] for prices in results.values())
+
+def test_mercadolivre_current_price_not_previous():
+    prices = MercadoLivreSource(min_interval=0).parse_listing(fixture('mercadolivre_search.html'))
+
+    assert [(p.title, p.price_brl) for p in prices] == [
+        ('Xiaomi Redmi 14C 128GB 6GB Ram Preto', 899.90),
+        ('Xiaomi Redmi 14C 256GB 8GB Azul', 1049.0),
+    ]
+    assert prices[0].url == 'https://www.mercadolivre.com.br/xiaomi-redmi-14c-128gb-6gb/p/MLB1'
+
+def test_mercadolivre_classic_layout():
+    prices = MercadoLivreSource(min_interval=0).parse_listing(fixture('mercadolivre_search_classic.html'))
+    assert [(p.title, p.price_brl, p.url) for p in prices] == [
+        ('Smartphone Xiaomi Redmi 14C 128gb 6gb', 929.0, 'https://produto.mercadolivre.com.br/MLB-1-redmi-14c')
+    ]
+
+def test_mercadolivre_page_without_cards_is_logged(caplog):
+    with caplog.at_level(logging.WARNING):
+        assert MercadoLivreSource(min_interval=0).parse_listing(b'<html><body></body></html>', 'https://x') == []
+    assert 'markup changed' in caplog.text
+
+def test_only_tested_sources_are_built():
+    sources = build_sources(['mercadolivre.com.br', 'americanas.com.br'])
+    assert [type(s) for s in sources] == [MercadoLivreSource]
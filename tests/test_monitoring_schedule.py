@@ -0,0 +1,69 @@
+"""
+Agendamento do monitoramento: vencimento, execuções interrompidas e retomada
+depois de um período parado
+"""
+from datetime import datetime, timedelta
+import pytest
+from src.database import db
+from src.models.search_config import SearchConfig, MonitoringLog
+from src.monitoring import MonitoringScheduler
+
+NOW = datetime(2026, 1, 1, 12, 0)
+
+@pytest.fixture
+def scheduler(db_app):
+    scheduler = MonitoringScheduler(db_app)
+    scheduler.interval = timedelta(hours=1)
+    scheduler.jitter = 0
+    return scheduler
+
+def add_search(created_at=NOW - timedelta(days=1), runs=(), is_active=True):
+    search = SearchConfig(name='Redmi', query='redmi', created_at=created_at, is_active=is_active)
+    db.session.add(search)
+    db.session.flush()
+    for execution_time, status in runs:
+        db.session.add(MonitoringLog(search_config_id=search.id, execution_time=execution_time, status=status))
+    db.session.commit()
+    return search.id
+
+def test_due_after_interval_since_last_finished_run(scheduler):
+    recent = add_search(runs=[(NOW - timedelta(minutes=30), 'success')])
+    due = add_search(runs=[(NOW - timedelta(minutes=61), 'error')])
+    add_search(runs=[(NOW - timedelta(hours=5), 'success')], is_active=False)
+
+    assert scheduler.due_searches(NOW) == [(due, 0)]
+    assert recent not in dict(scheduler.due_searches(NOW + timedelta(minutes=29)))
+    assert recent in dict(scheduler.due_searches(NOW + timedelta(minutes=30)))
+
+def test_search_without_runs_counts_from_approval(scheduler):
+    search_id = add_search(created_at=NOW - timedelta(minutes=10))
+    assert scheduler.due_searches(NOW) == []
+    assert scheduler.due_searches(NOW + timedelta(minutes=50)) == [(search_id, 0)]
+
+def test_interrupted_run_is_due_immediately(scheduler):
+    search_id = add_search(runs=[
+        (NOW - timedelta(minutes=20), 'success'),
+        (NOW - timedelta(minutes=5), 'interrupted')
+    ])
+    assert scheduler.due_searches(NOW) == [(search_id, 0)]
+
+def test_missed_cycles_are_coalesced_into_one_run(scheduler):
+    search_id = add_search(runs=[(NOW - timedelta(hours=5, minutes=10), 'success')])
+    # Uma única execução, com os quatro ciclos perdidos contados
+    assert scheduler.due_searches(NOW) == [(search_id, 4)]
+
+def test_catch_up_after_downtime_is_spread_over_jitter(scheduler):
+    scheduler.jitter = 600
+    scheduler.started_at = NOW
+    ids = [add_search(runs=[(NOW - timedelta(hours=3), 'success')]) for _ in range(5)]
+    offsets = {search_id: scheduler.offset(search_id) for search_id in ids}
+
+    # Todas atrasadas desde antes da partida: cada uma vence no seu deslocamento
+    for search_id, offset in offsets.items():
+        before = dict(scheduler.due_searches(NOW + offset - timedelta(seconds=1)))
+        at = dict(scheduler.due_searches(NOW + offset))
+        assert search_id not in before
+        assert search_id in at
+    # Ordem de vencimento segue os deslocamentos
+    expected = [search_id for search_id, _ in sorted(offsets.items(), key=lambda item: (item[1], item[0]))]
+    assert [search_id for search_id, _ in scheduler.due_searches(NOW + timedelta(seconds=600))] == expected
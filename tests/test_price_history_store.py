@@ -0,0 +1,102 @@
+"""
+Séries de preços: gravação do buffer, retenção e consulta
+"""
+import os
+import time
+from datetime import datetime, timezone
+from app.analyzers.price_history_store import PriceSeriesStore, DAY, PROJECT_ROOT
+
+def make_store(tmp_path, **options):
+    options.setdefault('flush_interval', 0)
+    options.setdefault('retention_interval', 0)
+    return PriceSeriesStore(base_dir=str(tmp_path), **options)
+
+def raw_files(tmp_path):
+    return sorted(name for _, _, files in os.walk(tmp_path) for name in files if name.startswith('raw-'))
+
+def test_close_flushes_buffer(tmp_path):
+    store = make_store(tmp_path)
+    store.append('p1', 'loja', 100.0)
+    assert raw_files(tmp_path) == []
+
+    store.close()
+    now = time.time()
+    assert make_store(tmp_path).query('p1', 'loja', now - 60, now)['price'] == [100.0]
+
+def test_periodic_flush(tmp_path):
+    store = make_store(tmp_path, flush_interval=0.05)
+    store.append('p1', 'loja', 100.0)
+
+    deadline = time.time() + 2
+    while not raw_files(tmp_path) and time.time() < deadline:
+        time.sleep(0.02)
+    store.close()
+    assert len(raw_files(tmp_path)) == 1
+
+def test_flush_applies_retention_when_due(tmp_path):
+    store = make_store(tmp_path, raw_retention_days=10, retention_interval=3600)
+    old = time.time() - 30 * DAY
+    store.append('p1', 'loja', 90.0, old)
+    store._last_retention = time.time()
+    store.flush()
+    assert len(raw_files(tmp_path)) == 1
+
+    # Retenção vencida: o próximo flush remove o arquivo bruto antigo
+    store._last_retention = 0
+    store.append('p1', 'loja', 100.0)
+    store.flush()
+    assert len(raw_files(tmp_path)) == 1
+    now = time.time()
+    assert store.query('p1', 'loja', old - 60, now)['price'] == [100.0]
+    # Agregado diário é mantido (PRICE_HISTORY_DAILY_DAYS=0)
+    assert store.query('p1', 'loja', old - 60, now, resolution='daily')['count'] == [1, 1]
+    store.close()
+
+def daily_files(tmp_path):
+    return sorted(name for _, _, files in os.walk(tmp_path) for name in files if name.startswith('daily'))
+
+def test_daily_rollup_is_partitioned_by_year(tmp_path):
+    store = make_store(tmp_path)
+    store.append('p1', 'loja', 100.0, datetime(2024, 12, 31, 12, tzinfo=timezone.utc))
+    store.append('p1', 'loja', 120.0, datetime(2025, 1, 1, 12, tzinfo=timezone.utc))
+    store.flush()
+    assert daily_files(tmp_path) == ['daily-2024.npz', 'daily-2025.npz']
+
+    result = store.query('p1', 'loja', datetime(2025, 1, 1, tzinfo=timezone.utc),
+                         datetime(2025, 6, 1, tzinfo=timezone.utc), resolution='daily')
+    assert result['avg'] == [120.0]
+    store.close()
+
+def test_legacy_daily_file_is_split_by_year(tmp_path):
+    store = make_store(tmp_path)
+    first = datetime(2024, 6, 1, 12, tzinfo=timezone.utc)
+    store.append('p1', 'loja', 100.0, first)
+    store.flush()
+    directory = store._series_dir('p1', 'loja')
+    os.rename(os.path.join(directory, 'daily-2024.npz'), os.path.join(directory, 'daily.npz'))
+
+    end = datetime(2025, 12, 31, tzinfo=timezone.utc)
+    assert store.query('p1', 'loja', first, end, resolution='daily')['avg'] == [100.0]
+
+    store.append('p1', 'loja', 110.0, datetime(2025, 2, 1, 12, tzinfo=timezone.utc))
+    store.flush()
+    assert daily_files(tmp_path) == ['daily-2024.npz', 'daily-2025.npz']
+    assert store.query('p1', 'loja', first, end, resolution='daily')['avg'] == [100.0, 110.0]
+    store.close()
+
+def test_directory_is_created_on_first_flush(tmp_path):
+    base_dir = tmp_path / 'history'
+    store = PriceSeriesStore(base_dir=str(base_dir), flush_interval=0, retention_interval=3600)
+    store.flush()
+    store.apply_retention()
+    assert not base_dir.exists()
+
+    store.append('p1', 'loja', 100.0)
+    store.close()
+    assert base_dir.is_dir()
+
+def test_default_dir_is_relative_to_project_root(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv('PRICE_HISTORY_DIR', raising=False)
+    assert PriceSeriesStore(flush_interval=0).base_dir == os.path.join(PROJECT_ROOT, 'data', 'price_history')
+    assert not (tmp_path / 'data').exists()
@@ -0,0 +1,46 @@
+"""
+Catálogo normalizado: produtos canônicos e histórico de preços
+"""
+from datetime import datetime, timedelta
+from src.database import db
+from src.models.product import Product, PriceHistory, record_products
+
+def product(code, price, stock='Em estoque', name=None):
+    return {
+        'codigo': code,
+        'nome': name or f'Produto {code}',
+        'url': f'https://www.megaeletronicos.com/producto/{code}/',
+        'preco_usd': price,
+        'estoque': stock
+    }
+
+def record(observations, source='test'):
+    ids = record_products(db.session.connection(), observations, source)
+    db.session.commit()
+    return ids
+
+def history(product_id):
+    rows = PriceHistory.query.filter_by(product_id=product_id).order_by(PriceHistory.collected_at)
+    return [(row.price_usd, row.in_stock) for row in rows]
+
+def test_history_only_grows_on_price_or_stock_change(db_app):
+    start = datetime(2026, 1, 1)
+    ids = record([(product('1', 100), start)])
+    product_id = ids[next(iter(ids))]
+
+    # Mesmo preço (só o nome mudou): atualiza o produto, sem linha de histórico
+    record([(product('1', 100, name='Produto 1 Preto'), start + timedelta(hours=1))])
+    record([(product('1', 90), start + timedelta(hours=2))])
+    record([(product('1', 90, stock=''), start + timedelta(hours=3))])
+
+    assert history(product_id) == [(100.0, True), (90.0, True), (90.0, False)]
+    stored = db.session.get(Product, product_id)
+    assert stored.price_usd == 90.0
+    assert stored.updated_at == start + timedelta(hours=3)
+
+def test_observations_in_one_batch_are_applied_in_order(db_app):
+    start = datetime(2026, 1, 1)
+    ids = record([(product('1', 100), start), (product('1', 100), start + timedelta(hours=1)),
+                  (product('1', 80), start + timedelta(hours=2))])
+    assert len(ids) == 1
+    assert history(next(iter(ids.values()))) == [(100.0, True), (80.0, True)]
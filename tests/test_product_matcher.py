@@ -0,0 +1,66 @@
+"""
+Casamento entre produtos da loja e anúncios dos marketplaces
+"""
+import pytest
+from app.analyzers.product_matcher import ProductMatcher, is_accessory, model_numbers
+
+@pytest.fixture
+def matcher():
+    return ProductMatcher(threshold=0.6)
+
+@pytest.mark.parametrize('reference, candidate', [
+    ('Samsung Galaxy A15 128GB 4GB', 'Samsung Galaxy A25 128GB 4GB'),
+    ('Apple iPhone 15 128GB', 'Apple iPhone 15 Pro Max 128GB'),
+    ('Apple iPhone 15 Pro 128GB', 'Apple iPhone 15 128GB'),
+    ('Xiaomi Redmi 14C 128GB 6GB', 'Xiaomi Redmi Note 14'),
+    ('Xiaomi Redmi 14C 128GB 6GB', 'Xiaomi Redmi 14 128GB 6GB'),
+])
+def test_other_model_or_variant_is_rejected(matcher, reference, candidate):
+    assert matcher.score(reference, candidate) == 0.0
+
+@pytest.mark.parametrize('reference, candidate', [
+    ('Samsung Galaxy A15 128GB 4GB', 'Samsung Galaxy A15 128GB 4GB Preto'),
+    ('Apple iPhone 15 128GB', 'iPhone 15 128GB Apple Azul'),
+    ('Xiaomi Redmi 14C 128GB 6GB', 'Xiaomi Redmi 14C 128gb 6gb Bateria 5160mah'),
+    ('Xiaomi Poco C75 256GB 8GB', 'Smartphone Xiaomi Poco C 75 256GB 8GB'),
+])
+def test_same_device_passes_threshold(matcher, reference, candidate):
+    assert matcher.score(reference, candidate) >= matcher.threshold
+
+@pytest.mark.parametrize('candidate', [
+    'Capa Xiaomi Poco C75',
+    'Bateria para Xiaomi Redmi 14C',
+    'Tampa Traseira Samsung Galaxy A15',
+    'Pelicula Vidro Temperado iPhone 15',
+])
+def test_accessories_are_rejected(candidate):
+    assert is_accessory(candidate)
+
+def test_battery_spec_is_not_an_accessory():
+    assert not is_accessory('Xiaomi Redmi 14C 128gb 6gb Bateria 5160mah')
+
+def test_different_storage_is_rejected(matcher):
+    assert matcher.score('Samsung Galaxy A15 128GB 4GB', 'Samsung Galaxy A15 256GB 4GB') == 0.0
+
+def test_model_numbers_join_split_prefix_and_suffix():
+    assert model_numbers('Poco C 75') == {'c75'}
+    assert model_numbers('Redmi 14 C 5G') == {'14c'}
+    assert model_numbers('Galaxy A15 128GB 6.5"') == {'a15'}
+
+@pytest.mark.parametrize('candidate', [
+    'Xiaomi Redmi 14C 128gb 6gb Ram Android 14 Preto',
+    'Smartphone Xiaomi Redmi 14C 128GB 6GB Processador Helio G81 2.0GHz',
+    'Xiaomi Redmi 14C 128GB 6GB 4G Dual Sim + 2 Anos de Garantia',
+    'Xiaomi Redmi 14C 6GB 128GB Tela 6.88" 120Hz Bateria 5160mAh 18W 50MP',
+])
+def test_noisy_listing_of_same_device_passes(matcher, candidate):
+    assert matcher.score('Xiaomi Redmi 14C 128GB 6GB', candidate) >= matcher.threshold
+
+@pytest.mark.parametrize('text, expected', [
+    ('Xiaomi Redmi 14C Android 14', {'14c'}),
+    ('Redmi 14C Processador Helio G81 2.0GHz', {'14c'}),
+    ('Galaxy A15 4G + 2 Anos de Garantia', {'a15'}),
+    ('Galaxy S23 Snapdragon 8 Gen 2 5G', {'s23'}),
+])
+def test_model_numbers_ignore_non_model_numbers(text, expected):
+    assert model_numbers(text) == expected
@@ -0,0 +1,95 @@
+"""
+Paginação da busca na loja: cursor retomável, prefetch e falhas de página
+"""
+import pytest
+from app.extractors.mega_eletronicos_extractor import MegaEletronicosExtractor, SearchCursor, SearchPageError
+
+def product(code, name=None):
+    return {'codigo': code, 'nome': name or f'Produto {code}', 'url': f'https://www.megaeletronicos.com/producto/{code}/'}
+
+class FakeExtractor(MegaEletronicosExtractor):
+    """Extrator com páginas fixas em memória (sem crawl)"""
+
+    def __init__(self, pages, failing=()):
+        super().__init__()
+        self.pages = pages
+        self.failing = set(failing)
+        self.requested = []
+
+    def _search_page(self, query, category=None, page=1, progress=None):
+        self.requested.append(page)
+        if page in self.failing:
+            raise SearchPageError(page, 'falha simulada')
+        return [dict(p) for p in self.pages.get(page, [])]
+
+@pytest.fixture
+def pages():
+    return {
+        1: [product('1'), product('2'), product('3')],
+        2: [product('3'), product('4')],  # '3' repetido na página seguinte
+        3: [product('5')],
+    }
+
+def codes(items):
+    return [p['codigo'] for p, _ in items]
+
+def test_search_products_walks_every_page(pages):
+    extractor = FakeExtractor(pages)
+    assert [p['codigo'] for p in extractor.search_products('x')] == ['1', '2', '3', '4', '5']
+
+def test_max_results_met_does_not_prefetch_next_page(pages):
+    extractor = FakeExtractor(pages)
+    assert codes(extractor.iter_search_products('x', max_results=3)) == ['1', '2', '3']
+    assert extractor.requested == [1]
+
+def test_resume_skips_products_already_delivered(pages):
+    extractor = FakeExtractor(pages)
+    first = list(extractor.iter_search_products('x', max_results=3, prefetch=False))
+    cursor = first[-1][1]
+
+    # O cursor fica no fim da página 1; o '3' repetido na página 2 cai na janela
+    position = SearchCursor.decode(cursor)
+    assert (position.page, position.offset) == (1, 3)
+    resumed = list(FakeExtractor(pages).iter_search_products('x', cursor=cursor, prefetch=False))
+    assert codes(resumed) == ['4', '5']
+
+def test_cursor_size_does_not_grow_with_pages():
+    many = {page: [product(f'{page * 100 + i}') for i in range(20)] for page in range(1, 11)}
+    cursors = [cursor for _, cursor in FakeExtractor(many).iter_search_products('x', prefetch=False)]
+    assert len(cursors) == 200
+    assert max(len(c) for c in cursors) <= len('10:20:') + SearchCursor.DIGEST_SIZE
+
+def test_resume_rereads_page_that_changed(pages):
+    cursor = list(FakeExtractor(pages).iter_search_products('x', max_results=2, prefetch=False))[-1][1]
+    pages[1] = [product('9'), product('1'), product('2'), product('3')]
+
+    resumed = list(FakeExtractor(pages).iter_search_products('x', cursor=cursor, prefetch=False))
+    assert codes(resumed) == ['9', '1', '2', '3', '4', '5']
+
+def test_next_page_link_is_followed():
+    extractor = MegaEletronicosExtractor()
+    html = '<nav><a href="/?search=x&pagina=1">1</a><a rel="next" href="/?search=x&pagina=2">Siguiente</a></nav>'
+    extractor._remember_next_page('x', None, 1, html)
+
+    assert extractor._page_url('x', None, 2) == f"{extractor.get_base_url()}/?search=x&pagina=2"
+    # Sem link conhecido, usa o parâmetro de paginação
+    assert extractor._page_url('x', None, 3).endswith(f"&{extractor.SEARCH_PAGE_PARAM}=3")
+
+def test_next_page_link_by_text():
+    extractor = MegaEletronicosExtractor()
+    extractor._remember_next_page('x', None, 2, '<a href="#">‹</a><a href="/busca?p=3">»</a>')
+    assert extractor._page_url('x', None, 3) == f"{extractor.get_base_url()}/busca?p=3"
+
+def test_page_error_is_not_exhaustion(pages):
+    extractor = FakeExtractor(pages, failing={2})
+    delivered = []
+    with pytest.raises(SearchPageError):
+        for item in extractor.iter_search_products('x', prefetch=False):
+            delivered.append(item)
+    assert codes(delivered) == ['1', '2', '3']
+
+    # search_products devolve o que foi coletado antes da falha
+    assert len(FakeExtractor(pages, failing={2}).search_products('x')) == 3
+
+def test_legacy_cursor_without_digest():
+    assert SearchCursor.decode('2:1') == SearchCursor(page=2, offset=1)
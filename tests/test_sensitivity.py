@@ -0,0 +1,42 @@
+"""
+Cenários de sensibilidade avaliados pelo modelo de custos de importação
+"""
+import numpy as np
+from app.analyzers.import_cost_model import ImportCostModel, DEFAULT_COST_CONFIG, _merge
+from app.analyzers.sensitivity import scenario_costs, run_sensitivity
+
+PRODUCTS = [
+    {'preco_usd': 100, 'categoria': 'celulares'},
+    {'preco_usd': 200, 'categoria': 'notebooks', 'peso_bruto': '2000 g'},
+]
+
+def test_default_config_matches_flat_estimate():
+    costs = scenario_costs(ImportCostModel(DEFAULT_COST_CONFIG), PRODUCTS, [5.0, 6.0])
+    assert costs.shape == (2, 2, 1)
+    # preço * cotação * (1 + 60%) + frete 50 + manuseio 30
+    np.testing.assert_allclose(costs[0, :, 0], [100 * 5.0 * 1.6 + 80, 100 * 6.0 * 1.6 + 80])
+
+def test_tax_override_keeps_category_rules():
+    config = _merge(DEFAULT_COST_CONFIG, {
+        'categories': {'notebooks': {'regime': 'remessa_conforme', 'shipping': {'per_kg': 40}}}
+    })
+    model = ImportCostModel(config)
+    costs = scenario_costs(model, PRODUCTS, [5.0], [0.5])
+
+    # Celular: regime simplificado com a alíquota do cenário
+    assert costs[0, 0, 0] == 100 * 5.0 * 1.5 + 80
+    # Notebook: continua no regime escalonado (alíquota alta substituída) e com frete por peso
+    expected = model.with_tax_rate(0.5).estimate(200, 5.0, 'notebooks', 2000)['total_cost']
+    assert costs[1, 0, 0] == expected
+    assert expected != 200 * 5.0 * 1.5 + 80
+    assert model.with_tax_rate(0.5).config['regimes']['remessa_conforme']['high_rate'] == 0.5
+
+def test_run_sensitivity_axes():
+    model = ImportCostModel(DEFAULT_COST_CONFIG)
+    total_cost = scenario_costs(model, PRODUCTS, [5.0], [None, 0.4])
+    result = run_sensitivity(
+        np.array([100.0, 200.0]), np.array([2000.0, np.nan]), np.array([np.nan, np.nan]), np.array([3, 0]),
+        total_cost, [5.0], [None, 0.4], [0.2, 0.3]
+    )
+    assert result['axes']['tax_rate'] == [None, 0.4]
+    assert result['suggested_price'].shape == (2, 1, 2, 2)
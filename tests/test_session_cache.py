@@ -0,0 +1,49 @@
+"""
+Validação de sessões: carimbo assinado, cache e revogação
+"""
+from datetime import datetime, timedelta
+import pytest
+from src import session_cache
+from src.database import db
+from src.models.auth import User, Session
+
+SECRET = 'test-secret'
+
+@pytest.fixture
+def login(db_app):
+    session_cache.session_cache.clear()
+    user = User(username='admin', email='admin@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.flush()
+    user_session = Session(user_id=user.id, session_token=Session.generate_token(),
+                           expires_at=datetime.utcnow() + timedelta(hours=1))
+    db.session.add(user_session)
+    db.session.commit()
+    flask_session = {'user_id': user.id, 'session_token': user_session.session_token}
+    assert session_cache.validate_session(flask_session, SECRET)['username'] == 'admin'
+    return user, user_session, flask_session
+
+def test_stamp_is_rejected_after_session_expiry(login):
+    user, user_session, flask_session = login
+    user_session.expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+    session_cache.session_cache.clear()
+
+    # Carimbo assinado ainda dentro do AUTH_STAMP_MAX_AGE, mas com a sessão vencida
+    flask_session['auth_stamp'] = session_cache._serializer(SECRET).dumps({
+        'token': user_session.session_token,
+        'user': session_cache._user_info(user),
+        'expires_at': user_session.expires_at.isoformat()
+    })
+    assert session_cache.validate_session(flask_session, SECRET) is None
+
+def test_deactivated_user_is_rejected(login):
+    user, _, flask_session = login
+    user.is_active = False
+    db.session.commit()
+    assert session_cache.validate_session(flask_session, SECRET) is None
+
+def test_invalidated_session_is_rejected(login):
+    _, user_session, flask_session = login
+    user_session.invalidate()
+    assert session_cache.validate_session(flask_session, SECRET) is None
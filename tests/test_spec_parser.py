@@ -0,0 +1,77 @@
+"""
+Especificações em texto livre para campos numéricos
+"""
+import pytest
+from app.extractors.mega_eletronicos_extractor import MegaEletronicosExtractor
+from app.extractors.spec_parser import parse_numeric_specs, parse_battery_mah, parse_screen_inches, parse_size_gb, parse_weight_g
+
+def test_specs_are_parsed_with_units():
+    product = {'especificacoes': {
+        'memoria_ram': '6GB',
+        'memoria_interna': '128 GB',
+        'tela': '6,88"',
+        'bateria': '5.160 mAh',
+        'camera': '50MP + 2MP'
+    }}
+    assert parse_numeric_specs(product) == {
+        'ram_gb': 6.0,
+        'storage_gb': 128.0,
+        'screen_inches': 6.88,
+        'battery_mah': 5160.0,
+        'camera_mp': 50.0
+    }
+
+def test_missing_specs_fall_back_to_name_and_url():
+    product = {
+        'nome': 'Celular Xiaomi Redmi 14C 6.88 6GB 128GB 50MP',
+        'url': 'https://www.megaeletronicos.com/producto/celular-xiaomi-redmi-14c-5160mah/'
+    }
+    numeric = parse_numeric_specs(product)
+    assert numeric['ram_gb'] == 6.0
+    assert numeric['storage_gb'] == 128.0
+    assert numeric['screen_inches'] == 6.88
+    assert numeric['battery_mah'] == 5160.0
+    assert numeric['camera_mp'] == 50.0
+
+def test_unknown_fields_are_omitted():
+    assert parse_numeric_specs({'nome': 'Capa de silicone'}) == {}
+
+@pytest.mark.parametrize('text, expected', [
+    ('1TB', 1024.0),
+    ('512 MB', 0.5),
+    ('sem memória', None),
+    (None, None),
+])
+def test_parse_size_gb(text, expected):
+    assert parse_size_gb(text) == expected
+
+@pytest.mark.parametrize('text, expected', [
+    ('5,000 mAh', 5000.0),
+    ('4500mAh', 4500.0),
+])
+def test_parse_battery_thousands_separator(text, expected):
+    assert parse_battery_mah(text) == expected
+
+@pytest.mark.parametrize('text, expected', [
+    ('450 g', 450.0),
+    ('0,45 kg', 450.0),
+    (200, 200.0),
+    ('', None),
+])
+def test_parse_weight_g(text, expected):
+    assert parse_weight_g(text) == expected
+
+@pytest.mark.parametrize('text, expected', [
+    ('6,88"', 6.88),
+    ('6.7 in', 6.7),
+    ('Tela de 15 polegadas', 15.0),
+    ('Carregador 3 in 1', None),
+    ('Notebook 2 in 1', None),
+])
+def test_parse_screen_inches(text, expected):
+    assert parse_screen_inches(text) == expected
+
+def test_clean_product_keeps_empty_numeric_specs():
+    cleaned = MegaEletronicosExtractor()._clean_product_data({'nome': 'Carregador 3 in 1', 'url': 'https://x/p/1'})
+    assert cleaned['especificacoes_numericas'] == {}
+    assert 'marca' not in cleaned
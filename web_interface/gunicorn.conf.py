@@ -0,0 +1,59 @@
+"""
+Configuração do gunicorn para produção (valores via variáveis de ambiente).
+
+    cd web_interface && gunicorn -c gunicorn.conf.py wsgi:app
+
+Workers pré-fork com threads (gthread): streams SSE ocupam uma thread cada,
+não um processo inteiro. A aplicação é carregada no mestre (preload_app) e
+compartilhada em copy-on-write.
+
+Recarga sem queda: com preload_app, HUP apenas recicla os workers com o
+código já carregado. Para publicar código novo envie USR2 (sobe um novo
+mestre com o código atualizado), depois WINCH e QUIT ao mestre antigo.
+"""
+import os
+import multiprocessing
+
+bind = os.getenv('GUNICORN_BIND', f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', 5000)}")
+# Fila de tarefas em memória (JOB_BACKEND=thread ou sem REDIS_URL) é local a
+# cada processo: um worker só por padrão, para que status e resultado sejam
+# consultados onde a tarefa roda. Com a fila compartilhada, vários workers.
+in_process_jobs = os.getenv('JOB_BACKEND', 'auto').lower() == 'thread' or not os.getenv('REDIS_URL')
+workers_configured = bool(os.getenv('WEB_WORKERS'))
+default_workers = 1 if in_process_jobs else min(multiprocessing.cpu_count() * 2 + 1, 8)
+workers = int(os.getenv('WEB_WORKERS') or default_workers)
+threads = int(os.getenv('WEB_THREADS', 8))
+worker_class = 'gthread'
+preload_app = os.getenv('WEB_PRELOAD', 'true').lower() == 'true'
+
+# Requisições síncronas (wizard sem fila, análise de mercado) podem demorar
+timeout = int(os.getenv('WEB_TIMEOUT', 120))
+graceful_timeout = int(os.getenv('WEB_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('WEB_KEEPALIVE', 5))
+
+# Recicla workers periodicamente (com jitter para não reciclarem juntos)
+max_requests = int(os.getenv('WEB_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.getenv('WEB_MAX_REQUESTS_JITTER', 200))
+
+accesslog = os.getenv('WEB_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.getenv('LOG_LEVEL', 'info').lower()
+
+def when_ready(server):
+    from src.jobs import job_manager
+    if job_manager.backend is None or job_manager.shared or server.num_workers <= 1:
+        return
+    if workers_configured:
+        server.log.warning(
+            "Job queue is in-process: each worker only sees its own jobs. "
+            "Set REDIS_URL (Celery backend) when running multiple workers."
+        )
+    else:
+        # REDIS_URL definido mas o Redis não respondeu na carga da aplicação
+        server.log.warning("Job queue fell back to in-process pool, running a single worker")
+        server.num_workers = 1
+
+def post_fork(server, worker):
+    from wsgi import after_fork
+    after_fork()
+    server.log.info(f"Worker {worker.pid} ready")
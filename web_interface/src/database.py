@@ -1,4 +1,41 @@
+import os
+import sqlite3
+import logging
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
 
 # Instância compartilhada do banco de dados
-db = SQLAlchemy()
\ No newline at end of file
+db = SQLAlchemy()
+
+# Perfil de desempenho do SQLite aplicado a cada nova conexão:
+# WAL permite leituras simultâneas a uma escrita (monitoramento gravando
+# enquanto o painel lê); synchronous=NORMAL é seguro em WAL e evita um fsync
+# por commit; busy_timeout faz a conexão esperar o lock em vez de falhar
+SQLITE_PRAGMAS = {
+    'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'cache_size': -int(os.getenv('SQLITE_CACHE_KB', 20000)),  # negativo = KiB
+    'mmap_size': int(os.getenv('SQLITE_MMAP_MB', 128)) * 1024 * 1024,
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+    'temp_store': 'MEMORY'
+}
+
+def apply_sqlite_pragmas(connection, pragmas=None):
+    """Aplica os PRAGMAs em uma conexão sqlite3"""
+    cursor = connection.cursor()
+    try:
+        for name, value in (pragmas or SQLITE_PRAGMAS).items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+@event.listens_for(Engine, 'connect')
+def _configure_sqlite_connection(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        try:
+            apply_sqlite_pragmas(dbapi_connection)
+        except sqlite3.Error as e:
+            logger.warning(f"Error applying SQLite pragmas: {str(e)}")
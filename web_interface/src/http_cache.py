@@ -0,0 +1,126 @@
+"""
+Cache HTTP e compressão das respostas:
+  - ETag fraco nas respostas JSON/HTML e 304 para If-None-Match, de modo que o
+    polling do painel só recebe o corpo quando algo mudou;
+  - gzip (ou brotli, se o pacote estiver instalado) acima de um tamanho mínimo,
+    exceto em respostas transmitidas (SSE, NDJSON);
+  - index.html referencia app.js/style.css com ?v=<hash do conteúdo>, e esses
+    arquivos são servidos com cache longo e imutável.
+"""
+import os
+import re
+import gzip
+import hashlib
+import logging
+import threading
+from flask import request, Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESS_MIN_BYTES = int(os.getenv('HTTP_COMPRESS_MIN_BYTES', 1024))
+COMPRESS_LEVEL = int(os.getenv('HTTP_COMPRESS_LEVEL', 6))
+STATIC_MAX_AGE = int(os.getenv('STATIC_MAX_AGE', 31536000))
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/javascript', 'text/', 'image/svg+xml')
+ETAG_TYPES = ('application/json', 'text/html')
+
+# Referências locais do index.html (sem esquema/host) a receber a impressão digital
+_ASSET_REF = re.compile(r'(?P<attr>(?:href|src)=")(?P<path>[\w./-]+\.(?:js|css))"')
+
+_fingerprints = {}
+_lock = threading.Lock()
+
+def asset_fingerprint(path):
+    """Hash curto do conteúdo do arquivo, recalculado só quando o mtime muda"""
+    mtime = os.path.getmtime(path)
+    with _lock:
+        cached = _fingerprints.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+    with open(path, 'rb') as f:
+        digest = hashlib.sha1(f.read()).hexdigest()[:10]
+    with _lock:
+        _fingerprints[path] = (mtime, digest)
+    return digest
+
+def index_response(static_folder):
+    """index.html com os assets locais apontando para URLs com impressão digital"""
+    index_path = os.path.join(static_folder, 'index.html')
+
+    def fingerprint(match):
+        asset_path = os.path.join(static_folder, match.group('path'))
+        if not os.path.exists(asset_path):
+            return match.group(0)
+        return f'{match.group("attr")}{match.group("path")}?v={asset_fingerprint(asset_path)}"'
+
+    with open(index_path, encoding='utf-8') as f:
+        html = f.read()
+    # Editar app.js muda o hash, a URL e portanto o ETag do próprio HTML
+    response = Response(_ASSET_REF.sub(fingerprint, html), mimetype='text/html')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def _accepted_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+def _compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=min(COMPRESS_LEVEL, 11))
+    return gzip.compress(data, compresslevel=COMPRESS_LEVEL)
+
+def _add_vary(response, header):
+    vary = {value.strip() for value in response.headers.get('Vary', '').split(',') if value.strip()}
+    if header not in vary:
+        response.headers['Vary'] = ', '.join(sorted(vary | {header}))
+
+def process_response(response):
+    """Hook after_request: validadores, 304, cache de estáticos e compressão"""
+    # Arquivos estáticos (send_from_directory já define ETag e Last-Modified)
+    if request.endpoint == 'serve' and response.direct_passthrough:
+        if request.args.get('v'):
+            response.headers['Cache-Control'] = f'public, max-age={STATIC_MAX_AGE}, immutable'
+        if not response.mimetype.startswith(COMPRESSIBLE_TYPES):
+            return response
+        # Lê o arquivo para poder comprimir (assets do painel são pequenos)
+        response.direct_passthrough = False
+        response.make_sequence()
+    elif response.is_streamed or response.direct_passthrough:
+        # Respostas transmitidas (SSE, NDJSON) seguem sem buffer nem compressão
+        return response
+
+    if request.method in ('GET', 'HEAD') and response.status_code == 200 and response.mimetype in ETAG_TYPES:
+        # ETag fraco: vale para qualquer codificação do mesmo conteúdo
+        response.add_etag(weak=True)
+        response.headers.setdefault('Cache-Control', 'no-cache')
+        response.make_conditional(request)
+        if response.status_code == 304:
+            return response
+
+    if (
+        response.status_code == 200
+        and 'Content-Encoding' not in response.headers
+        and response.mimetype.startswith(COMPRESSIBLE_TYPES)
+    ):
+        _add_vary(response, 'Accept-Encoding')
+        data = response.get_data()
+        encoding = _accepted_encoding()
+        if encoding and len(data) >= COMPRESS_MIN_BYTES:
+            response.set_data(_compress(data, encoding))
+            response.headers['Content-Encoding'] = encoding
+
+    return response
+
+def init_app(app):
+    app.after_request(process_response)
+    logger.info(f"HTTP cache enabled (compression: {'br, gzip' if brotli else 'gzip'}, min {COMPRESS_MIN_BYTES} bytes)")
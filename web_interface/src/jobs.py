@@ -0,0 +1,475 @@
+"""
+Fila de tarefas em segundo plano para operações longas (ex: buscas do wizard).
+O envio devolve o id da tarefa imediatamente e o cliente consulta o status e
+o resultado depois. Usa Celery quando há Redis disponível; caso contrário,
+executa as tarefas em um pool de threads no próprio processo.
+"""
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED_STATES = {SUCCEEDED, FAILED, CANCELLED}
+
+# Funções de tarefa registradas por nome: func(payload, context) -> resultado serializável em JSON
+TASKS: Dict[str, Callable[[Dict[str, Any], 'JobContext'], Any]] = {}
+
+class JobCancelled(BaseException):
+    """
+    Tarefa cancelada (ou com tempo limite excedido) em um ponto de verificação.
+    Deriva de BaseException para atravessar os `except Exception` dos
+    extratores quando levantada de dentro de um callback de progresso.
+    """
+
+class CancelledTaskError(Exception):
+    """Forma serializável de JobCancelled registrada como falha no Celery"""
+
+class QueueFull(Exception):
+    """Limite de tarefas pendentes atingido"""
+
+def task(name: str):
+    """Registra uma função como tarefa executável pela fila"""
+    def decorator(func):
+        TASKS[name] = func
+        return func
+    return decorator
+
+def _env_bool(name: str, default: str = 'false') -> bool:
+    return os.getenv(name, default).lower() in ('1', 'true', 'yes')
+
+class JobContext:
+    """
+    Passado à função da tarefa para reportar progresso. Cada chamada de
+    `progress`/`check` é um ponto de cancelamento cooperativo.
+    """
+
+    def __init__(self, job_id: str,
+                 is_cancelled: Callable[[], bool],
+                 report: Callable[[str, Dict[str, Any]], None],
+                 timeout: Optional[float] = None):
+        self.job_id = job_id
+        self._is_cancelled = is_cancelled
+        self._report = report
+        self.deadline = time.monotonic() + timeout if timeout else None
+
+    def check(self):
+        if self._is_cancelled():
+            raise JobCancelled('Tarefa cancelada')
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise JobCancelled('Tempo limite da tarefa excedido')
+
+    def progress(self, stage: str, **info):
+        """Registra um evento de etapa (ex: crawl_started, products_parsed)"""
+        self.check()
+        self._report(stage, info)
+
+def _event(sequence: int, stage: str, info: Dict[str, Any]) -> Dict[str, Any]:
+    return {'id': sequence, 'stage': stage, 'data': info, 'at': datetime.utcnow().isoformat()}
+
+def _summary(info: Dict[str, Any]) -> Dict[str, Any]:
+    """Progresso exibido no status: sem as listas parciais de produtos"""
+    return {key: value for key, value in info.items() if key != 'products'}
+
+@dataclass
+class Job:
+    id: str
+    name: str
+    status: str = QUEUED
+    stage: Optional[str] = None
+    progress: Dict[str, Any] = field(default_factory=dict)
+    result: Any = None
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    cancel_requested: bool = False
+    # Eventos de etapa na ordem de emissão (o id é a posição + 1)
+    events: List[Dict[str, Any]] = field(default_factory=list)
+
+    def to_dict(self, include_result: bool = False) -> Dict[str, Any]:
+        data = {
+            'id': self.id,
+            'name': self.name,
+            'status': self.status,
+            'stage': self.stage,
+            'progress': self.progress,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+        if include_result:
+            data['result'] = self.result
+        return data
+
+class ThreadPoolBackend:
+    """
+    Tarefas executadas em threads do próprio processo. Estado e resultados
+    ficam em memória; tarefas finalizadas são descartadas após `result_ttl`.
+    """
+    name = 'thread'
+
+    def __init__(self, runner: Callable[[str, Dict[str, Any], JobContext], Any],
+                 concurrency: int, max_pending: int, timeout: Optional[float], result_ttl: float):
+        self.runner = runner
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.result_ttl = result_ttl
+        self._jobs: Dict[str, Job] = {}
+        self._futures = {}
+        self._lock = threading.Lock()
+        # Acorda os streams de eventos a cada novo evento ou mudança de status
+        self._changed = threading.Condition(self._lock)
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='job')
+
+    def submit(self, name: str, payload: Dict[str, Any]) -> Job:
+        with self._lock:
+            self._prune()
+            pending = sum(1 for job in self._jobs.values() if job.status == QUEUED)
+            if self.max_pending and pending >= self.max_pending:
+                raise QueueFull(f'Limite de {self.max_pending} tarefas pendentes atingido')
+
+            job = Job(id=uuid.uuid4().hex, name=name)
+            self._jobs[job.id] = job
+            self._futures[job.id] = self._executor.submit(self._run, job, payload)
+
+        logger.info(f"Job {job.id} ({name}) queued")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED_STATES:
+                return job
+
+            job.cancel_requested = True
+            future = self._futures.get(job_id)
+            # Ainda na fila: nunca chega a executar. Em execução: para no próximo ponto de verificação
+            if future is not None and future.cancel():
+                self._finish(job, CANCELLED, error='Tarefa cancelada')
+
+        logger.info(f"Job {job_id} cancellation requested")
+        return job
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return {'backend': self.name, 'concurrency': self.concurrency, 'max_pending': self.max_pending, 'jobs': counts}
+
+    def after_fork(self):
+        """
+        No processo filho (workers pré-fork): threads do pai não existem aqui,
+        então pool, locks e registro de tarefas são recriados
+        """
+        self._jobs = {}
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='job')
+
+    def _run(self, job: Job, payload: Dict[str, Any]):
+        with self._lock:
+            if job.cancel_requested:
+                self._finish(job, CANCELLED, error='Tarefa cancelada')
+                return
+            job.status = RUNNING
+            job.started_at = datetime.utcnow()
+            self._changed.notify_all()
+
+        def report(stage, info):
+            with self._lock:
+                job.stage = stage
+                job.progress = _summary(info)
+                job.events.append(_event(len(job.events) + 1, stage, info))
+                self._changed.notify_all()
+
+        context = JobContext(job.id, lambda: job.cancel_requested, report, self.timeout)
+        try:
+            result = self.runner(job.name, payload, context)
+            with self._lock:
+                job.result = result
+                self._finish(job, SUCCEEDED)
+            logger.info(f"Job {job.id} ({job.name}) succeeded")
+        except JobCancelled as e:
+            with self._lock:
+                self._finish(job, CANCELLED, error=str(e))
+            logger.info(f"Job {job.id} ({job.name}) cancelled: {str(e)}")
+        except Exception as e:
+            with self._lock:
+                self._finish(job, FAILED, error=str(e))
+            logger.error(f"Job {job.id} ({job.name}) failed: {str(e)}")
+
+    def events(self, job_id: str, after: int, timeout: float) -> Tuple[List[Dict[str, Any]], bool]:
+        """Eventos com id > after (espera até `timeout` por novidades) e se a tarefa terminou"""
+        with self._changed:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return [], True
+            if len(job.events) <= after and job.status not in FINISHED_STATES:
+                self._changed.wait(timeout)
+            return job.events[after:], job.status in FINISHED_STATES
+
+    def _finish(self, job: Job, status: str, error: Optional[str] = None):
+        job.status = status
+        job.error = error
+        job.finished_at = datetime.utcnow()
+        self._futures.pop(job.id, None)
+        self._changed.notify_all()
+
+    def _prune(self):
+        """Descarta tarefas finalizadas há mais de result_ttl segundos"""
+        now = datetime.utcnow()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at and (now - job.finished_at).total_seconds() > self.result_ttl
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+class CeleryBackend:
+    """
+    Tarefas enviadas ao Celery (broker e resultados no Redis). Os metadados
+    de envio e os pedidos de cancelamento ficam em chaves do Redis para que o
+    worker e qualquer processo web enxerguem o mesmo estado.
+    """
+    name = 'celery'
+
+    STATUS_MAP = {
+        'PENDING': QUEUED,
+        'RECEIVED': QUEUED,
+        'RETRY': QUEUED,
+        'STARTED': RUNNING,
+        'PROGRESS': RUNNING,
+        'SUCCESS': SUCCEEDED,
+        'FAILURE': FAILED,
+        'REVOKED': CANCELLED
+    }
+
+    def __init__(self, runner: Callable[[str, Dict[str, Any], JobContext], Any], redis_url: str,
+                 concurrency: int, timeout: Optional[float], result_ttl: float, terminate_on_cancel: bool):
+        import redis
+        from celery import Celery
+
+        self.concurrency = concurrency
+        self.result_ttl = int(result_ttl)
+        self.terminate_on_cancel = terminate_on_cancel
+        self.poll_interval = 0.5
+        self.redis = redis.Redis.from_url(redis_url)
+        self.celery = Celery('compara_precos', broker=redis_url, backend=redis_url)
+        self.celery.conf.update(
+            task_serializer='json',
+            result_serializer='json',
+            accept_content=['json'],
+            task_track_started=True,
+            result_expires=self.result_ttl,
+            worker_concurrency=concurrency,
+            # Uma tarefa longa por vez por processo do worker
+            worker_prefetch_multiplier=1,
+            task_soft_time_limit=timeout or None
+        )
+
+        backend = self
+
+        @self.celery.task(name='jobs.execute', bind=True)
+        def execute(celery_task, name, payload):
+            job_id = celery_task.request.id
+
+            def report(stage, info):
+                events_key = backend._events_key(job_id)
+                sequence = backend.redis.rpush(events_key, json.dumps(_event(0, stage, info), default=str))
+                backend.redis.expire(events_key, backend.result_ttl)
+                celery_task.update_state(state='PROGRESS', meta={'stage': stage, 'progress': _summary(info), 'events': sequence})
+
+            context = JobContext(job_id, lambda: backend._cancel_requested(job_id), report, timeout)
+            try:
+                return runner(name, payload, context)
+            except JobCancelled as e:
+                raise CancelledTaskError(str(e)) from None
+
+        self._execute = execute
+
+    def submit(self, name: str, payload: Dict[str, Any]) -> Job:
+        job = Job(id=uuid.uuid4().hex, name=name)
+        self.redis.hset(self._key(job.id), mapping={'name': name, 'created_at': job.created_at.isoformat()})
+        self.redis.expire(self._key(job.id), self.result_ttl)
+        self._execute.apply_async(args=[name, payload], task_id=job.id)
+        logger.info(f"Job {job.id} ({name}) sent to Celery")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        meta = self.redis.hgetall(self._key(job_id))
+        if not meta:
+            return None
+
+        result = self.celery.AsyncResult(job_id)
+        job = Job(
+            id=job_id,
+            name=meta[b'name'].decode(),
+            status=self.STATUS_MAP.get(result.state, QUEUED),
+            created_at=datetime.fromisoformat(meta[b'created_at'].decode()),
+            cancel_requested=self._cancel_requested(job_id)
+        )
+
+        if result.state == 'PROGRESS' and isinstance(result.info, dict):
+            job.stage = result.info.get('stage')
+            job.progress = result.info.get('progress') or {}
+        elif result.state == 'SUCCESS':
+            job.result = result.result
+            job.finished_at = result.date_done
+        elif result.state == 'FAILURE':
+            job.error = str(result.result)
+            job.finished_at = result.date_done
+            if type(result.result).__name__ in ('CancelledTaskError', 'SoftTimeLimitExceeded'):
+                job.status = CANCELLED
+        elif result.state == 'REVOKED':
+            job.error = 'Tarefa cancelada'
+        return job
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        if not self.redis.exists(self._key(job_id)):
+            return None
+
+        self.redis.hset(self._key(job_id), 'cancel', 1)
+        # Na fila: descartada pelo worker. Em execução: para no próximo ponto de
+        # verificação ou, com JOB_CANCEL_TERMINATE, o processo é interrompido
+        self.celery.control.revoke(job_id, terminate=self.terminate_on_cancel)
+        logger.info(f"Job {job_id} cancellation requested")
+        return self.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'backend': self.name, 'concurrency': self.concurrency}
+
+    def events(self, job_id: str, after: int, timeout: float) -> Tuple[List[Dict[str, Any]], bool]:
+        """Eventos com id > after; consulta o Redis periodicamente até `timeout`"""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            raw = self.redis.lrange(self._events_key(job_id), after, -1)
+            finished = job is None or job.status in FINISHED_STATES
+            if raw or finished or time.monotonic() >= deadline:
+                events = []
+                for offset, item in enumerate(raw, start=after + 1):
+                    event = json.loads(item)
+                    event['id'] = offset
+                    events.append(event)
+                return events, finished
+            time.sleep(self.poll_interval)
+
+    def after_fork(self):
+        """Conexões Redis são recriadas por processo pelo próprio cliente"""
+
+    def _cancel_requested(self, job_id: str) -> bool:
+        return bool(self.redis.hget(self._key(job_id), 'cancel'))
+
+    @staticmethod
+    def _key(job_id: str) -> str:
+        return f'job:{job_id}'
+
+    @staticmethod
+    def _events_key(job_id: str) -> str:
+        return f'job:{job_id}:events'
+
+class JobManager:
+    """
+    Ponto de entrada da fila. `init_app` escolhe o backend conforme
+    JOB_BACKEND (auto | celery | thread); em modo automático usa Celery
+    quando o Redis de REDIS_URL responde.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.backend = None
+
+    def init_app(self, app):
+        self.app = app
+        concurrency = int(os.getenv('JOB_CONCURRENCY', 2))
+        timeout = float(os.getenv('JOB_TIMEOUT', 600)) or None
+        result_ttl = float(os.getenv('JOB_RESULT_TTL', 3600))
+        requested = os.getenv('JOB_BACKEND', 'auto').lower()
+        redis_url = os.getenv('REDIS_URL')
+
+        if requested in ('auto', 'celery') and redis_url and self._celery_available(redis_url):
+            self.backend = CeleryBackend(
+                self.run, redis_url, concurrency, timeout, result_ttl,
+                terminate_on_cancel=_env_bool('JOB_CANCEL_TERMINATE')
+            )
+        else:
+            if requested == 'celery':
+                logger.warning("Celery/Redis unavailable, falling back to in-process job pool")
+            self.backend = ThreadPoolBackend(
+                self.run, concurrency, int(os.getenv('JOB_MAX_PENDING', 20)), timeout, result_ttl
+            )
+
+        app.extensions['jobs'] = self
+        logger.info(f"Job queue using {self.backend.name} backend (concurrency {concurrency})")
+
+    @property
+    def celery(self):
+        """Aplicação Celery (para o worker: celery -A src.main:celery worker) ou None"""
+        return getattr(self.backend, 'celery', None)
+
+    def submit(self, name: str, payload: Dict[str, Any]) -> Job:
+        if name not in TASKS:
+            raise ValueError(f'Tarefa desconhecida: {name}')
+        return self.backend.submit(name, payload)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.backend.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        return self.backend.cancel(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.backend.stats()
+
+    def events(self, job_id: str, after: int = 0, timeout: float = 15) -> Tuple[List[Dict[str, Any]], bool]:
+        """Eventos de etapa posteriores a `after` e se a tarefa já terminou"""
+        return self.backend.events(job_id, after, timeout)
+
+    @property
+    def shared(self) -> bool:
+        """Estado visível a todos os processos (False no pool local em memória)"""
+        return self.backend is not None and self.backend.name == 'celery'
+
+    def after_fork(self):
+        if self.backend is not None:
+            self.backend.after_fork()
+
+    def run(self, name: str, payload: Dict[str, Any], context: JobContext) -> Any:
+        """Executa a tarefa registrada dentro do contexto da aplicação (acesso ao banco)"""
+        context.check()
+        with self.app.app_context():
+            return TASKS[name](payload, context)
+
+    @staticmethod
+    def _celery_available(redis_url: str) -> bool:
+        try:
+            import redis
+            import celery  # noqa: F401
+            redis.Redis.from_url(redis_url, socket_connect_timeout=1).ping()
+            return True
+        except Exception as e:
+            logger.info(f"Celery backend unavailable: {str(e)}")
+            return False
+
+job_manager = JobManager()
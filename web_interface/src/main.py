@@ -5,9 +5,11 @@ from logging.handlers import RotatingFileHandler
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory, session
+from flask import Flask, send_from_directory, session, request
 from flask_cors import CORS
 from src.database import db
+from src.jobs import job_manager
+from src import http_cache
 from datetime import datetime
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
@@ -52,15 +54,27 @@ app.config['SESSION_TYPE'] = 'filesystem'
 # Inicializa banco de dados
 db.init_app(app)
 
+# Fila de tarefas em segundo plano (Celery com Redis ou pool de threads local)
+job_manager.init_app(app)
+# Worker Celery: cd web_interface && celery -A src.main:celery worker
+celery = job_manager.celery
+
+# ETag/304, compressão e cache de longa duração dos assets com impressão digital
+http_cache.init_app(app)
+
 # Importa rotas
 from src.routes.user import user_bp
 from src.routes.auth import auth_bp
 from src.routes.search_wizard import search_wizard_bp
+from src.routes.market_analysis import market_analysis_bp
+from src.routes.jobs import jobs_bp
 
 # Registra blueprints
 app.register_blueprint(user_bp, url_prefix='/api')
 app.register_blueprint(auth_bp, url_prefix='/api/auth')
 app.register_blueprint(search_wizard_bp, url_prefix='/api/search-wizard')
+app.register_blueprint(market_analysis_bp, url_prefix='/api/market-analysis')
+app.register_blueprint(jobs_bp, url_prefix='/api/jobs')
 
 # Health check endpoint para Docker
 @app.route('/api/health')
@@ -76,11 +90,17 @@ def health_check():
 with app.app_context():
     # Importa e cria modelos
     from src.models.auth import User, Session, create_default_user
-    from src.models.search_config import SearchConfig, SavedProduct, MonitoringLog, ImageDownload, SocialPost
+    from src.models.search_config import SearchConfig, SavedProduct, MonitoringLog, ImageDownload, SocialPost, ChangeCounter
+    from src.models.opportunity import OpportunityEntry
+    from src.models.product import Product, PriceHistory
     
     # Cria todas as tabelas
     db.create_all()
     
+    # Migrações incrementais (índices e ajustes em bancos já existentes)
+    from src.migrations import run_migrations
+    run_migrations()
+    
     # Cria usuário padrão
     create_default_user()
 
@@ -96,13 +116,16 @@ def serve(path):
     else:
         index_path = os.path.join(static_folder_path, 'index.html')
         if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
+            return http_cache.index_response(static_folder_path)
         else:
             return "index.html not found", 404
 
 @app.errorhandler(404)
 def not_found(error):
-    return send_from_directory(app.static_folder, 'index.html')
+    # Rotas da API respondem 404 em JSON; as demais caem no painel (SPA)
+    if request.path.startswith('/api/'):
+        return {"error": "Not found"}, 404
+    return http_cache.index_response(app.static_folder)
 
 @app.errorhandler(500)
 def internal_error(error):
@@ -123,4 +146,11 @@ if __name__ == '__main__':
     port = int(os.getenv('PORT', 5000))
     debug = os.getenv('DEBUG', 'true').lower() == 'true'
     
+    # Monitoramento das buscas fixas no mesmo processo (com o reloader do
+    # modo debug, só no processo filho que atende as requisições)
+    if os.getenv('MONITORING_ENABLED', 'false').lower() == 'true' and (not debug or os.getenv('WERKZEUG_RUN_MAIN') == 'true'):
+        from src.monitoring import monitoring_scheduler
+        monitoring_scheduler.init_app(app)
+        monitoring_scheduler.start()
+    
     app.run(host=host, port=port, debug=debug, threaded=True)
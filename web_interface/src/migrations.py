@@ -0,0 +1,86 @@
+"""
+Migrações incrementais do banco SQLite. A versão aplicada fica em
+PRAGMA user_version; cada migração roda uma única vez, em transação, na
+inicialização da aplicação (depois do db.create_all, que cria as tabelas
+novas mas não altera tabelas existentes).
+"""
+import logging
+from sqlalchemy import text
+from .database import db
+from .models.product import backfill_products
+
+logger = logging.getLogger(__name__)
+
+def add_column(table, column, definition):
+    """Passo de migração que adiciona uma coluna se ela ainda não existir"""
+    def step(connection):
+        columns = {row[1] for row in connection.execute(text(f'PRAGMA table_info({table})'))}
+        if column not in columns:
+            connection.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {definition}'))
+    return step
+
+# (versão, descrição, passos). Cada passo é um comando SQL ou uma função que
+# recebe a conexão da transação. Os nomes dos índices seguem o padrão
+# ix_<tabela>_<coluna> do SQLAlchemy, o mesmo gerado pelos index=True dos
+# modelos em bancos novos, por isso IF NOT EXISTS.
+MIGRATIONS = [
+    (1, 'Índices das chaves estrangeiras e consultas de sessão', [
+        'CREATE INDEX IF NOT EXISTS ix_saved_products_search_config_id ON saved_products (search_config_id)',
+        'CREATE INDEX IF NOT EXISTS ix_monitoring_logs_search_config_id ON monitoring_logs (search_config_id)',
+        'CREATE INDEX IF NOT EXISTS ix_monitoring_logs_execution_time ON monitoring_logs (execution_time)',
+        'CREATE INDEX IF NOT EXISTS ix_image_downloads_saved_product_id ON image_downloads (saved_product_id)',
+        'CREATE INDEX IF NOT EXISTS ix_social_posts_saved_product_id ON social_posts (saved_product_id)',
+        'CREATE INDEX IF NOT EXISTS ix_sessions_user_id ON sessions (user_id)',
+        'CREATE INDEX IF NOT EXISTS ix_search_configs_is_active ON search_configs (is_active)',
+        'CREATE INDEX IF NOT EXISTS ix_search_configs_created_at ON search_configs (created_at)',
+        'ANALYZE'
+    ]),
+    # As tabelas products e price_history são criadas pelo db.create_all
+    (2, 'Produtos normalizados e histórico de preços a partir dos blobs JSON', [
+        add_column('saved_products', 'product_id', 'INTEGER REFERENCES products (id)'),
+        'CREATE INDEX IF NOT EXISTS ix_saved_products_product_id ON saved_products (product_id)',
+        backfill_products,
+        'ANALYZE'
+    ]),
+    (3, 'Contagem de produtos alterados no log de monitoramento', [
+        add_column('monitoring_logs', 'changed_products', 'INTEGER DEFAULT 0')
+    ]),
+    (4, 'Faixas de especificação das buscas salvas', [
+        add_column('search_configs', 'spec_filters', 'TEXT')
+    ]),
+    # A tabela change_counters é criada pelo db.create_all
+    (5, 'Contadores de gravação usados como versão dos caches', [
+        "INSERT OR IGNORE INTO change_counters (name, value) VALUES ('saved_products', 0), ('search_configs', 0)"
+    ]),
+    (6, 'Marca de gravação dos produtos salvos para as facetas incrementais', [
+        add_column('saved_products', 'change_seq', 'INTEGER DEFAULT 0'),
+        'CREATE INDEX IF NOT EXISTS ix_saved_products_change_seq ON saved_products (change_seq)'
+    ]),
+]
+
+def current_version(connection) -> int:
+    return connection.execute(text('PRAGMA user_version')).scalar() or 0
+
+def run_migrations(engine=None) -> int:
+    """Aplica as migrações pendentes e retorna a versão final do banco"""
+    engine = engine or db.engine
+
+    with engine.begin() as connection:
+        version = current_version(connection)
+
+    for target, description, statements in MIGRATIONS:
+        if target <= version:
+            continue
+
+        logger.info(f"Applying database migration {target}: {description}")
+        with engine.begin() as connection:
+            for statement in statements:
+                if callable(statement):
+                    statement(connection)
+                else:
+                    connection.execute(text(statement))
+            # PRAGMA não aceita parâmetros; a versão vem da lista acima
+            connection.execute(text(f'PRAGMA user_version = {int(target)}'))
+        version = target
+
+    return version
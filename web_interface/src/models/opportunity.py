@@ -0,0 +1,186 @@
+"""
+Ranking materializado de oportunidades (uma linha por produto canônico),
+atualizado incrementalmente quando preço, estoque ou mercado mudam
+"""
+import json
+import hashlib
+from datetime import datetime
+from ..database import db
+
+class OpportunityEntry(db.Model):
+    """
+    Resultado de OpportunityAnalysis (e, quando disponível, da análise de
+    mercado) de um produto
+    """
+    __tablename__ = 'opportunity_leaderboard'
+    __table_args__ = (
+        db.Index('ix_opportunity_score_price', 'opportunity_score', 'price_usd'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    product_key = db.Column(db.String(64), unique=True, nullable=False, index=True)
+    saved_product_id = db.Column(db.Integer, db.ForeignKey('saved_products.id'), nullable=True)
+    search_config_id = db.Column(db.Integer, db.ForeignKey('search_configs.id'), nullable=True, index=True)
+
+    product_name = db.Column(db.String(500), nullable=True)
+    brand = db.Column(db.String(100), nullable=True, index=True)
+    category = db.Column(db.String(100), nullable=True, index=True)
+    url = db.Column(db.String(1000), nullable=True)
+    price_usd = db.Column(db.Float, nullable=True, index=True)
+    price_brl = db.Column(db.Float, nullable=True)
+    in_stock = db.Column(db.Boolean, default=False, index=True)
+
+    # OpportunityAnalysis
+    opportunity_score = db.Column(db.Float, nullable=False, default=0, index=True)
+    price_category = db.Column(db.String(50), nullable=True)
+    value_rating = db.Column(db.String(50), nullable=True, index=True)
+    recommendations = db.Column(db.Text, nullable=True)  # JSON string
+
+    # Análise de mercado (preenchida quando o produto é analisado)
+    market_position = db.Column(db.String(50), nullable=True, index=True)
+    market_score = db.Column(db.Float, nullable=True)
+    official_avg_price = db.Column(db.Float, nullable=True)
+    total_cost_estimate = db.Column(db.Float, nullable=True)
+
+    product_data = db.Column(db.Text, nullable=False)  # JSON string com dados do produto
+    # Hash dos campos que alteram o ranking: linhas sem mudança não são regravadas
+    fingerprint = db.Column(db.String(40), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<OpportunityEntry {self.product_key}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'product_key': self.product_key,
+            'saved_id': self.saved_product_id,
+            'search_config_id': self.search_config_id,
+            'product': json.loads(self.product_data),
+            'opportunity_score': self.opportunity_score,
+            'price_category': self.price_category,
+            'value_rating': self.value_rating,
+            'recommendations': json.loads(self.recommendations or '[]'),
+            'market_position': self.market_position or 'unknown',
+            'market_score': self.market_score,
+            'official_avg_price': self.official_avg_price,
+            'total_cost_estimate': self.total_cost_estimate,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+def _fingerprint(values):
+    return hashlib.sha1(json.dumps(values, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+def _product_fields(product):
+    return {
+        'product_name': product.get('nome'),
+        'brand': (product.get('marca') or '').lower() or None,
+        'category': (product.get('categoria') or '').lower() or None,
+        'url': product.get('url'),
+        'price_usd': product.get('preco_usd'),
+        'price_brl': product.get('preco_brl'),
+        'in_stock': 'estoque' in (product.get('estoque') or '').lower()
+    }
+
+def upsert_opportunities(analyses, search_config_id=None, saved_ids=None):
+    """
+    Grava OpportunityAnalysis no ranking. Só insere/atualiza as linhas cujo
+    preço, estoque ou score mudou. Os produtos precisam ter "product_key";
+    `saved_ids` mapeia product_key -> id do SavedProduct. Retorna o número de
+    linhas alteradas.
+    """
+    saved_ids = saved_ids or {}
+    by_key = {}
+    for analysis in analyses:
+        if analysis.product.get('product_key'):
+            by_key[analysis.product['product_key']] = analysis
+    if not by_key:
+        return 0
+
+    existing = {
+        entry.product_key: entry
+        for entry in OpportunityEntry.query.filter(OpportunityEntry.product_key.in_(list(by_key)))
+    }
+
+    changed = 0
+    for key, analysis in by_key.items():
+        fields = _product_fields(analysis.product)
+        fields.update({
+            'opportunity_score': float(analysis.opportunity_score),
+            'price_category': analysis.price_category,
+            'value_rating': analysis.value_rating,
+            'recommendations': json.dumps(analysis.recommendations, ensure_ascii=False)
+        })
+
+        entry = existing.get(key)
+        market = _market_fields(entry)
+        fingerprint = _fingerprint({**fields, **market})
+
+        if entry is not None and entry.fingerprint == fingerprint:
+            continue
+
+        if entry is None:
+            entry = OpportunityEntry(product_key=key)
+            db.session.add(entry)
+
+        for name, value in fields.items():
+            setattr(entry, name, value)
+        entry.product_data = json.dumps(analysis.product, ensure_ascii=False)
+        entry.fingerprint = fingerprint
+        if search_config_id is not None:
+            entry.search_config_id = search_config_id
+        if key in saved_ids:
+            entry.saved_product_id = saved_ids[key]
+        changed += 1
+
+    db.session.commit()
+    return changed
+
+def update_market_stats(product, analysis, commit=True):
+    """
+    Atualiza os campos de mercado de um produto já ranqueado a partir de um
+    MarketAnalysis. Retorna True se a linha mudou.
+    """
+    if analysis is None or not product.get('product_key'):
+        return False
+
+    entry = OpportunityEntry.query.filter_by(product_key=product['product_key']).first()
+    if entry is None:
+        return False
+
+    market = {
+        'market_position': analysis.market_position,
+        'market_score': float(analysis.opportunity_score),
+        'official_avg_price': analysis.official_avg_price,
+        'total_cost_estimate': float(analysis.total_cost_estimate)
+    }
+    fingerprint = _fingerprint({**_entry_fields(entry), **market})
+    if entry.fingerprint == fingerprint:
+        return False
+
+    for name, value in market.items():
+        setattr(entry, name, value)
+    entry.fingerprint = fingerprint
+    if commit:
+        db.session.commit()
+    return True
+
+def _market_fields(entry):
+    names = ('market_position', 'market_score', 'official_avg_price', 'total_cost_estimate')
+    return {name: getattr(entry, name, None) for name in names}
+
+def _entry_fields(entry):
+    return {
+        'product_name': entry.product_name,
+        'brand': entry.brand,
+        'category': entry.category,
+        'url': entry.url,
+        'price_usd': entry.price_usd,
+        'price_brl': entry.price_brl,
+        'in_stock': entry.in_stock,
+        'opportunity_score': entry.opportunity_score,
+        'price_category': entry.price_category,
+        'value_rating': entry.value_rating,
+        'recommendations': entry.recommendations
+    }
@@ -0,0 +1,309 @@
+"""
+Catálogo normalizado de produtos (uma linha por produto canônico) e
+histórico de preços da loja. Os filtros de preço, marca e categoria e as
+consultas de tendência rodam em SQL indexado; o JSON completo continua em
+SavedProduct.product_data como retrato do produto no momento da busca.
+"""
+import os
+import sys
+import json
+from datetime import datetime, timedelta
+from sqlalchemy import func, and_, or_, insert, update, select, bindparam
+from ..database import db
+from .search_config import SavedProduct, encode_cursor, decode_cursor
+
+# Adiciona a raiz do projeto ao path para importar a identidade de produtos
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from app.extractors.product_identity import ensure_product_key, product_code
+
+class Product(db.Model):
+    """
+    Produto canônico com os valores da última coleta
+    """
+    __tablename__ = 'products'
+    __table_args__ = (
+        db.Index('ix_products_category_price', 'category', 'price_usd'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    product_key = db.Column(db.String(64), unique=True, nullable=False, index=True)
+    code = db.Column(db.String(100), nullable=True, index=True)
+    name = db.Column(db.String(500), nullable=True)
+    brand = db.Column(db.String(100), nullable=True, index=True)
+    model = db.Column(db.String(200), nullable=True)
+    category = db.Column(db.String(100), nullable=True, index=True)
+    url = db.Column(db.String(1000), nullable=True, index=True)
+    price_usd = db.Column(db.Float, nullable=True, index=True)
+    price_brl = db.Column(db.Float, nullable=True)
+    in_stock = db.Column(db.Boolean, default=False, index=True)
+    specifications = db.Column(db.Text, nullable=True)  # JSON string
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+    price_history = db.relationship('PriceHistory', backref='product', lazy='dynamic', cascade='all, delete-orphan')
+
+    def __repr__(self):
+        return f'<Product {self.product_key}>'
+
+    def to_dict(self, include_specs=False):
+        data = {
+            'id': self.id,
+            'product_key': self.product_key,
+            'codigo': self.code,
+            'nome': self.name,
+            'marca': self.brand,
+            'modelo': self.model,
+            'categoria': self.category,
+            'url': self.url,
+            'preco_usd': self.price_usd,
+            'preco_brl': self.price_brl,
+            'in_stock': self.in_stock,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+        if include_specs:
+            data['especificacoes'] = json.loads(self.specifications) if self.specifications else None
+        return data
+
+class PriceHistory(db.Model):
+    """
+    Preço e estoque de um produto a cada mudança observada
+    """
+    __tablename__ = 'price_history'
+    __table_args__ = (
+        db.Index('ix_price_history_product_collected', 'product_id', 'collected_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    price_usd = db.Column(db.Float, nullable=True)
+    price_brl = db.Column(db.Float, nullable=True)
+    in_stock = db.Column(db.Boolean, default=False)
+    source = db.Column(db.String(50), nullable=True)  # search_approval, monitoring, migration
+    collected_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<PriceHistory {self.product_id} {self.price_usd}>'
+
+    def to_dict(self):
+        return {
+            'preco_usd': self.price_usd,
+            'preco_brl': self.price_brl,
+            'in_stock': self.in_stock,
+            'source': self.source,
+            'collected_at': self.collected_at.isoformat() if self.collected_at else None
+        }
+
+def _to_float(value):
+    try:
+        return float(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+def product_columns(product):
+    """Colunas normalizadas de um produto extraído (marca e categoria em minúsculas)"""
+    specs = product.get('especificacoes')
+    return {
+        'code': product_code(product),
+        'name': product.get('nome'),
+        'brand': (product.get('marca') or '').lower() or None,
+        'model': product.get('modelo'),
+        'category': (product.get('categoria') or '').lower() or None,
+        'url': product.get('url'),
+        'price_usd': _to_float(product.get('preco_usd')),
+        'price_brl': _to_float(product.get('preco_brl')),
+        'in_stock': 'estoque' in (product.get('estoque') or '').lower(),
+        'specifications': json.dumps(specs, ensure_ascii=False) if specs else None
+    }
+
+PRICE_FIELDS = ('price_usd', 'price_brl', 'in_stock')
+
+def record_products(connection, observations, source):
+    """
+    Insere/atualiza produtos em `products` e acrescenta uma linha em
+    `price_history` quando o produto é novo ou o preço/estoque mudou.
+    `observations` são pares (produto, data da coleta) em ordem cronológica.
+    Usa SQL direto na conexão para servir tanto à aplicação
+    (db.session.connection()) quanto à migração. Retorna product_key -> id.
+    """
+    observations = [(product, collected_at) for product, collected_at in observations]
+    keys = {ensure_product_key(product) for product, _ in observations}
+    if not keys:
+        return {}
+
+    products = Product.__table__
+    state = {}
+    key_list = list(keys)
+    # Lotes abaixo do limite de variáveis por comando do SQLite
+    for start in range(0, len(key_list), 500):
+        rows = connection.execute(
+            select(products).where(products.c.product_key.in_(key_list[start:start + 500]))
+        ).mappings()
+        for row in rows:
+            state[row['product_key']] = dict(row)
+
+    history = []
+    for product, collected_at in observations:
+        key = product['product_key']
+        columns = product_columns(product)
+        current = state.get(key)
+
+        if current is None:
+            product_id = connection.execute(
+                insert(products).values(product_key=key, created_at=collected_at, updated_at=collected_at, **columns)
+            ).inserted_primary_key[0]
+            state[key] = current = {'id': product_id, **columns}
+            price_changed = True
+        else:
+            price_changed = any(current[field] != columns[field] for field in PRICE_FIELDS)
+            changed = {field: value for field, value in columns.items() if current[field] != value}
+            if changed:
+                connection.execute(
+                    update(products).where(products.c.id == current['id']).values(updated_at=collected_at, **changed)
+                )
+                current.update(changed)
+
+        if price_changed:
+            history.append({
+                'product_id': current['id'],
+                'price_usd': columns['price_usd'],
+                'price_brl': columns['price_brl'],
+                'in_stock': columns['in_stock'],
+                'source': source,
+                'collected_at': collected_at
+            })
+
+    if history:
+        connection.execute(insert(PriceHistory.__table__), history)
+
+    return {key: current['id'] for key, current in state.items()}
+
+def save_products(products, source):
+    """Registra produtos coletados agora na transação da sessão atual"""
+    now = datetime.utcnow()
+    return record_products(db.session.connection(), [(product, now) for product in products], source)
+
+def backfill_products(connection, batch_size=500):
+    """
+    Migração: cria produtos e histórico a partir dos blobs JSON de
+    saved_products (em ordem de id, a data de gravação vira a data da coleta)
+    e preenche saved_products.product_id
+    """
+    saved = SavedProduct.__table__
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            select(saved.c.id, saved.c.product_data, saved.c.created_at)
+            .where(saved.c.id > last_id, saved.c.product_id.is_(None))
+            .order_by(saved.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return
+
+        observations = []
+        links = []
+        for saved_id, product_data, created_at in rows:
+            try:
+                product = json.loads(product_data)
+            except (TypeError, ValueError):
+                continue
+            observations.append((product, created_at or datetime.utcnow()))
+            links.append((saved_id, product))
+
+        ids = record_products(connection, observations, source='migration')
+        if links:
+            connection.execute(
+                update(saved).where(saved.c.id == bindparam('saved_id')).values(product_id=bindparam('linked_id')),
+                [{'saved_id': saved_id, 'linked_id': ids[product['product_key']]} for saved_id, product in links]
+            )
+        last_id = rows[-1][0]
+
+# Ordenações aceitas pela listagem de produtos
+PRODUCT_SORTS = ('price_asc', 'price_desc', 'updated_desc')
+
+def query_products(limit=50, sort='price_asc', min_price_usd=None, max_price_usd=None,
+                   brand=None, category=None, in_stock=None, search_config_id=None, cursor=None):
+    """
+    Página de produtos filtrada em SQL (índices de preço, marca, categoria e
+    estoque) com paginação por cursor sobre (chave de ordenação, id). Nas
+    ordenações por preço, produtos sem preço ficam de fora.
+    Retorna (produtos, próximo cursor).
+    """
+    query = Product.query
+
+    if min_price_usd is not None:
+        query = query.filter(Product.price_usd >= min_price_usd)
+    if max_price_usd is not None:
+        query = query.filter(Product.price_usd <= max_price_usd)
+    if brand:
+        query = query.filter(Product.brand == brand.lower())
+    if category:
+        query = query.filter(Product.category == category.lower())
+    if in_stock is not None:
+        query = query.filter(Product.in_stock == in_stock)
+    if search_config_id is not None:
+        query = query.filter(Product.id.in_(
+            select(SavedProduct.product_id).where(SavedProduct.search_config_id == search_config_id)
+        ))
+
+    field, direction = sort.rsplit('_', 1)
+    sort_column = {'price': Product.price_usd, 'updated': Product.updated_at}[field]
+    descending = direction == 'desc'
+    if field == 'price':
+        query = query.filter(Product.price_usd.isnot(None))
+
+    if cursor:
+        value, last_id = decode_cursor(cursor, as_datetime=field == 'updated')
+        # Linhas depois da última entregue na ordem (chave, id)
+        if descending:
+            query = query.filter(or_(sort_column < value, and_(sort_column == value, Product.id < last_id)))
+        else:
+            query = query.filter(or_(sort_column > value, and_(sort_column == value, Product.id > last_id)))
+
+    if descending:
+        query = query.order_by(sort_column.desc(), Product.id.desc())
+    else:
+        query = query.order_by(sort_column.asc(), Product.id.asc())
+
+    # Uma linha a mais indica se existe próxima página
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([last.price_usd if field == 'price' else last.updated_at, last.id])
+
+    return rows, next_cursor
+
+def price_trend(product_id, days=None):
+    """
+    Histórico de preços de um produto (mais antigo primeiro) e resumo
+    calculado no banco: mínimo, máximo, média e variação do período
+    """
+    filters = [PriceHistory.product_id == product_id]
+    if days:
+        filters.append(PriceHistory.collected_at >= datetime.utcnow() - timedelta(days=days))
+
+    history = PriceHistory.query.filter(*filters).order_by(PriceHistory.collected_at, PriceHistory.id).all()
+    low, high, average, count = db.session.query(
+        func.min(PriceHistory.price_usd),
+        func.max(PriceHistory.price_usd),
+        func.avg(PriceHistory.price_usd),
+        func.count(PriceHistory.id)
+    ).filter(*filters).one()
+
+    priced = [entry.price_usd for entry in history if entry.price_usd is not None]
+    change = None
+    if len(priced) >= 2 and priced[0]:
+        change = (priced[-1] - priced[0]) / priced[0] * 100
+
+    return history, {
+        'points': count,
+        'min_price_usd': low,
+        'max_price_usd': high,
+        'avg_price_usd': average,
+        'first_price_usd': priced[0] if priced else None,
+        'last_price_usd': priced[-1] if priced else None,
+        'change_pct': change
+    }
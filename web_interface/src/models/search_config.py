@@ -1,8 +1,12 @@
 """
 Modelos de banco de dados para configurações de busca e produtos salvos
 """
-from ..database import db
+import json
+import base64
 from datetime import datetime
+from sqlalchemy import func, and_, or_, event, update, insert, select
+from sqlalchemy.orm import Session
+from ..database import db
 
 class SearchConfig(db.Model):
     """
@@ -17,10 +21,11 @@ class SearchConfig(db.Model):
     max_price_usd = db.Column(db.Float, nullable=True)
     categories = db.Column(db.Text, nullable=True)  # JSON string
     brands = db.Column(db.Text, nullable=True)      # JSON string
+    spec_filters = db.Column(db.Text, nullable=True)  # JSON string: faixas de especificação (min_ram_gb, ...)
     in_stock_only = db.Column(db.Boolean, default=True)
     sort_by = db.Column(db.String(50), default='price_asc')
-    is_active = db.Column(db.Boolean, default=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    is_active = db.Column(db.Boolean, default=True, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relacionamento com produtos salvos
@@ -28,6 +33,20 @@ class SearchConfig(db.Model):
     
     def __repr__(self):
         return f'<SearchConfig {self.name}>'
+    
+    def to_config(self):
+        """Configuração no formato do wizard, para reexecutar a busca"""
+        return {
+            'search_name': self.name,
+            'product_query': self.query,
+            'min_price_usd': self.min_price_usd,
+            'max_price_usd': self.max_price_usd,
+            'categories': json.loads(self.categories) if self.categories else [],
+            'brands': json.loads(self.brands) if self.brands else [],
+            'in_stock_only': self.in_stock_only,
+            'sort_by': self.sort_by,
+            **(json.loads(self.spec_filters) if self.spec_filters else {})
+        }
 
 class SavedProduct(db.Model):
     """
@@ -36,7 +55,8 @@ class SavedProduct(db.Model):
     __tablename__ = 'saved_products'
     
     id = db.Column(db.Integer, primary_key=True)
-    search_config_id = db.Column(db.Integer, db.ForeignKey('search_configs.id'), nullable=False)
+    search_config_id = db.Column(db.Integer, db.ForeignKey('search_configs.id'), nullable=False, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=True, index=True)  # produto normalizado
     product_data = db.Column(db.Text, nullable=False)  # JSON string com dados do produto
     image_urls = db.Column(db.Text, nullable=True)     # JSON string com URLs das imagens
     downloaded_images = db.Column(db.Text, nullable=True)  # JSON string com paths das imagens baixadas
@@ -44,6 +64,7 @@ class SavedProduct(db.Model):
     is_favorite = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    change_seq = db.Column(db.Integer, default=0, index=True)  # contador saved_products na última gravação
     
     def __repr__(self):
         return f'<SavedProduct {self.id}>'
@@ -55,11 +76,12 @@ class MonitoringLog(db.Model):
     __tablename__ = 'monitoring_logs'
     
     id = db.Column(db.Integer, primary_key=True)
-    search_config_id = db.Column(db.Integer, db.ForeignKey('search_configs.id'), nullable=False)
-    execution_time = db.Column(db.DateTime, default=datetime.utcnow)
+    search_config_id = db.Column(db.Integer, db.ForeignKey('search_configs.id'), nullable=False, index=True)
+    execution_time = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     products_found = db.Column(db.Integer, default=0)
     new_products = db.Column(db.Integer, default=0)
-    status = db.Column(db.String(50), default='success')  # success, error, warning
+    changed_products = db.Column(db.Integer, default=0)  # preço ou estoque alterado
+    status = db.Column(db.String(50), default='success')  # running, success, warning, error, interrupted
     message = db.Column(db.Text, nullable=True)
     execution_duration = db.Column(db.Float, nullable=True)  # em segundos
     
@@ -73,7 +95,7 @@ class ImageDownload(db.Model):
     __tablename__ = 'image_downloads'
     
     id = db.Column(db.Integer, primary_key=True)
-    saved_product_id = db.Column(db.Integer, db.ForeignKey('saved_products.id'), nullable=False)
+    saved_product_id = db.Column(db.Integer, db.ForeignKey('saved_products.id'), nullable=False, index=True)
     original_url = db.Column(db.String(1000), nullable=False)
     local_path = db.Column(db.String(500), nullable=False)
     file_size = db.Column(db.Integer, nullable=True)
@@ -92,7 +114,7 @@ class SocialPost(db.Model):
     __tablename__ = 'social_posts'
     
     id = db.Column(db.Integer, primary_key=True)
-    saved_product_id = db.Column(db.Integer, db.ForeignKey('saved_products.id'), nullable=False)
+    saved_product_id = db.Column(db.Integer, db.ForeignKey('saved_products.id'), nullable=False, index=True)
     platform = db.Column(db.String(50), nullable=False)  # instagram, facebook, twitter, etc
     template = db.Column(db.String(100), nullable=False)
     post_text = db.Column(db.Text, nullable=False)
@@ -105,3 +127,157 @@ class SocialPost(db.Model):
     def __repr__(self):
         return f'<SocialPost {self.platform} - {self.id}>'
 
+
+class ChangeCounter(db.Model):
+    """
+    Contador de gravações por tabela, incrementado na mesma transação de cada
+    escrita. Serve de marca de versão barata (leitura por chave primária) para
+    os caches dos processos web, inclusive para escritas do monitoramento.
+    """
+    __tablename__ = 'change_counters'
+
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<ChangeCounter {self.name}={self.value}>'
+
+# Contadores mantidos pelo before_flush: modelo -> nome do contador
+COUNTED_MODELS = {SavedProduct: 'saved_products', SearchConfig: 'search_configs'}
+
+def bump_change_counter(connection, name):
+    """Incrementa um contador na transação da conexão e retorna o novo valor"""
+    counters = ChangeCounter.__table__
+    result = connection.execute(
+        update(counters).where(counters.c.name == name).values(value=counters.c.value + 1)
+    )
+    if result.rowcount == 0:
+        connection.execute(insert(counters).values(name=name, value=1))
+    return connection.execute(select(counters.c.value).where(counters.c.name == name)).scalar()
+
+@event.listens_for(Session, 'before_flush')
+def _bump_change_counters(session, flush_context, instances):
+    written = [obj for obj in session.new if type(obj) in COUNTED_MODELS]
+    written += [obj for obj in session.dirty if type(obj) in COUNTED_MODELS and session.is_modified(obj)]
+    deleted = [obj for obj in session.deleted if type(obj) in COUNTED_MODELS]
+
+    names = {COUNTED_MODELS[type(obj)] for obj in written + deleted}
+    # Remoções de produtos (diretas ou em cascata com a busca) não cabem num
+    # upsert das facetas: contam à parte e forçam a recarga
+    if deleted:
+        names |= {'saved_products', 'saved_products_deleted'}
+    if not names:
+        return
+
+    connection = session.connection()
+    values = {name: bump_change_counter(connection, name) for name in sorted(names)}
+    # Produtos gravados ficam marcados com o contador desta transação
+    for obj in written:
+        if isinstance(obj, SavedProduct):
+            obj.change_seq = values['saved_products']
+
+def change_versions(*names):
+    """Valores atuais dos contadores (0 para os que ainda não existem)"""
+    values = dict(
+        db.session.query(ChangeCounter.name, ChangeCounter.value).filter(ChangeCounter.name.in_(names))
+    )
+    return tuple(values.get(name, 0) for name in names)
+
+def saved_products_version():
+    """
+    Marca de mudança dos produtos salvos (aprovações e monitoramento):
+    (última gravação, remoções)
+    """
+    return change_versions('saved_products', 'saved_products_deleted')
+
+def search_configs_version():
+    """Marca de mudança da listagem de buscas (buscas e contagens de produtos)"""
+    return change_versions('search_configs', 'saved_products')
+
+# Ordenações aceitas pela listagem de buscas (<campo>_<asc|desc>)
+SEARCH_SORTS = ('created_desc', 'created_asc', 'name_asc', 'name_desc', 'products_desc', 'products_asc')
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor, as_datetime=False):
+    """
+    Par (chave de ordenação, id) da última linha da página anterior.
+    Cursor malformado levanta ValueError (400 nas rotas).
+    """
+    try:
+        value, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        if isinstance(last_id, bool) or not isinstance(last_id, int):
+            raise TypeError(last_id)
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            raise TypeError(value)
+        if as_datetime:
+            value = datetime.fromisoformat(value)
+    except (ValueError, TypeError):
+        raise ValueError('Cursor inválido') from None
+    return value, last_id
+
+def list_search_configs(limit=50, sort='created_desc', is_active=None, cursor=None):
+    """
+    Página de buscas salvas com a contagem de produtos em uma única consulta
+    (contagem agrupada em subconsulta + LEFT JOIN) e paginação por cursor
+    (keyset) sobre (chave de ordenação, id). Retorna (linhas, próximo cursor).
+    """
+    counts = (
+        db.session.query(
+            SavedProduct.search_config_id.label('search_config_id'),
+            func.count(SavedProduct.id).label('product_count')
+        )
+        .group_by(SavedProduct.search_config_id)
+        .subquery()
+    )
+    product_count = func.coalesce(counts.c.product_count, 0)
+
+    field, direction = sort.rsplit('_', 1)
+    sort_column = {
+        'created': SearchConfig.created_at,
+        'name': SearchConfig.name,
+        'products': product_count
+    }[field]
+    descending = direction == 'desc'
+
+    query = (
+        db.session.query(
+            SearchConfig.id,
+            SearchConfig.name,
+            SearchConfig.query,
+            SearchConfig.min_price_usd,
+            SearchConfig.max_price_usd,
+            SearchConfig.is_active,
+            SearchConfig.created_at,
+            product_count.label('product_count')
+        )
+        .outerjoin(counts, counts.c.search_config_id == SearchConfig.id)
+    )
+
+    if is_active is not None:
+        query = query.filter(SearchConfig.is_active == is_active)
+
+    if cursor:
+        value, last_id = decode_cursor(cursor, as_datetime=field == 'created')
+        # Linhas depois da última entregue na ordem (chave, id)
+        if descending:
+            query = query.filter(or_(sort_column < value, and_(sort_column == value, SearchConfig.id < last_id)))
+        else:
+            query = query.filter(or_(sort_column > value, and_(sort_column == value, SearchConfig.id > last_id)))
+
+    if descending:
+        query = query.order_by(sort_column.desc(), SearchConfig.id.desc())
+    else:
+        query = query.order_by(sort_column.asc(), SearchConfig.id.asc())
+
+    # Uma linha a mais indica se existe próxima página
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        key = {'created': last.created_at, 'name': last.name, 'products': last.product_count}[field]
+        next_cursor = encode_cursor([key, last.id])
+
+    return rows, next_cursor
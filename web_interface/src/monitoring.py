@@ -0,0 +1,297 @@
+"""
+Agendador do monitoramento: reexecuta periodicamente cada SearchConfig ativa,
+compara o resultado com os SavedProduct da busca (produtos novos e com preço
+ou estoque alterado) e registra um MonitoringLog por execução.
+
+    cd web_interface && python -m src.monitoring        # processo dedicado
+    MONITORING_ENABLED=true python src/main.py          # junto do servidor de desenvolvimento
+
+Agendamento:
+  - cada busca vence MONITORING_INTERVAL_MINUTES depois da última execução
+    concluída, deslocada por um atraso fixo por busca (até
+    MONITORING_JITTER_SECONDS) para que as buscas não comecem juntas;
+  - no máximo MONITORING_CONCURRENCY buscas rodam ao mesmo tempo;
+  - o estado fica no banco: execuções marcadas como 'running' que não
+    terminaram (processo derrubado) viram 'interrupted' na partida seguinte e
+    a busca volta a vencer imediatamente;
+  - depois de um período parado, cada busca atrasada roda uma única vez (os
+    ciclos perdidos são agrupados e contados no log), espalhadas pela janela
+    de jitter a partir da partida.
+
+Com vários workers do gunicorn use o processo dedicado: cada processo com
+MONITORING_ENABLED teria o seu próprio agendador.
+"""
+import os
+import sys
+import json
+import time
+import signal
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import schedule
+from sqlalchemy import func
+from .database import db
+from .models.search_config import SearchConfig, SavedProduct, MonitoringLog
+from .models.product import PRICE_FIELDS, product_columns, save_products
+from app.extractors.product_identity import ensure_product_key
+
+logger = logging.getLogger(__name__)
+
+# Execuções concluídas contam para o próximo vencimento; interrompidas não
+FINISHED_STATUSES = ('success', 'warning', 'error')
+
+class MonitoringScheduler:
+    """
+    Agendador das buscas fixas. `tick` verifica periodicamente (via
+    `schedule`) quais buscas venceram e as envia a um pool limitado.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.interval = timedelta(minutes=float(os.getenv('MONITORING_INTERVAL_MINUTES', 60)))
+        self.jitter = int(os.getenv('MONITORING_JITTER_SECONDS', 300))
+        self.concurrency = int(os.getenv('MONITORING_CONCURRENCY', 2))
+        self.tick_seconds = int(os.getenv('MONITORING_TICK_SECONDS', 30))
+
+        self.scheduler = schedule.Scheduler()
+        self._pool = None
+        self._running = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.started_at = None
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+
+    def offset(self, search_id):
+        """Atraso fixo da busca dentro da janela de jitter (estável entre reinícios)"""
+        if self.jitter <= 0:
+            return timedelta(0)
+        digest = hashlib.sha1(str(search_id).encode('utf-8')).hexdigest()
+        return timedelta(seconds=int(digest, 16) % self.jitter)
+
+    def recover_interrupted(self):
+        """Marca como interrompidas as execuções que ficaram em 'running'"""
+        with self.app.app_context():
+            count = MonitoringLog.query.filter_by(status='running').update(
+                {'status': 'interrupted', 'message': 'Execução interrompida (processo encerrado)'},
+                synchronize_session=False
+            )
+            db.session.commit()
+        if count:
+            logger.warning(f"Marked {count} unfinished monitoring runs as interrupted")
+        return count
+
+    def due_searches(self, now=None):
+        """
+        Buscas ativas vencidas como pares (id, ciclos perdidos), em ordem de
+        vencimento. Uma única consulta com a última execução concluída de cada busca.
+        """
+        now = now or datetime.utcnow()
+        last_runs = (
+            db.session.query(
+                MonitoringLog.search_config_id.label('search_config_id'),
+                func.max(MonitoringLog.execution_time).label('last_run')
+            )
+            .filter(MonitoringLog.status.in_(FINISHED_STATUSES))
+            .group_by(MonitoringLog.search_config_id)
+            .subquery()
+        )
+        interrupted = (
+            db.session.query(MonitoringLog.search_config_id)
+            .filter(MonitoringLog.status == 'interrupted')
+            .filter(MonitoringLog.execution_time > func.coalesce(last_runs.c.last_run, SearchConfig.created_at))
+            .filter(MonitoringLog.search_config_id == SearchConfig.id)
+            .exists()
+        )
+        rows = (
+            db.session.query(SearchConfig.id, SearchConfig.created_at, last_runs.c.last_run, interrupted)
+            .outerjoin(last_runs, last_runs.c.search_config_id == SearchConfig.id)
+            .filter(SearchConfig.is_active == True)
+            .all()
+        )
+
+        due = []
+        for search_id, created_at, last_run, was_interrupted in rows:
+            # A aprovação já executou a busca: sem log, conta a partir dela
+            reference = last_run or created_at or now
+            offset = self.offset(search_id)
+            if was_interrupted:
+                due_at = reference
+            else:
+                due_at = reference + self.interval + offset
+            # Atrasadas desde antes da partida: espalhadas pela janela de jitter
+            if self.started_at and due_at < self.started_at:
+                due_at = max(due_at, self.started_at + offset)
+            if due_at <= now:
+                missed = max(int((now - reference) / self.interval) - 1, 0)
+                due.append((due_at, search_id, missed))
+
+        return [(search_id, missed) for _, search_id, missed in sorted(due)]
+
+    def tick(self):
+        """Envia ao pool as buscas vencidas que ainda não estão rodando"""
+        try:
+            with self.app.app_context():
+                due = self.due_searches()
+                db.session.remove()
+        except Exception as e:
+            logger.error(f"Error checking due searches: {str(e)}")
+            return
+
+        for search_id, missed in due:
+            with self._lock:
+                if search_id in self._running:
+                    continue
+                self._running.add(search_id)
+            self._pool.submit(self._run, search_id, missed)
+
+    def _run(self, search_id, missed):
+        try:
+            self.run_search(search_id, missed)
+        finally:
+            with self._lock:
+                self._running.discard(search_id)
+
+    def run_search(self, search_id, missed=0):
+        """Executa uma busca salva, grava as diferenças e o MonitoringLog"""
+        # Importação tardia: as rotas criam os extratores e caches compartilhados
+        from .routes.search_wizard import advanced_search, filters_from_config, dedupe_products, refresh_leaderboard
+
+        with self.app.app_context():
+            started = time.monotonic()
+            log = MonitoringLog(search_config_id=search_id, execution_time=datetime.utcnow(), status='running')
+            db.session.add(log)
+            db.session.commit()
+            log_id = log.id
+
+            try:
+                search_config = db.session.get(SearchConfig, search_id)
+                config = search_config.to_config()
+                logger.info(f"Monitoring search {search_id} ({config['search_name']})")
+
+                products = dedupe_products(
+                    advanced_search.search_with_filters(config['product_query'], filters_from_config(config))
+                )
+                new_count, changed_count, saved_ids = self._apply_changes(search_id, products)
+
+                log = db.session.get(MonitoringLog, log_id)
+                log.products_found = len(products)
+                log.new_products = new_count
+                log.changed_products = changed_count
+                log.status = 'success' if products else 'warning'
+                log.message = f"{new_count} novos, {changed_count} alterados"
+                if missed:
+                    log.message += f" ({missed} ciclos perdidos agrupados nesta execução)"
+                log.execution_duration = time.monotonic() - started
+                db.session.commit()
+
+                # Ranking no banco; listagem e facetas dos processos web
+                # percebem as gravações pela versão dos produtos salvos
+                refresh_leaderboard(products, search_config_id=search_id, saved_ids=saved_ids)
+
+                logger.info(
+                    f"Search {search_id} monitored: {len(products)} found, {new_count} new, "
+                    f"{changed_count} changed in {log.execution_duration:.1f}s"
+                )
+
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Error monitoring search {search_id}: {str(e)}")
+                log = db.session.get(MonitoringLog, log_id)
+                log.status = 'error'
+                log.message = str(e)
+                log.execution_duration = time.monotonic() - started
+                db.session.commit()
+
+            finally:
+                db.session.remove()
+
+    def _apply_changes(self, search_id, products):
+        """
+        Grava produtos novos e atualiza o retrato dos que mudaram de preço ou
+        estoque. Retorna (novos, alterados, product_key -> id do SavedProduct).
+        """
+        product_ids = save_products(products, source='monitoring')
+
+        existing = {}
+        for saved in SavedProduct.query.filter_by(search_config_id=search_id):
+            previous = json.loads(saved.product_data)
+            existing[ensure_product_key(previous)] = (saved, previous)
+
+        new_count = changed_count = 0
+        saved_by_key = {}
+        for product in products:
+            key = product['product_key']
+            saved, previous = existing.get(key, (None, None))
+
+            if saved is None:
+                saved = SavedProduct(
+                    search_config_id=search_id,
+                    product_id=product_ids.get(key),
+                    product_data=json.dumps(product),
+                    created_at=datetime.utcnow()
+                )
+                db.session.add(saved)
+                new_count += 1
+            else:
+                before, after = product_columns(previous), product_columns(product)
+                if any(before[field] != after[field] for field in PRICE_FIELDS):
+                    saved.product_data = json.dumps(product)
+                    changed_count += 1
+                saved.product_id = saved.product_id or product_ids.get(key)
+            saved_by_key[key] = saved
+
+        db.session.flush()
+        return new_count, changed_count, {key: saved.id for key, saved in saved_by_key.items()}
+
+    def start(self):
+        """Inicia o agendador em uma thread de fundo"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name='monitoring-scheduler', daemon=True)
+        self._thread.start()
+
+    def run_forever(self):
+        self.started_at = datetime.utcnow()
+        self._pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='monitor')
+        self.recover_interrupted()
+
+        self.scheduler.clear()
+        self.scheduler.every(self.tick_seconds).seconds.do(self.tick)
+        logger.info(
+            f"Monitoring scheduler started (interval {self.interval}, jitter {self.jitter}s, "
+            f"concurrency {self.concurrency})"
+        )
+
+        self.tick()
+        while not self._stop.wait(1):
+            self.scheduler.run_pending()
+
+        self._pool.shutdown(wait=True)
+        logger.info("Monitoring scheduler stopped")
+
+    def stop(self):
+        self._stop.set()
+
+monitoring_scheduler = MonitoringScheduler()
+
+def main():
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from src.main import app
+
+    monitoring_scheduler.init_app(app)
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: monitoring_scheduler.stop())
+    monitoring_scheduler.run_forever()
+
+if __name__ == '__main__':
+    main()
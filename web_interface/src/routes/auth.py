@@ -1,9 +1,10 @@
 """
 Rotas de autenticação
 """
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify, session, current_app
 from datetime import datetime, timedelta
 from src.models.auth import db, User, Session
+from src import session_cache
 import secrets
 
 auth_bp = Blueprint('auth', __name__)
@@ -83,6 +84,7 @@ def logout():
             user_session = Session.query.filter_by(session_token=session_token).first()
             if user_session:
                 user_session.invalidate()
+            session_cache.invalidate_session(session_token)
         
         # Limpa sessão do Flask
         session.clear()
@@ -101,37 +103,14 @@ def check_auth():
     Verifica se usuário está autenticado
     """
     try:
-        user_id = session.get('user_id')
-        session_token = session.get('session_token')
-        
-        if not user_id or not session_token:
-            return jsonify({'authenticated': False}), 401
-        
-        # Verifica sessão no banco
-        user_session = Session.query.filter_by(
-            session_token=session_token,
-            user_id=user_id,
-            is_active=True
-        ).first()
-        
-        if not user_session or user_session.is_expired():
-            session.clear()
-            return jsonify({'authenticated': False}), 401
-        
-        # Busca dados do usuário
-        user = User.query.get(user_id)
-        if not user or not user.is_active:
+        user = session_cache.validate_session(session, current_app.secret_key)
+        if not user:
             session.clear()
             return jsonify({'authenticated': False}), 401
         
         return jsonify({
             'authenticated': True,
-            'user': {
-                'id': user.id,
-                'username': user.username,
-                'email': user.email,
-                'last_login': user.last_login.isoformat() if user.last_login else None
-            }
+            'user': user
         })
         
     except Exception as e:
@@ -169,6 +148,7 @@ def change_password():
         # Atualiza senha
         user.set_password(new_password)
         db.session.commit()
+        session_cache.invalidate_user(user.id)
         
         return jsonify({
             'success': True,
@@ -187,20 +167,11 @@ def require_auth(f):
     
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        user_id = session.get('user_id')
-        session_token = session.get('session_token')
-        
-        if not user_id or not session_token:
+        if not session.get('user_id') or not session.get('session_token'):
             return jsonify({'error': 'Autenticação necessária'}), 401
         
-        # Verifica sessão
-        user_session = Session.query.filter_by(
-            session_token=session_token,
-            user_id=user_id,
-            is_active=True
-        ).first()
-        
-        if not user_session or user_session.is_expired():
+        # Verifica sessão (carimbo assinado, cache ou banco)
+        if not session_cache.validate_session(session, current_app.secret_key):
             session.clear()
             return jsonify({'error': 'Sessão expirada'}), 401
         
@@ -208,3 +179,13 @@ def require_auth(f):
     
     return decorated_function
 
+@auth_bp.route('/metrics', methods=['GET'])
+@require_auth
+def auth_metrics():
+    """
+    Métricas da validação de sessões (carimbos, cache e consultas ao banco)
+    """
+    return jsonify({
+        'success': True,
+        'metrics': session_cache.stats()
+    })
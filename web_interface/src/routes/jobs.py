@@ -0,0 +1,123 @@
+"""
+Rotas de acompanhamento das tarefas em segundo plano (status, resultado,
+cancelamento e eventos de progresso via Server-Sent Events)
+"""
+import json
+from flask import Blueprint, request, jsonify, Response
+from src.jobs import job_manager, SUCCEEDED, FAILED, CANCELLED
+
+jobs_bp = Blueprint('jobs', __name__)
+
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no'
+}
+
+# Intervalo do comentário de keep-alive enquanto não há eventos novos
+SSE_HEARTBEAT = 15
+
+@jobs_bp.route('', methods=['GET'])
+def get_jobs_stats():
+    """
+    Backend em uso, limite de concorrência e contagem de tarefas por status
+    """
+    try:
+        return jsonify({'success': True, 'stats': job_manager.stats()})
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@jobs_bp.route('/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """
+    Status e progresso de uma tarefa
+    """
+    try:
+        job = job_manager.get(job_id)
+        if job is None:
+            return jsonify({'error': 'Tarefa não encontrada'}), 404
+
+        return jsonify({'success': True, 'job': job.to_dict()})
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@jobs_bp.route('/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    """
+    Resultado da tarefa: 200 quando concluída, 202 enquanto pendente e
+    409 se falhou ou foi cancelada
+    """
+    try:
+        job = job_manager.get(job_id)
+        if job is None:
+            return jsonify({'error': 'Tarefa não encontrada'}), 404
+
+        if job.status == SUCCEEDED:
+            return jsonify({'success': True, 'job': job.to_dict(), 'result': job.result})
+
+        if job.status in (FAILED, CANCELLED):
+            return jsonify({'error': job.error or f'Tarefa {job.status}', 'job': job.to_dict()}), 409
+
+        return jsonify({'success': True, 'job': job.to_dict()}), 202
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@jobs_bp.route('/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """
+    Cancela uma tarefa pendente ou em execução
+    """
+    try:
+        job = job_manager.cancel(job_id)
+        if job is None:
+            return jsonify({'error': 'Tarefa não encontrada'}), 404
+
+        return jsonify({'success': True, 'job': job.to_dict()})
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@jobs_bp.route('/<job_id>/events', methods=['GET'])
+def stream_job_events(job_id):
+    """
+    Eventos de etapa da tarefa via SSE (crawl_started, crawl_finished,
+    llm_extraction, products_parsed, filters_applied...), com as listas
+    parciais de produtos. Termina com o evento "done" contendo o status
+    final. Reconexões retomam a partir do cabeçalho Last-Event-ID.
+
+    O stream só lê o estado da fila (memória ou Redis): nenhuma sessão do
+    banco fica aberta enquanto a conexão dura.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Tarefa não encontrada'}), 404
+
+    try:
+        after = int(request.headers.get('Last-Event-ID') or request.args.get('after') or 0)
+    except ValueError:
+        after = 0
+
+    def events():
+        position = after
+        while True:
+            batch, finished = job_manager.events(job_id, position, timeout=SSE_HEARTBEAT)
+            for event in batch:
+                yield _sse(event['stage'], event, event['id'])
+                position = event['id']
+
+            # O lote lido junto com o término já contém todos os eventos da tarefa
+            if finished:
+                final = job_manager.get(job_id)
+                yield _sse('done', final.to_dict() if final else {'id': job_id, 'status': CANCELLED})
+                return
+
+            if not batch:
+                yield ': keep-alive\n\n'
+
+    return Response(events(), mimetype='text/event-stream', headers=SSE_HEADERS)
+
+def _sse(event, data, event_id=None):
+    prefix = f"id: {event_id}\n" if event_id is not None else ''
+    return f"{prefix}event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
@@ -0,0 +1,189 @@
+"""
+Rotas de análise de mercado de produtos (resposta completa ou streaming via
+Server-Sent Events com resultados parciais por fonte)
+"""
+import json
+import time
+import logging
+from dataclasses import asdict
+from datetime import datetime
+from flask import Blueprint, request, jsonify, Response, current_app
+from werkzeug.exceptions import HTTPException
+
+# Mesmas instâncias do wizard: compartilham o cache de preços e a cotação
+from src.routes.search_wizard import extractor, market_analyzer, record_market_stats
+from src.models.search_config import SavedProduct
+
+logger = logging.getLogger(__name__)
+
+market_analysis_bp = Blueprint('market_analysis', __name__)
+
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    # Desliga o buffering de proxies (nginx) para os eventos saírem na hora
+    'X-Accel-Buffering': 'no'
+}
+
+@market_analysis_bp.route('/product/<int:product_id>', methods=['GET'])
+def analyze_saved_product(product_id):
+    """
+    Análise de mercado de um produto salvo
+    """
+    try:
+        product = _load_saved_product(product_id)
+        analysis = market_analyzer.analyze_product_market(product)
+        if analysis is None:
+            return jsonify({'error': 'Não foi possível analisar o produto'}), 500
+        record_market_stats([(product, analysis)])
+
+        return jsonify({
+            'success': True,
+            'analysis': _analysis_to_dict(analysis, market_analyzer.exchange_rates.for_product(product))
+        })
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@market_analysis_bp.route('/product/<int:product_id>/stream', methods=['GET'])
+def stream_saved_product(product_id):
+    """
+    Análise de mercado de um produto salvo via SSE (um evento por fonte)
+    """
+    try:
+        # Produto carregado antes do streaming: a sessão do banco é liberada
+        # ao fim da requisição e não fica presa durante a coleta de preços
+        product = _load_saved_product(product_id)
+        return Response(
+            _stream_analysis(product, current_app._get_current_object()),
+            mimetype='text/event-stream',
+            headers=SSE_HEADERS
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@market_analysis_bp.route('/product/<int:product_id>/price-history', methods=['GET'])
+def saved_product_price_history(product_id):
+    """
+    Séries de preços observadas por fonte (loja e marketplaces) de um produto
+    salvo. Parâmetros: days (padrão 30) e resolution (raw, hourly, daily)
+    """
+    try:
+        product = _load_saved_product(product_id)
+        days = int(request.args.get('days', 30))
+        resolution = request.args.get('resolution', 'daily')
+
+        history = market_analyzer.get_price_history(product, start=time.time() - days * 86400, resolution=resolution)
+
+        return jsonify({
+            'success': True,
+            'resolution': resolution,
+            'history': history
+        })
+
+    except HTTPException:
+        raise
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@market_analysis_bp.route('/url', methods=['POST'])
+def analyze_url():
+    """
+    Extrai o produto da URL e analisa o mercado
+    """
+    try:
+        data = request.get_json() or {}
+        url = data.get('url')
+        if not url:
+            return jsonify({'error': 'URL é obrigatória'}), 400
+
+        product = extractor.extract_product_from_url(url)
+        if not product:
+            return jsonify({'error': 'Não foi possível extrair o produto'}), 404
+
+        analysis = market_analyzer.analyze_product_market(product)
+        if analysis is None:
+            return jsonify({'error': 'Não foi possível analisar o produto'}), 500
+        record_market_stats([(product, analysis)])
+
+        return jsonify({
+            'success': True,
+            'product': product,
+            'analysis': _analysis_to_dict(analysis, market_analyzer.exchange_rates.for_product(product))
+        })
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@market_analysis_bp.route('/url/stream', methods=['GET'])
+def stream_url():
+    """
+    Extrai o produto da URL (?url=) e transmite a análise via SSE
+    """
+    url = request.args.get('url')
+    if not url:
+        return jsonify({'error': 'URL é obrigatória'}), 400
+
+    app = current_app._get_current_object()
+
+    def events():
+        yield _sse('status', {'stage': 'extracting', 'url': url})
+
+        try:
+            product = extractor.extract_product_from_url(url)
+        except Exception as e:
+            logger.error(f"Error extracting product for streaming analysis: {str(e)}")
+            product = None
+
+        if not product:
+            yield _sse('error', {'error': 'Não foi possível extrair o produto'})
+            return
+
+        yield _sse('product', product)
+        yield from _stream_analysis(product, app)
+
+    return Response(events(), mimetype='text/event-stream', headers=SSE_HEADERS)
+
+def _stream_analysis(product, app):
+    """Eventos "partial" a cada fonte e "complete" ao final"""
+    yield _sse('status', {'stage': 'analyzing', 'product_name': product.get('nome')})
+
+    try:
+        for update in market_analyzer.analyze_product_market_stream(product):
+            payload = {k: v for k, v in update.items() if k != 'analysis'}
+            payload['analysis'] = _analysis_to_dict(update['analysis'], update['exchange_rate'])
+
+            if update['done']:
+                # Fora do contexto da requisição: contexto próprio só para a gravação
+                with app.app_context():
+                    record_market_stats([(product, update['analysis'])])
+
+            yield _sse('complete' if update['done'] else 'partial', payload)
+
+    except Exception as e:
+        logger.error(f"Error streaming market analysis: {str(e)}")
+        yield _sse('error', {'error': str(e)})
+
+def _load_saved_product(product_id):
+    saved_product = SavedProduct.query.get_or_404(product_id)
+    product = json.loads(saved_product.product_data)
+    product['saved_id'] = saved_product.id
+    return product
+
+def _analysis_to_dict(analysis, exchange_rate=None):
+    data = asdict(analysis)
+    for market in ('official_market', 'gray_market'):
+        for price in data[market]:
+            if isinstance(price.get('found_at'), datetime):
+                price['found_at'] = price['found_at'].isoformat()
+    data['exchange_rate'] = exchange_rate
+    return data
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
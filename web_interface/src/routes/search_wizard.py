@@ -6,24 +6,50 @@ import sys
 import json
 import uuid
 from datetime import datetime
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, send_file, Response, stream_with_context
 from werkzeug.utils import secure_filename
+from werkzeug.exceptions import HTTPException
 import requests
 from PIL import Image, ImageDraw, ImageFont
 import io
+import logging
+import numpy as np
 
 # Adiciona o diretório pai ao path para importar os extractors
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
 
 from app.extractors.mega_eletronicos_extractor import MegaEletronicosExtractor
-from app.extractors.advanced_search import AdvancedProductSearch, SearchFilters
-from src.models.search_config import db, SearchConfig, SavedProduct
+from app.extractors.advanced_search import AdvancedProductSearch, SearchFilters, SPEC_FILTER_FIELDS
+from app.extractors.product_identity import dedupe_products, ensure_product_key
+from app.analyzers.market_analyzer import MarketAnalyzer
+from app.analyzers.facet_aggregator import FacetAggregator, CATALOG_SCOPE, search_scope
+from app.utils.cache import TTLCache
+from src.models.search_config import (
+    db, SearchConfig, SavedProduct, SEARCH_SORTS, list_search_configs, saved_products_version, search_configs_version
+)
+from src.models.opportunity import OpportunityEntry, upsert_opportunities, update_market_stats
+from src.models.product import Product, PRODUCT_SORTS, save_products, query_products, price_trend
+from src.jobs import job_manager, task, QueueFull
+from src.routes.auth import require_auth
+
+logger = logging.getLogger(__name__)
 
 search_wizard_bp = Blueprint('search_wizard', __name__)
 
 # Instância global do extrator
 extractor = MegaEletronicosExtractor()
 advanced_search = AdvancedProductSearch()
+market_analyzer = MarketAnalyzer(exchange_rate_fetcher=extractor.get_current_exchange_rate)
+
+# Facetas pré-calculadas do catálogo e de cada busca salva
+facet_aggregator = FacetAggregator()
+
+# Respostas da listagem de buscas salvas, por versão dos dados no banco
+# (gravações de qualquer processo geram novas chaves)
+search_list_cache = TTLCache(
+    ttl=int(os.getenv('SEARCH_LIST_CACHE_TTL', 60)),
+    max_entries=int(os.getenv('SEARCH_LIST_CACHE_MAX_ENTRIES', 256))
+)
 
 @search_wizard_bp.route('/wizard/step1', methods=['POST'])
 def wizard_step1():
@@ -53,6 +79,11 @@ def wizard_step1():
             'status': 'draft'
         }
         
+        # Faixas opcionais de especificações (RAM, armazenamento, tela, bateria, câmera)
+        for field in SPEC_FILTER_FIELDS:
+            if data.get(field) is not None:
+                temp_config[field] = data[field]
+        
         return jsonify({
             'success': True,
             'config': temp_config,
@@ -74,47 +105,97 @@ def wizard_step2_test():
         if not config:
             return jsonify({'error': 'Configuração não fornecida'}), 400
         
-        # Cria filtros baseados na configuração
-        filters = SearchFilters(
-            min_price_usd=config.get('min_price_usd'),
-            max_price_usd=config.get('max_price_usd'),
-            categories=config.get('categories'),
-            brands=config.get('brands'),
-            in_stock_only=config.get('in_stock_only', True),
-            sort_by=config.get('sort_by', 'price_asc')
-        )
+        return jsonify(run_search_test(config))
         
-        # Executa a busca
-        products = advanced_search.search_with_filters(
-            config['product_query'], 
-            filters
-        )
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@search_wizard_bp.route('/wizard/step2/submit', methods=['POST'])
+def wizard_step2_submit():
+    """
+    Passo 2 em segundo plano: enfileira o teste da busca e devolve o id da
+    tarefa (acompanhe em /api/jobs/<id> e obtenha o resultado em /api/jobs/<id>/result)
+    """
+    try:
+        data = request.get_json() or {}
+        config = data.get('config')
         
-        # Limita a 20 produtos para o teste
-        test_products = products[:20]
-        
-        # Calcula estatísticas
-        stats = {
-            'total_found': len(products),
-            'showing': len(test_products),
-            'price_range': {
-                'min': min([p.get('preco_usd', 0) for p in test_products]) if test_products else 0,
-                'max': max([p.get('preco_usd', 0) for p in test_products]) if test_products else 0
-            },
-            'categories': list(set([p.get('categoria', 'N/A') for p in test_products])),
-            'brands': list(set([p.get('marca', 'N/A') for p in test_products]))
-        }
+        if not config:
+            return jsonify({'error': 'Configuração não fornecida'}), 400
+        
+        job = job_manager.submit('wizard_search_test', {'config': config})
         
         return jsonify({
             'success': True,
-            'products': test_products,
-            'stats': stats,
-            'message': f'Encontrados {len(products)} produtos. Mostrando os primeiros {len(test_products)}.'
-        })
+            'job': job.to_dict(),
+            'status_url': f'/api/jobs/{job.id}',
+            'result_url': f'/api/jobs/{job.id}/result'
+        }), 202
         
+    except QueueFull as e:
+        return jsonify({'error': str(e)}), 429
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@task('wizard_search_test')
+def wizard_search_test_job(payload, context):
+    """Tarefa da fila: mesmo resultado de /wizard/step2/test"""
+    return run_search_test(payload['config'], context)
+
+def filters_from_config(config):
+    """Filtros da busca a partir da configuração do wizard (ou SearchConfig.to_config)"""
+    return SearchFilters(
+        min_price_usd=config.get('min_price_usd'),
+        max_price_usd=config.get('max_price_usd'),
+        categories=config.get('categories'),
+        brands=config.get('brands'),
+        in_stock_only=config.get('in_stock_only', True),
+        sort_by=config.get('sort_by', 'price_asc'),
+        **{field: config.get(field) for field in SPEC_FILTER_FIELDS}
+    )
+
+def run_search_test(config, context=None):
+    """
+    Executa a busca de teste do passo 2 e calcula estatísticas e facetas.
+    Com `context` (execução em tarefa), reporta as etapas como eventos e
+    permite cancelar entre elas.
+    """
+    filters = filters_from_config(config)
+    
+    # Executa a busca (etapas do crawl/extração reportadas ao contexto)
+    if context:
+        context.progress('search_started', query=config['product_query'])
+    products = advanced_search.search_with_filters(
+        config['product_query'], 
+        filters,
+        progress=context.progress if context else None
+    )
+    
+    # Limita a 20 produtos para o teste
+    test_products = products[:20]
+    
+    # Calcula estatísticas e facetas em uma única passada. A prévia não entra
+    # nas facetas do catálogo nem no ranking (só produtos aprovados ou monitorados)
+    if context:
+        context.progress('aggregating', total_found=len(products))
+    facets = facet_aggregator.summarize(test_products)
+    
+    stats = {
+        'total_found': len(products),
+        'showing': len(test_products),
+        'price_range': facets['price_range'],
+        'categories': list(facets['categories']),
+        'brands': list(facets['brands']),
+        'facets': facets
+    }
+    
+    return {
+        'success': True,
+        'products': test_products,
+        'stats': stats,
+        'message': f'Encontrados {len(products)} produtos. Mostrando os primeiros {len(test_products)}.'
+    }
+
 @search_wizard_bp.route('/wizard/step3/approve', methods=['POST'])
 def wizard_step3_approve():
     """
@@ -123,7 +204,8 @@ def wizard_step3_approve():
     try:
         data = request.get_json()
         config = data.get('config')
-        approved_products = data.get('approved_products', [])
+        # Cada produto é salvo uma única vez (chave canônica)
+        approved_products = dedupe_products(data.get('approved_products', []))
         
         if not config:
             return jsonify({'error': 'Configuração não fornecida'}), 400
@@ -136,6 +218,9 @@ def wizard_step3_approve():
             max_price_usd=config.get('max_price_usd'),
             categories=json.dumps(config.get('categories', [])),
             brands=json.dumps(config.get('brands', [])),
+            spec_filters=json.dumps({
+                field: config[field] for field in SPEC_FILTER_FIELDS if config.get(field) is not None
+            }),
             in_stock_only=config.get('in_stock_only', True),
             sort_by=config.get('sort_by', 'price_asc'),
             is_active=True,
@@ -145,17 +230,28 @@ def wizard_step3_approve():
         db.session.add(search_config)
         db.session.flush()  # Para obter o ID
         
-        # Salva produtos aprovados
+        # Salva produtos aprovados (catálogo normalizado + retrato JSON)
+        product_ids = save_products(approved_products, source='search_approval')
+        saved_products = []
         for product_data in approved_products:
             saved_product = SavedProduct(
                 search_config_id=search_config.id,
+                product_id=product_ids.get(product_data['product_key']),
                 product_data=json.dumps(product_data),
                 created_at=datetime.utcnow()
             )
             db.session.add(saved_product)
+            saved_products.append(saved_product)
         
         db.session.commit()
         
+        # Atualiza o ranking (as facetas são recarregadas do banco na próxima leitura)
+        refresh_leaderboard(
+            approved_products,
+            search_config_id=search_config.id,
+            saved_ids={p['product_key']: s.id for p, s in zip(approved_products, saved_products)}
+        )
+        
         return jsonify({
             'success': True,
             'search_id': search_config.id,
@@ -169,68 +265,497 @@ def wizard_step3_approve():
 @search_wizard_bp.route('/searches', methods=['GET'])
 def get_saved_searches():
     """
-    Lista todas as buscas salvas
+    Lista as buscas salvas com a contagem de produtos (uma consulta ao banco
+    por página). Parâmetros: limit (até 200), sort (created_desc, created_asc,
+    name_asc, name_desc, products_desc, products_asc), is_active e cursor
+    (next_cursor da página anterior).
     """
     try:
-        searches = SearchConfig.query.all()
+        params = request.args
+        limit = min(max(int(params.get('limit', 50)), 1), 200)
+        sort = params.get('sort', 'created_desc')
+        if sort not in SEARCH_SORTS:
+            return jsonify({'error': f'Ordenação inválida: {sort}'}), 400
+        is_active = _as_bool(params['is_active']) if params.get('is_active') not in (None, '') else None
+        cursor = params.get('cursor') or None
+        
+        cache_key = (search_configs_version(), limit, sort, is_active, cursor)
+        response = search_list_cache.get(cache_key)
+        if response is None:
+            rows, next_cursor = list_search_configs(limit=limit, sort=sort, is_active=is_active, cursor=cursor)
+            response = {
+                'success': True,
+                'searches': [
+                    {
+                        'id': row.id,
+                        'name': row.name,
+                        'query': row.query,
+                        'min_price_usd': row.min_price_usd,
+                        'max_price_usd': row.max_price_usd,
+                        'is_active': row.is_active,
+                        'created_at': row.created_at.isoformat() if row.created_at else None,
+                        'product_count': row.product_count
+                    }
+                    for row in rows
+                ],
+                'next_cursor': next_cursor
+            }
+            search_list_cache.set(cache_key, response)
         
-        search_list = []
-        for search in searches:
-            # Conta produtos salvos
-            product_count = SavedProduct.query.filter_by(search_config_id=search.id).count()
+        return jsonify(response)
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@search_wizard_bp.route('/searches/<int:search_id>/products', methods=['GET'])
+def get_search_products(search_id):
+    """
+    Obtém produtos de uma busca específica, paginados por cursor (saved_id).
+    Parâmetros: limit (até 1000), after (next_cursor da página anterior),
+    fields (projeção, ex: nome,preco_usd,marca) e stream=ndjson|json para
+    transmitir os produtos incrementalmente em vez de uma página.
+    """
+    try:
+        search_config = db.get_or_404(SearchConfig, search_id)
+        params = request.args
+        after = int(params.get('after') or 0)
+        fields = [f.strip() for f in params.get('fields', '').split(',') if f.strip()] or None
+        stream = params.get('stream')
+        
+        if stream in ('ndjson', 'json'):
+            limit = int(params['limit']) if params.get('limit') else None
+            products = _iter_saved_products(search_id, after=after, limit=limit, fields=fields)
+            if stream == 'ndjson':
+                body = (json.dumps(product, ensure_ascii=False) + '\n' for product in products)
+                return Response(stream_with_context(body), mimetype='application/x-ndjson')
             
-            search_data = {
-                'id': search.id,
-                'name': search.name,
-                'query': search.query,
-                'min_price_usd': search.min_price_usd,
-                'max_price_usd': search.max_price_usd,
-                'is_active': search.is_active,
-                'created_at': search.created_at.isoformat(),
-                'product_count': product_count
-            }
-            search_list.append(search_data)
+            body = _stream_json_array(search_config.name, products)
+            return Response(stream_with_context(body), mimetype='application/json')
+        
+        limit = min(max(int(params.get('limit', 100)), 1), 1000)
+        # Uma linha a mais indica se existe próxima página
+        products = list(_iter_saved_products(search_id, after=after, limit=limit + 1, fields=fields))
+        next_cursor = None
+        if len(products) > limit:
+            products = products[:limit]
+            next_cursor = products[-1]['saved_id']
         
         return jsonify({
             'success': True,
-            'searches': search_list
+            'search_name': search_config.name,
+            'products': products,
+            'next_cursor': next_cursor
         })
         
+    except HTTPException:
+        raise
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@search_wizard_bp.route('/searches/<int:search_id>/products', methods=['GET'])
-def get_search_products(search_id):
+def _iter_saved_products(search_id, after=0, limit=None, fields=None, batch_size=None):
+    """
+    Produtos salvos de uma busca em ordem de id, lidos em lotes por keyset
+    (id > último id). Cada blob é decodificado só quando o produto é entregue
+    e, com `fields`, reduzido às chaves pedidas. A sessão é liberada entre os
+    lotes para não manter uma transação de leitura aberta durante o streaming.
+    """
+    batch_size = batch_size or int(os.getenv('PRODUCT_STREAM_BATCH', 500))
+    delivered = 0
+    last_id = after
+    
+    while limit is None or delivered < limit:
+        size = batch_size if limit is None else min(batch_size, limit - delivered)
+        rows = (
+            db.session.query(SavedProduct.id, SavedProduct.created_at, SavedProduct.product_data)
+            .filter(SavedProduct.search_config_id == search_id, SavedProduct.id > last_id)
+            .order_by(SavedProduct.id)
+            .limit(size)
+            .all()
+        )
+        db.session.close()
+        
+        for saved_id, created_at, product_data in rows:
+            product = json.loads(product_data)
+            if fields:
+                product = {field: product.get(field) for field in fields}
+            product['saved_at'] = created_at.isoformat() if created_at else None
+            product['saved_id'] = saved_id
+            yield product
+        
+        delivered += len(rows)
+        if len(rows) < size:
+            return
+        last_id = rows[-1][0]
+
+def _stream_json_array(search_name, products):
+    """Mesmo formato da resposta paginada, emitido produto a produto"""
+    yield '{"success": true, "search_name": ' + json.dumps(search_name, ensure_ascii=False) + ', "products": ['
+    for index, product in enumerate(products):
+        yield (',' if index else '') + json.dumps(product, ensure_ascii=False)
+    yield '], "next_cursor": null}'
+
+@search_wizard_bp.route('/facets', methods=['GET'])
+def get_catalog_facets():
+    """
+    Facetas pré-calculadas do catálogo (contagens, histograma e percentis)
+    """
+    try:
+        ensure_facets(CATALOG_SCOPE)
+        
+        return jsonify({
+            'success': True,
+            'facets': facet_aggregator.get(CATALOG_SCOPE)
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def ensure_facets(scope, search_id=None):
+    """
+    Carrega as facetas do escopo a partir dos produtos salvos. Depois da
+    primeira carga só os produtos gravados desde a versão carregada
+    (aprovações, monitoramento em outro processo) são lidos e aplicados.
+    """
+    def products(query):
+        if search_id is not None:
+            query = query.filter(SavedProduct.search_config_id == search_id)
+        for product_data, in query:
+            product = json.loads(product_data)
+            ensure_product_key(product)
+            yield product
+    
+    def loader():
+        return products(db.session.query(SavedProduct.product_data))
+    
+    def changes(since):
+        return products(db.session.query(SavedProduct.product_data).filter(SavedProduct.change_seq > since))
+    
+    version, deletions = saved_products_version()
+    facet_aggregator.ensure_loaded(scope, loader, version=version, changes=changes, generation=deletions)
+
+@search_wizard_bp.route('/searches/<int:search_id>/facets', methods=['GET'])
+def get_search_facets(search_id):
+    """
+    Facetas pré-calculadas de uma busca salva
+    """
+    try:
+        search_config = db.get_or_404(SearchConfig, search_id)
+        scope = search_scope(search_id)
+        ensure_facets(scope, search_id)
+        
+        return jsonify({
+            'success': True,
+            'search_name': search_config.name,
+            'facets': facet_aggregator.get(scope)
+        })
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@search_wizard_bp.route('/searches/<int:search_id>/market-analysis', methods=['POST'])
+def analyze_search_market(search_id):
     """
-    Obtém produtos de uma busca específica
+    Enfileira a análise de mercado em lote de todos os produtos de uma busca
+    salva (acompanhe em /api/jobs/<id> e obtenha o resultado em /api/jobs/<id>/result)
     """
     try:
-        search_config = SearchConfig.query.get_or_404(search_id)
+        db.get_or_404(SearchConfig, search_id)
+        
+        job = job_manager.submit('search_market_analysis', {'search_id': search_id})
+        
+        return jsonify({
+            'success': True,
+            'job': job.to_dict(),
+            'status_url': f'/api/jobs/{job.id}',
+            'result_url': f'/api/jobs/{job.id}/result'
+        }), 202
+        
+    except HTTPException:
+        raise
+    except QueueFull as e:
+        return jsonify({'error': str(e)}), 429
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@task('search_market_analysis')
+def search_market_analysis_job(payload, context):
+    """Tarefa da fila: análise de mercado em lote dos produtos de uma busca salva"""
+    search_id = payload['search_id']
+    search_config = db.session.get(SearchConfig, search_id)
+    if search_config is None:
+        raise ValueError(f'Busca {search_id} não encontrada')
+    
+    saved_products = SavedProduct.query.filter_by(search_config_id=search_id).all()
+    products = [json.loads(p.product_data) for p in saved_products]
+    context.progress('analyzing', search_id=search_id, total=len(products))
+    
+    df, analyses = market_analyzer.analyze_many(products)
+    record_market_stats(zip(products, analyses))
+    
+    if not df.empty:
+        df['saved_id'] = [p.id for p in saved_products]
+        df = df.sort_values('opportunity_score', ascending=False)
+        # NaN não é JSON válido
+        df = df.astype(object).where(df.notna(), None)
+    
+    return {
+        'success': True,
+        'search_name': search_config.name,
+        'analyses': df.to_dict('records')
+    }
+
+@search_wizard_bp.route('/searches/<int:search_id>/sensitivity', methods=['POST'])
+def search_sensitivity(search_id):
+    """
+    Cenários de cotação, alíquota e margem para os produtos de uma busca salva,
+    usando apenas os preços de mercado já coletados (sem novas consultas)
+    """
+    try:
+        search_config = db.get_or_404(SearchConfig, search_id)
+        data = request.get_json(silent=True) or {}
+        
         saved_products = SavedProduct.query.filter_by(search_config_id=search_id).all()
+        products = [json.loads(p.product_data) for p in saved_products]
         
-        products = []
-        for saved_product in saved_products:
-            product_data = json.loads(saved_product.product_data)
-            product_data['saved_at'] = saved_product.created_at.isoformat()
-            product_data['saved_id'] = saved_product.id
-            products.append(product_data)
+        result = market_analyzer.sensitivity_analysis(
+            products,
+            exchange_rates=data.get('exchange_rates'),
+            tax_rates=data.get('tax_rates'),
+            margins=data.get('margins')
+        )
         
         return jsonify({
             'success': True,
             'search_name': search_config.name,
-            'products': products
+            'product_ids': [p.id for p in saved_products],
+            'sensitivity': _json_arrays(result)
         })
         
+    except HTTPException:
+        raise
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@search_wizard_bp.route('/opportunities', methods=['GET', 'POST'])
+def get_opportunities():
+    """
+    Ranking de oportunidades (leitura paginada do ranking materializado, sem
+    buscas ao vivo). Parâmetros (query string ou JSON): page, per_page,
+    min_opportunity_score, min_price_usd, max_price_usd, category, brand,
+    in_stock, value_rating, market_position, search_id e sort (score,
+    price_asc, price_desc, updated). O ranking é alimentado pela aprovação e
+    pelo monitoramento das buscas, ou sob demanda por /opportunities/refresh.
+    """
+    try:
+        params = {**request.args.to_dict(), **(request.get_json(silent=True) or {})}
+        if 'refresh' in params:
+            return jsonify({'error': 'Para recalcular o ranking use POST /opportunities/refresh'}), 400
+        page = max(int(params.get('page', 1)), 1)
+        per_page = min(max(int(params.get('per_page', 20)), 1), 100)
+        
+        query = OpportunityEntry.query
+        if params.get('min_opportunity_score') is not None:
+            query = query.filter(OpportunityEntry.opportunity_score >= float(params['min_opportunity_score']))
+        if params.get('min_price_usd') is not None:
+            query = query.filter(OpportunityEntry.price_usd >= float(params['min_price_usd']))
+        if params.get('max_price_usd') is not None:
+            query = query.filter(OpportunityEntry.price_usd <= float(params['max_price_usd']))
+        if params.get('category'):
+            query = query.filter(OpportunityEntry.category == params['category'].lower())
+        if params.get('brand'):
+            query = query.filter(OpportunityEntry.brand == params['brand'].lower())
+        if params.get('in_stock') is not None:
+            query = query.filter(OpportunityEntry.in_stock == _as_bool(params['in_stock']))
+        if params.get('value_rating'):
+            query = query.filter(OpportunityEntry.value_rating == params['value_rating'])
+        if params.get('market_position'):
+            query = query.filter(OpportunityEntry.market_position == params['market_position'])
+        if params.get('search_id'):
+            query = query.filter(OpportunityEntry.search_config_id == int(params['search_id']))
+        
+        sort_options = {
+            'score': (OpportunityEntry.opportunity_score.desc(), OpportunityEntry.price_usd.asc()),
+            'price_asc': (OpportunityEntry.price_usd.asc(),),
+            'price_desc': (OpportunityEntry.price_usd.desc(),),
+            'updated': (OpportunityEntry.updated_at.desc(),)
+        }
+        query = query.order_by(*sort_options.get(params.get('sort'), sort_options['score']), OpportunityEntry.id)
+        
+        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        
+        return jsonify({
+            'success': True,
+            'opportunities': [entry.to_dict() for entry in pagination.items],
+            'pagination': {
+                'page': page,
+                'per_page': per_page,
+                'total': pagination.total,
+                'pages': pagination.pages
+            }
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@search_wizard_bp.route('/opportunities/refresh', methods=['POST'])
+@require_auth
+def refresh_opportunities():
+    """
+    Enfileira uma busca ao vivo que recalcula o ranking de oportunidades.
+    JSON: query e max_price_usd. Acompanhe em /api/jobs/<id>.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        payload = {
+            'query': data.get('query', ''),
+            'max_price_usd': float(data.get('max_price_usd') or 500)
+        }
+        
+        job = job_manager.submit('opportunity_refresh', payload)
+        
+        return jsonify({
+            'success': True,
+            'job': job.to_dict(),
+            'status_url': f'/api/jobs/{job.id}',
+            'result_url': f'/api/jobs/{job.id}/result'
+        }), 202
+        
+    except QueueFull as e:
+        return jsonify({'error': str(e)}), 429
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@task('opportunity_refresh')
+def opportunity_refresh_job(payload, context):
+    """Tarefa da fila: busca ao vivo e atualização do ranking de oportunidades"""
+    context.progress('search_started', query=payload['query'])
+    opportunities = advanced_search.find_best_opportunities(
+        query=payload['query'],
+        max_price_usd=payload['max_price_usd'],
+        min_opportunity_score=0
+    )
+    for opportunity in opportunities:
+        ensure_product_key(opportunity.product)
+    changed = upsert_opportunities(opportunities)
+    
+    return {'success': True, 'found': len(opportunities), 'updated': changed}
+
+@search_wizard_bp.route('/catalog', methods=['GET'])
+def get_catalog_products():
+    """
+    Produtos normalizados filtrados em SQL. Parâmetros: min_price_usd,
+    max_price_usd, brand, category, in_stock, search_id, sort (price_asc,
+    price_desc, updated_desc), limit (até 200), cursor e specs (inclui as
+    especificações completas)
+    """
+    try:
+        params = request.args
+        sort = params.get('sort', 'price_asc')
+        if sort not in PRODUCT_SORTS:
+            return jsonify({'error': f'sort deve ser um de: {", ".join(PRODUCT_SORTS)}'}), 400
+        
+        products, next_cursor = query_products(
+            limit=min(max(int(params.get('limit', 50)), 1), 200),
+            sort=sort,
+            min_price_usd=float(params['min_price_usd']) if params.get('min_price_usd') else None,
+            max_price_usd=float(params['max_price_usd']) if params.get('max_price_usd') else None,
+            brand=params.get('brand'),
+            category=params.get('category'),
+            in_stock=_as_bool(params['in_stock']) if params.get('in_stock') is not None else None,
+            search_config_id=int(params['search_id']) if params.get('search_id') else None,
+            cursor=params.get('cursor')
+        )
+        include_specs = _as_bool(params.get('specs'))
+        
+        return jsonify({
+            'success': True,
+            'products': [product.to_dict(include_specs=include_specs) for product in products],
+            'next_cursor': next_cursor
+        })
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@search_wizard_bp.route('/catalog/<int:product_id>/price-history', methods=['GET'])
+def get_product_price_history(product_id):
+    """
+    Histórico de preços de um produto normalizado. Parâmetro: days (período)
+    """
+    try:
+        product = db.get_or_404(Product, product_id)
+        days = int(request.args['days']) if request.args.get('days') else None
+        history, summary = price_trend(product_id, days=days)
+        
+        return jsonify({
+            'success': True,
+            'product': product.to_dict(),
+            'history': [entry.to_dict() for entry in history],
+            'summary': summary
+        })
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def refresh_leaderboard(products, search_config_id=None, saved_ids=None):
+    """Recalcula a oportunidade dos produtos e atualiza o ranking (só o que mudou)"""
+    try:
+        for product in products:
+            ensure_product_key(product)
+        changed = upsert_opportunities(
+            advanced_search.analyze_opportunities(products),
+            search_config_id=search_config_id,
+            saved_ids=saved_ids
+        )
+        logger.info(f"Opportunity leaderboard: {changed}/{len(products)} entries updated")
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error updating opportunity leaderboard: {str(e)}")
+
+def record_market_stats(pairs):
+    """Propaga resultados de MarketAnalysis (produto, análise) para o ranking"""
+    try:
+        for product, analysis in pairs:
+            ensure_product_key(product)
+            update_market_stats(product, analysis, commit=False)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error updating leaderboard market stats: {str(e)}")
+
+def _as_bool(value):
+    if isinstance(value, str):
+        return value.lower() in ('1', 'true', 'yes', 'sim')
+    return bool(value)
+
+def _json_arrays(value):
+    """Converte arrays NumPy em listas aninhadas (NaN -> None)"""
+    if isinstance(value, dict):
+        return {k: _json_arrays(v) for k, v in value.items()}
+    if isinstance(value, np.ndarray):
+        return np.where(np.isnan(value), None, value).tolist() if value.dtype.kind == 'f' else value.tolist()
+    return value
+
 @search_wizard_bp.route('/searches/<int:search_id>/toggle', methods=['POST'])
 def toggle_search_status(search_id):
     """
     Ativa/desativa uma busca
     """
     try:
-        search_config = SearchConfig.query.get_or_404(search_id)
+        search_config = db.get_or_404(SearchConfig, search_id)
         search_config.is_active = not search_config.is_active
         db.session.commit()
         
@@ -242,6 +767,8 @@ def toggle_search_status(search_id):
             'message': f'Busca "{search_config.name}" {status}.'
         })
         
+    except HTTPException:
+        raise
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -274,6 +801,8 @@ def download_product_image(product_id):
             'message': 'Dados do produto extraídos. Implementar download de imagem.'
         })
         
+    except HTTPException:
+        raise
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -304,6 +833,8 @@ def create_social_post(product_id):
             'product': product_data
         })
         
+    except HTTPException:
+        raise
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -0,0 +1,187 @@
+"""
+Validação de sessões com cache em memória. O painel chama /api/auth/check a
+cada carregamento e as rotas protegidas validam a sessão a cada requisição;
+sem cache cada chamada custa uma consulta de Session (e outra de User).
+
+Camadas, da mais barata para a mais cara:
+  1. carimbo assinado no cookie da sessão Flask (opcional, AUTH_SIGNED_STAMP):
+     comprovante de validação recente que dispensa até o cache;
+  2. cache TTL por token de sessão, local ao processo;
+  3. uma consulta Session + User no banco.
+
+O carimbo leva a expiração da sessão e deixa de valer quando ela passa.
+Logout, troca de senha e desativação ou exclusão do usuário (por qualquer
+caminho, via eventos do ORM) invalidam o cache e os carimbos deste processo.
+Em outros workers do gunicorn a revogação leva no máximo AUTH_CACHE_TTL
+(cache) ou AUTH_STAMP_MAX_AGE (carimbo) segundos.
+"""
+import os
+import sys
+import time
+import logging
+import threading
+from datetime import datetime
+from itsdangerous import URLSafeTimedSerializer, BadSignature
+from sqlalchemy import event
+
+# Adiciona a raiz do projeto ao path para importar o cache compartilhado
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from app.utils.cache import TTLCache
+from .models.auth import db, User, Session
+
+logger = logging.getLogger(__name__)
+
+AUTH_CACHE_TTL = float(os.getenv('AUTH_CACHE_TTL', 60))
+AUTH_SIGNED_STAMP = os.getenv('AUTH_SIGNED_STAMP', 'true').lower() == 'true'
+AUTH_STAMP_MAX_AGE = int(os.getenv('AUTH_STAMP_MAX_AGE', 300))
+
+session_cache = TTLCache(ttl=AUTH_CACHE_TTL, max_entries=int(os.getenv('AUTH_CACHE_MAX_ENTRIES', 1024)))
+
+# Tokens encerrados e usuários que trocaram a senha ou foram desativados, para
+# recusar carimbos ainda dentro do prazo; expiram junto com o carimbo mais
+# antigo possível
+_revoked_tokens = TTLCache(ttl=AUTH_STAMP_MAX_AGE, max_entries=4096)
+_user_changed = TTLCache(ttl=AUTH_STAMP_MAX_AGE, max_entries=1024)
+
+_counters = {'stamp_hits': 0, 'cache_hits': 0, 'db_lookups': 0, 'rejected': 0}
+_counters_lock = threading.Lock()
+
+def _count(name):
+    with _counters_lock:
+        _counters[name] += 1
+
+def _serializer(secret_key):
+    return URLSafeTimedSerializer(secret_key, salt='auth-stamp')
+
+def _user_info(user):
+    return {
+        'id': user.id,
+        'username': user.username,
+        'email': user.email,
+        'last_login': user.last_login.isoformat() if user.last_login else None
+    }
+
+def _load_from_db(user_id, session_token):
+    """Sessão ativa + usuário ativo em uma única consulta"""
+    _count('db_lookups')
+    row = (
+        db.session.query(Session.expires_at, User)
+        .join(User, User.id == Session.user_id)
+        .filter(
+            Session.session_token == session_token,
+            Session.user_id == user_id,
+            Session.is_active == True,
+            User.is_active == True
+        )
+        .first()
+    )
+    if not row:
+        return None
+
+    expires_at, user = row
+    return {'user': _user_info(user), 'expires_at': expires_at}
+
+def _check_stamp(flask_session, secret_key, user_id, session_token):
+    stamp = flask_session.get('auth_stamp')
+    if not stamp:
+        return None
+
+    try:
+        data, signed_at = _serializer(secret_key).loads(stamp, max_age=AUTH_STAMP_MAX_AGE, return_timestamp=True)
+    except BadSignature:
+        return None
+
+    if data.get('token') != session_token or data.get('user', {}).get('id') != user_id:
+        return None
+    # A sessão expirou no banco: o carimbo não a prolonga
+    try:
+        if datetime.fromisoformat(data['expires_at']) <= datetime.utcnow():
+            return None
+    except (KeyError, TypeError, ValueError):
+        return None
+    if _revoked_tokens.get(session_token):
+        return None
+    changed_at = _user_changed.get(user_id)
+    if changed_at and signed_at.timestamp() <= changed_at:
+        return None
+    return data['user']
+
+def validate_session(flask_session, secret_key):
+    """
+    Dados do usuário autenticado pela sessão Flask ou None se a sessão não for
+    válida. Renova o carimbo assinado quando a validação passa pelo cache ou
+    pelo banco.
+    """
+    user_id = flask_session.get('user_id')
+    session_token = flask_session.get('session_token')
+    if not user_id or not session_token:
+        return None
+
+    if AUTH_SIGNED_STAMP:
+        user = _check_stamp(flask_session, secret_key, user_id, session_token)
+        if user:
+            _count('stamp_hits')
+            return user
+
+    entry = session_cache.get(session_token)
+    if entry and entry['user']['id'] == user_id:
+        _count('cache_hits')
+    else:
+        entry = _load_from_db(user_id, session_token)
+        if entry:
+            # Não mantém no cache além da expiração da própria sessão
+            remaining = (entry['expires_at'] - datetime.utcnow()).total_seconds()
+            if remaining > 0:
+                session_cache.set(session_token, entry, ttl=min(AUTH_CACHE_TTL, remaining))
+
+    if not entry or entry['expires_at'] < datetime.utcnow():
+        _count('rejected')
+        return None
+
+    if AUTH_SIGNED_STAMP:
+        flask_session['auth_stamp'] = _serializer(secret_key).dumps({
+            'token': session_token,
+            'user': entry['user'],
+            'expires_at': entry['expires_at'].isoformat()
+        })
+    return entry['user']
+
+def invalidate_session(session_token):
+    """Remove o token do cache e recusa carimbos emitidos para ele (logout)"""
+    session_cache.invalidate(session_token)
+    _revoked_tokens.set(session_token, True)
+
+def invalidate_user(user_id):
+    """Descarta as sessões em cache de um usuário (troca de senha, desativação)"""
+    _user_changed.set(user_id, time.time())
+    for token, entry in session_cache.items():
+        if entry['user']['id'] == user_id:
+            session_cache.invalidate(token)
+
+@event.listens_for(User.is_active, 'set')
+def _user_deactivated(user, value, oldvalue, initiator):
+    if not value and user.id is not None:
+        invalidate_user(user.id)
+
+@event.listens_for(User, 'after_delete')
+def _user_deleted(mapper, connection, user):
+    invalidate_user(user.id)
+
+@event.listens_for(Session.is_active, 'set')
+def _session_deactivated(user_session, value, oldvalue, initiator):
+    if not value and user_session.session_token:
+        invalidate_session(user_session.session_token)
+
+def stats():
+    with _counters_lock:
+        counters = dict(_counters)
+    total = sum(counters.values())
+    fast = counters['stamp_hits'] + counters['cache_hits']
+    return {
+        **counters,
+        'signed_stamp': AUTH_SIGNED_STAMP,
+        'stamp_max_age': AUTH_STAMP_MAX_AGE,
+        'fast_path_rate': fast / total if total else 0.0,
+        'cache': session_cache.stats()
+    }
@@ -102,7 +102,8 @@ async function testSearch() {
     try {
         showLoading(true);
         
-        const response = await fetch('/api/search-wizard/step2/test', {
+        // The search runs as a background job: submit, then follow its progress events
+        const response = await fetch('/api/search-wizard/wizard/step2/submit', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -110,20 +111,88 @@ async function testSearch() {
             body: JSON.stringify({ config })
         });
         
-        const data = await response.json();
-        
-        if (data.success) {
-            currentSearchConfig = config;
-            testResults = data.products;
-            displayTestResults(data.products, data.stats);
-            document.getElementById('approveBtn').classList.remove('d-none');
-        } else {
-            showAlert('Erro no teste: ' + data.error, 'danger');
+        const submitted = await response.json();
+        if (!submitted.success) {
+            showLoading(false);
+            showAlert('Erro no teste: ' + submitted.error, 'danger');
+            return;
         }
+        
+        streamJobEvents(submitted.job.id, {
+            onPartial: (products) => {
+                // Render partial results as soon as a page is parsed
+                showLoading(false);
+                displayTestResults(products.slice(0, 20), partialStats(products));
+            },
+            onDone: async () => {
+                const data = await waitForJobResult(submitted.result_url);
+                showLoading(false);
+                
+                if (data.success) {
+                    currentSearchConfig = config;
+                    testResults = data.result.products;
+                    displayTestResults(data.result.products, data.result.stats);
+                    document.getElementById('approveBtn').classList.remove('d-none');
+                } else {
+                    showAlert('Erro no teste: ' + data.error, 'danger');
+                }
+            }
+        });
     } catch (error) {
-        showAlert('Erro de conexão', 'danger');
-    } finally {
         showLoading(false);
+        showAlert('Erro de conexão', 'danger');
+    }
+}
+
+function streamJobEvents(jobId, { onPartial, onDone }) {
+    const source = new EventSource(`/api/jobs/${jobId}/events`);
+    
+    // Stages carrying partial product lists
+    ['products_parsed', 'filters_applied'].forEach(stage => {
+        source.addEventListener(stage, (event) => {
+            const data = JSON.parse(event.data).data;
+            if (onPartial && data.products) onPartial(data.products);
+        });
+    });
+    
+    source.addEventListener('done', () => {
+        source.close();
+        if (onDone) onDone();
+    });
+    
+    source.onerror = () => {
+        // EventSource reconnects on its own; give up only once the stream is closed
+        if (source.readyState === EventSource.CLOSED) {
+            if (onDone) onDone();
+        }
+    };
+    
+    return source;
+}
+
+function partialStats(products) {
+    const prices = products.map(p => p.preco_usd).filter(price => price != null);
+    const unique = (values) => [...new Set(values.filter(Boolean))];
+    return {
+        total_found: products.length,
+        price_range: {
+            min: prices.length ? Math.min(...prices) : 0,
+            max: prices.length ? Math.max(...prices) : 0
+        },
+        categories: unique(products.map(p => p.categoria)),
+        brands: unique(products.map(p => p.marca))
+    };
+}
+
+async function waitForJobResult(resultUrl, intervalMs = 1500) {
+    while (true) {
+        const response = await fetch(resultUrl);
+        const data = await response.json();
+        // 202 while the job is queued or running
+        if (response.status !== 202) {
+            return data;
+        }
+        await new Promise(resolve => setTimeout(resolve, intervalMs));
     }
 }
 
@@ -263,28 +332,35 @@ function resetWizard() {
 }
 
 // Saved searches functions
-async function loadSavedSearches() {
+async function loadSavedSearches(cursor = null) {
     try {
-        const response = await fetch('/api/search-wizard/searches');
+        const url = cursor
+            ? `/api/search-wizard/searches?cursor=${encodeURIComponent(cursor)}`
+            : '/api/search-wizard/searches';
+        const response = await fetch(url);
         const data = await response.json();
         
         if (data.success) {
-            displaySavedSearches(data.searches);
+            // With a cursor, the page is appended to the searches already shown
+            displaySavedSearches(data.searches, data.next_cursor, Boolean(cursor));
         }
     } catch (error) {
         console.error('Error loading searches:', error);
     }
 }
 
-function displaySavedSearches(searches) {
+function displaySavedSearches(searches, nextCursor = null, append = false) {
     const searchesList = document.getElementById('savedSearchesList');
     
-    if (searches.length === 0) {
+    if (searches.length === 0 && !append) {
         searchesList.innerHTML = '<div class="text-center text-muted">Nenhuma busca salva</div>';
         return;
     }
     
-    searchesList.innerHTML = searches.map(search => `
+    const loadMore = document.getElementById('loadMoreSearches');
+    if (loadMore) loadMore.remove();
+    
+    const cards = searches.map(search => `
         <div class="card mb-3">
             <div class="card-body">
                 <div class="d-flex justify-content-between align-items-start">
@@ -315,21 +391,41 @@ function displaySavedSearches(searches) {
             </div>
         </div>
     `).join('');
+    
+    searchesList.innerHTML = (append ? searchesList.innerHTML : '') + cards;
+    
+    if (nextCursor) {
+        searchesList.insertAdjacentHTML('beforeend', `
+            <div id="loadMoreSearches" class="text-center">
+                <button class="btn btn-outline-primary btn-sm" onclick="loadSavedSearches('${nextCursor}')">
+                    Carregar mais
+                </button>
+            </div>
+        `);
+    }
 }
 
-async function viewSearchProducts(searchId) {
+// Campos exibidos nos cards; as especificações completas ficam de fora da listagem
+const SEARCH_PRODUCT_FIELDS = 'nome,preco_usd,preco_brl,marca';
+
+async function viewSearchProducts(searchId, cursor = null) {
     try {
         showLoading(true);
         
-        const response = await fetch(`/api/search-wizard/searches/${searchId}/products`);
+        const params = new URLSearchParams({ limit: 60, fields: SEARCH_PRODUCT_FIELDS });
+        if (cursor) params.set('after', cursor);
+        
+        const response = await fetch(`/api/search-wizard/searches/${searchId}/products?${params}`);
         const data = await response.json();
         
         if (data.success) {
-            // Switch to analysis tab and show products
-            const analysisTab = new bootstrap.Tab(document.getElementById('analysis-tab'));
-            analysisTab.show();
+            if (!cursor) {
+                // Switch to analysis tab and show products
+                const analysisTab = new bootstrap.Tab(document.getElementById('analysis-tab'));
+                analysisTab.show();
+            }
             
-            displaySearchProducts(data.products, data.search_name);
+            displaySearchProducts(data.products, data.search_name, searchId, data.next_cursor, Boolean(cursor));
         }
     } catch (error) {
         showAlert('Erro ao carregar produtos', 'danger');
@@ -338,36 +434,48 @@ async function viewSearchProducts(searchId) {
     }
 }
 
-function displaySearchProducts(products, searchName) {
+function displaySearchProducts(products, searchName, searchId, nextCursor = null, append = false) {
     const analysisContent = document.getElementById('marketAnalysisContent');
     
-    analysisContent.innerHTML = `
-        <div class="mb-4">
-            <h5><i class="fas fa-list me-2"></i>Produtos da busca: ${searchName}</h5>
-        </div>
-        <div class="row">
-            ${products.map(product => {
-                const productData = JSON.parse(product.product_data);
-                return `
-                    <div class="col-md-6 col-lg-4 mb-3">
-                        <div class="card product-card h-100" onclick="analyzeProduct(${product.saved_id})">
-                            <div class="card-body">
-                                <h6 class="product-title">${productData.nome || 'Produto'}</h6>
-                                <div class="product-price mb-2">$${productData.preco_usd || 'N/A'}</div>
-                                <div class="text-muted mb-2">R$${productData.preco_brl || 'N/A'}</div>
-                                <div class="d-flex justify-content-between align-items-center">
-                                    <span class="badge bg-primary">${productData.marca || 'N/A'}</span>
-                                    <button class="btn btn-sm btn-outline-primary">
-                                        <i class="fas fa-chart-bar"></i> Analisar
-                                    </button>
-                                </div>
-                            </div>
-                        </div>
+    const cards = products.map(product => `
+        <div class="col-md-6 col-lg-4 mb-3">
+            <div class="card product-card h-100" onclick="analyzeProduct(${product.saved_id})">
+                <div class="card-body">
+                    <h6 class="product-title">${product.nome || 'Produto'}</h6>
+                    <div class="product-price mb-2">$${product.preco_usd || 'N/A'}</div>
+                    <div class="text-muted mb-2">R$${product.preco_brl || 'N/A'}</div>
+                    <div class="d-flex justify-content-between align-items-center">
+                        <span class="badge bg-primary">${product.marca || 'N/A'}</span>
+                        <button class="btn btn-sm btn-outline-primary">
+                            <i class="fas fa-chart-bar"></i> Analisar
+                        </button>
                     </div>
-                `;
-            }).join('')}
+                </div>
+            </div>
         </div>
-    `;
+    `).join('');
+    
+    if (append) {
+        document.getElementById('loadMoreProducts')?.remove();
+        document.getElementById('searchProductsGrid').insertAdjacentHTML('beforeend', cards);
+    } else {
+        analysisContent.innerHTML = `
+            <div class="mb-4">
+                <h5><i class="fas fa-list me-2"></i>Produtos da busca: ${searchName}</h5>
+            </div>
+            <div class="row" id="searchProductsGrid">${cards}</div>
+        `;
+    }
+    
+    if (nextCursor) {
+        analysisContent.insertAdjacentHTML('beforeend', `
+            <div id="loadMoreProducts" class="text-center">
+                <button class="btn btn-outline-primary btn-sm" onclick="viewSearchProducts(${searchId}, ${nextCursor})">
+                    Carregar mais
+                </button>
+            </div>
+        `);
+    }
 }
 
 async function toggleSearchStatus(searchId) {
@@ -388,7 +496,7 @@ async function toggleSearchStatus(searchId) {
 }
 
 // Opportunities functions
-async function findOpportunities() {
+async function findOpportunities(refreshed = false) {
     try {
         showLoading(true);
         
@@ -405,6 +513,22 @@ async function findOpportunities() {
         
         const data = await response.json();
         
+        if (data.success && data.opportunities.length === 0 && !refreshed) {
+            // Empty leaderboard: recompute it in the background, then read again
+            const refresh = await fetch('/api/search-wizard/opportunities/refresh', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify({ max_price_usd: 500 })
+            });
+            const submitted = await refresh.json();
+            if (submitted.success) {
+                await waitForJobResult(submitted.result_url);
+                return findOpportunities(true);
+            }
+        }
+        
         if (data.success) {
             displayOpportunities(data.opportunities);
         }
@@ -456,55 +580,70 @@ function displayOpportunities(opportunities) {
 }
 
 // Market analysis functions
-async function analyzeProduct(productId) {
-    try {
-        showLoading(true);
+let marketAnalysisStream = null;
+
+function streamMarketAnalysis(streamUrl, onFirstResult) {
+    // Only one analysis stream at a time
+    if (marketAnalysisStream) {
+        marketAnalysisStream.close();
+    }
+    
+    showLoading(true);
+    let received = false;
+    const source = new EventSource(streamUrl);
+    marketAnalysisStream = source;
+    
+    const handleUpdate = (event) => {
+        const data = JSON.parse(event.data);
+        const progress = data.done
+            ? `${data.sources_done}/${data.sources_total} fontes consultadas`
+            : `Consultando fontes... ${data.sources_done}/${data.sources_total} (${data.source})`;
         
-        const response = await fetch(`/api/market-analysis/product/${productId}`);
-        const data = await response.json();
+        displayMarketAnalysis(data.analysis, progress);
         
-        if (data.success) {
-            displayMarketAnalysis(data.analysis);
+        if (!received) {
+            received = true;
+            showLoading(false);
+            if (onFirstResult) onFirstResult();
         }
-    } catch (error) {
-        showAlert('Erro na análise de mercado', 'danger');
-    } finally {
+    };
+    
+    source.addEventListener('partial', handleUpdate);
+    source.addEventListener('complete', (event) => {
+        handleUpdate(event);
+        source.close();
+    });
+    source.addEventListener('error', (event) => {
+        let message = 'Erro na análise de mercado';
+        if (event.data) {
+            message = JSON.parse(event.data).error || message;
+        }
+        // Connection closed after the final result is not an error
+        if (source.readyState !== EventSource.CLOSED || event.data) {
+            showAlert(message, 'danger');
+        }
+        source.close();
         showLoading(false);
-    }
+    });
 }
 
-async function analyzeProductFromUrl(url) {
-    try {
-        showLoading(true);
-        
-        const response = await fetch('/api/market-analysis/url', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({ url })
-        });
-        
-        const data = await response.json();
-        
-        if (data.success) {
-            displayMarketAnalysis(data.analysis);
-            
-            // Switch to analysis tab
-            const analysisTab = new bootstrap.Tab(document.getElementById('analysis-tab'));
-            analysisTab.show();
-        }
-    } catch (error) {
-        showAlert('Erro na análise de mercado', 'danger');
-    } finally {
-        showLoading(false);
-    }
+function analyzeProduct(productId) {
+    streamMarketAnalysis(`/api/market-analysis/product/${productId}/stream`);
+}
+
+function analyzeProductFromUrl(url) {
+    streamMarketAnalysis(`/api/market-analysis/url/stream?url=${encodeURIComponent(url)}`, () => {
+        // Switch to analysis tab
+        const analysisTab = new bootstrap.Tab(document.getElementById('analysis-tab'));
+        analysisTab.show();
+    });
 }
 
-function displayMarketAnalysis(analysis) {
+function displayMarketAnalysis(analysis, progress = '') {
     const analysisContent = document.getElementById('marketAnalysisContent');
     
     analysisContent.innerHTML = `
+        ${progress ? `<div class="text-muted small mb-2"><i class="fas fa-sync-alt me-1"></i>${progress}</div>` : ''}
         <div class="row">
             <div class="col-md-8">
                 <div class="card">
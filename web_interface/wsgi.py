@@ -0,0 +1,43 @@
+"""
+Ponto de entrada WSGI de produção: gunicorn -c gunicorn.conf.py wsgi:app
+
+Importar este módulo cria a aplicação, os extratores e os caches e os aquece
+(facetas do catálogo e cache de preços de mercado em disco). Com
+preload_app isso acontece uma única vez no processo mestre, antes do fork, e
+os workers compartilham essa memória em copy-on-write.
+"""
+import os
+import sys
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.main import app, celery
+from src.database import db
+from src.jobs import job_manager
+from src.routes.search_wizard import ensure_facets, market_analyzer
+from app.analyzers.facet_aggregator import CATALOG_SCOPE
+
+logger = logging.getLogger(__name__)
+
+def warm_up():
+    """Carrega os caches que todas as requisições usam"""
+    try:
+        market_analyzer.price_cache.preload()
+
+        with app.app_context():
+            ensure_facets(CATALOG_SCOPE)
+            # Nenhuma conexão aberta no mestre deve ser herdada pelos workers
+            db.engine.dispose()
+
+        logger.info("Caches warmed up before fork")
+    except Exception as e:
+        logger.error(f"Error warming up caches: {str(e)}")
+
+def after_fork():
+    """Recria no worker o que não sobrevive ao fork (conexões e pools de threads)"""
+    with app.app_context():
+        db.engine.dispose(close=False)
+    job_manager.after_fork()
+
+warm_up()